@@ -0,0 +1,317 @@
+import asyncio
+import os
+import queue
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from pydantic import TypeAdapter
+from sqlalchemy import DateTime, insert, literal, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from database import engine, ArchivedJob, ArchivedJobApplication, Job, JobApplication
+from instrumentation import report_failure
+from pagination import paginate_applications
+from schemas import JobApplicationWithJob
+from serialization import (
+    FAST_SERIALIZATION, APPLICATION_ROW_COLUMNS, EMBEDDED_JOB_COLUMNS,
+    ARCHIVED_APPLICATION_ROW_COLUMNS, ARCHIVED_EMBEDDED_JOB_COLUMNS, application_row, dumps
+)
+from stats import percentile
+
+load_dotenv()
+
+# "direct" writes each application in its own transaction; "write_behind"
+# hands them to a single writer that commits them in groups
+APPLICATION_WRITE_MODE = os.getenv("APPLICATION_WRITE_MODE", "direct").lower()
+WRITE_BEHIND = APPLICATION_WRITE_MODE == "write_behind"
+# How long the writer keeps collecting before it commits a group
+APPLICATION_FLUSH_MS = float(os.getenv("APPLICATION_FLUSH_MS", "5"))
+APPLICATION_BATCH_SIZE = int(os.getenv("APPLICATION_BATCH_SIZE", "500"))
+# Wait before the writer reconnects after losing its connection, doubling per failure
+APPLICATION_RECONNECT_BASE_SECONDS = float(os.getenv("APPLICATION_RECONNECT_BASE_SECONDS", "0.5"))
+APPLICATION_RECONNECT_MAX_SECONDS = float(os.getenv("APPLICATION_RECONNECT_MAX_SECONDS", "30"))
+
+RETURNED_COLUMNS = (
+    JobApplication.id, JobApplication.user_id, JobApplication.job_id,
+    JobApplication.status, JobApplication.applied_at,
+)
+
+def _job_not_found() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_404_NOT_FOUND,
+        detail="Job not found"
+    )
+
+def _already_applied() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="You have already applied for this job"
+    )
+
+def _insert_ignoring_duplicates(db: Session):
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        # No portable ON CONFLICT; the unique index turns duplicates into errors
+        return insert(JobApplication), False
+    return dialect_insert(JobApplication), True
+
+# ==================== LISTING ====================
+
+def list_applications(
+    db: Session,
+    user_id: int,
+    skip: int = 0,
+    limit: int = 100,
+    cursor: Optional[str] = None,
+    expand_job: bool = False,
+):
+    """Return (applications, next_cursor) for GET /api/applications/me.
+
+    With expand_job each application carries its job from the same query
+    (a many-to-one LEFT JOIN, so LIMIT still counts applications).
+    Otherwise job is left empty.
+
+    History includes applications the archiver has moved out with their
+    jobs; both tables are read in one UNION ALL statement. That returns
+    rows rather than ORM objects, so the applications are plain dicts in
+    either serialization mode (pydantic mode still validates each one).
+    """
+    sources = (
+        (JobApplication, Job, APPLICATION_ROW_COLUMNS, EMBEDDED_JOB_COLUMNS),
+        (ArchivedJobApplication, ArchivedJob, ARCHIVED_APPLICATION_ROW_COLUMNS, ARCHIVED_EMBEDDED_JOB_COLUMNS),
+    )
+    statements = []
+    for application, job, row_columns, embedded_columns in sources:
+        statement = select(*row_columns, *(embedded_columns if expand_job else []))
+        if expand_job:
+            statement = statement.outerjoin(job, job.id == application.job_id)
+        statements.append((statement.where(application.user_id == user_id), application))
+    applications, next_cursor = paginate_applications(db, statements, limit, skip=skip, cursor=cursor)
+    return [application_row(row, embedded_job=expand_job) for row in applications], next_cursor
+
+_application_list_adapter = TypeAdapter(List[JobApplicationWithJob])
+
+def serialize_applications(applications) -> bytes:
+    if FAST_SERIALIZATION:
+        return dumps(applications)
+    return _application_list_adapter.dump_json(
+        _application_list_adapter.validate_python(applications, from_attributes=True)
+    )
+
+# ==================== DIRECT ====================
+
+def insert_application(db: Session, user_id: int, job_id: int) -> JobApplication:
+    """Apply with one INSERT ... SELECT ... ON CONFLICT DO NOTHING; the caller commits.
+
+    Whether the job exists and whether the user already applied are both
+    settled inside the statement, so concurrent double-submits cannot both
+    succeed. The follow-up lookup only runs when the insert was refused.
+    """
+    statement, ignores_duplicates = _insert_ignoring_duplicates(db)
+    source = select(
+        literal(user_id), literal(job_id), literal("pending"), literal(datetime.utcnow(), DateTime)
+    ).where(select(Job.id).where(Job.id == job_id).exists())
+    statement = statement.from_select(["user_id", "job_id", "status", "applied_at"], source)
+    if ignores_duplicates:
+        statement = statement.on_conflict_do_nothing(index_elements=["user_id", "job_id"])
+
+    row = db.execute(statement.returning(*RETURNED_COLUMNS)).first()
+    if row is None:
+        raise _already_applied() if db.get(Job, job_id) is not None else _job_not_found()
+    return JobApplication(**row._mapping)
+
+# ==================== WRITE-BEHIND ====================
+
+class ApplicationWriter:
+    """Group commit for applications.
+
+    Requests queue (user_id, job_id) and wait on a future; one writer thread
+    collects for up to APPLICATION_FLUSH_MS and commits the whole group with
+    one job lookup and one multi-row INSERT. A request still only gets its
+    201 once its row is committed.
+    """
+
+    def __init__(self, flush_ms: float = APPLICATION_FLUSH_MS, batch_size: int = APPLICATION_BATCH_SIZE,
+                 bind=engine, latency_window: int = 1000):
+        self.window = flush_ms / 1000
+        self.batch_size = batch_size
+        self.bind = bind
+        self._queue = queue.Queue()
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+        self._commit_latencies = deque(maxlen=latency_window)
+        self.batches = 0
+        self.rows = 0
+        self.reconnects = 0
+
+    def start(self):
+        with self._lock:
+            if self._thread is not None:
+                return
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name="application-writer", daemon=True)
+            self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def submit(self, user_id: int, job_id: int) -> Future:
+        if self._thread is None:
+            self.start()
+        future = Future()
+        self._queue.put((user_id, job_id, future))
+        return future
+
+    def apply(self, user_id: int, job_id: int) -> JobApplication:
+        return self.submit(user_id, job_id).result()
+
+    async def apply_async(self, user_id: int, job_id: int) -> JobApplication:
+        return await asyncio.wrap_future(self.submit(user_id, job_id))
+
+    def _run(self):
+        failures = 0
+        while True:
+            try:
+                # A dedicated connection: waiting requests may hold every pooled
+                # one, and they only let go once this writer has committed their rows
+                with self.bind.connect() as connection:
+                    failures = 0
+                    self._drain(connection)
+                return
+            except Exception as exc:
+                report_failure("applications", "Application writer lost its database connection")
+                # Nothing is written until the writer reconnects, so fail what
+                # is waiting now rather than holding it through the backoff
+                self._fail_queued(exc)
+                if self._stop.is_set():
+                    return
+                failures += 1
+                with self._lock:
+                    self.reconnects += 1
+                self._stop.wait(min(
+                    APPLICATION_RECONNECT_BASE_SECONDS * 2 ** (failures - 1), APPLICATION_RECONNECT_MAX_SECONDS
+                ))
+
+    def _fail_queued(self, exc: Exception):
+        while True:
+            try:
+                _, _, future = self._queue.get_nowait()
+            except queue.Empty:
+                return
+            future.set_exception(exc)
+
+    def _drain(self, connection):
+        # Keep draining after stop() so queued requests are not left waiting
+        while not (self._stop.is_set() and self._queue.empty()):
+            try:
+                batch = [self._queue.get(timeout=0.1)]
+            except queue.Empty:
+                continue
+            deadline = time.monotonic() + self.window
+            while len(batch) < self.batch_size:
+                remaining = deadline - time.monotonic()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(self._queue.get(timeout=remaining))
+                except queue.Empty:
+                    break
+            try:
+                self._write(connection, batch)
+            except Exception as exc:
+                # The connection itself broke; _run reconnects, this group fails
+                for _, _, future in batch:
+                    if not future.done():
+                        future.set_exception(exc)
+                raise
+
+    def _write(self, connection, batch: List[Tuple[int, int, Future]]):
+        started = time.perf_counter()
+        db = Session(bind=connection)
+        try:
+            try:
+                results = self._write_group(db, batch)
+            except DBAPIError:
+                db.rollback()
+                # Fall back to one transaction per application
+                results = []
+                for user_id, job_id, future in batch:
+                    try:
+                        results.append((future, insert_application(db, user_id, job_id)))
+                        db.commit()
+                    except (HTTPException, DBAPIError) as exc:
+                        db.rollback()
+                        results.append((future, exc))
+        except Exception as exc:
+            # Never leave a request waiting on a future nobody will resolve
+            results = [(future, exc) for _, _, future in batch]
+        finally:
+            db.close()
+
+        with self._lock:
+            self.batches += 1
+            self.rows += len(batch)
+            self._commit_latencies.append(time.perf_counter() - started)
+        for future, outcome in results:
+            if isinstance(outcome, Exception):
+                future.set_exception(outcome)
+            else:
+                future.set_result(outcome)
+
+    def _write_group(self, db: Session, batch: List[Tuple[int, int, Future]]) -> list:
+        existing = set(db.scalars(select(Job.id).where(Job.id.in_({job_id for _, job_id, _ in batch}))))
+        results, waiting, rows = [], {}, []
+        now = datetime.utcnow()
+        for user_id, job_id, future in batch:
+            if job_id not in existing:
+                results.append((future, _job_not_found()))
+            elif (user_id, job_id) in waiting:
+                # Double-submit within one group: the first one wins
+                results.append((future, _already_applied()))
+            else:
+                waiting[(user_id, job_id)] = future
+                rows.append({"user_id": user_id, "job_id": job_id, "status": "pending", "applied_at": now})
+
+        if rows:
+            statement, ignores_duplicates = _insert_ignoring_duplicates(db)
+            statement = statement.values(rows)
+            if ignores_duplicates:
+                statement = statement.on_conflict_do_nothing(index_elements=["user_id", "job_id"])
+            for row in db.execute(statement.returning(*RETURNED_COLUMNS)).all():
+                results.append((waiting.pop((row.user_id, row.job_id)), JobApplication(**row._mapping)))
+            db.commit()
+        # Anything not returned already existed
+        results.extend((future, _already_applied()) for future in waiting.values())
+        return results
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._commit_latencies)
+        return {
+            "mode": APPLICATION_WRITE_MODE,
+            "queue_depth": self._queue.qsize(),
+            "batches": self.batches,
+            "rows": self.rows,
+            "rows_per_batch_avg": self.rows / self.batches if self.batches else 0.0,
+            "reconnects": self.reconnects,
+            "commit_latency_ms_p50": percentile(latencies, 0.50) * 1000,
+            "commit_latency_ms_p99": percentile(latencies, 0.99) * 1000,
+        }
+
+application_writer = ApplicationWriter()
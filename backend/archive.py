@@ -0,0 +1,156 @@
+import os
+import threading
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+from typing import List, Tuple
+
+from sqlalchemy import delete, func, insert, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from database import engine, ArchivedJob, ArchivedJobApplication, Job, JobApplication
+from facets import adjust_counts, facet_key
+from instrumentation import report_failure
+from job_events import jobs_removed
+from response_cache import response_cache
+
+load_dotenv()
+
+# Seconds between archiver runs; 0 disables the archiver
+ARCHIVE_INTERVAL = float(os.getenv("ARCHIVE_INTERVAL", "3600"))
+# Jobs moved per transaction, so a large backlog never holds a long write lock
+ARCHIVE_BATCH_SIZE = int(os.getenv("ARCHIVE_BATCH_SIZE", "500"))
+# Deactivated jobs stay put this long (since their last update) in case they are reopened
+ARCHIVE_INACTIVE_AFTER_DAYS = float(os.getenv("ARCHIVE_INACTIVE_AFTER_DAYS", "7"))
+# Active jobs posted longer ago than this expire into the archive; 0 never expires them
+JOB_EXPIRY_DAYS = float(os.getenv("JOB_EXPIRY_DAYS", "0"))
+
+# ==================== MOVING ====================
+
+def move_to_archive(db: Session, job_ids: List[int]) -> Tuple[list, list]:
+    """Move jobs and their applications into the archive tables; the caller commits.
+
+    Rows are copied from what DELETE ... RETURNING removed, so an
+    application written concurrently is either moved or left alone,
+    never lost. Returns the (jobs, applications) rows moved.
+    """
+    now = datetime.utcnow()
+    applications = db.execute(
+        delete(JobApplication.__table__).where(JobApplication.job_id.in_(job_ids))
+        .returning(*JobApplication.__table__.columns)
+    ).all()
+    jobs = db.execute(
+        delete(Job.__table__).where(Job.id.in_(job_ids)).returning(*Job.__table__.columns)
+    ).all()
+    if jobs:
+        # Archived postings are closed, whatever they were when they expired
+        db.execute(insert(ArchivedJob), [dict(row._mapping, is_active=False, archived_at=now) for row in jobs])
+    if applications:
+        db.execute(insert(ArchivedJobApplication), [dict(row._mapping, archived_at=now) for row in applications])
+
+    # Core deletes skip the ORM flush hook that maintains facet counts
+    deltas = Counter()
+    deltas.subtract(facet_key(row._mapping) for row in jobs if row.is_active is not False)
+    adjust_counts(db.connection(), deltas)
+    return jobs, applications
+
+def _candidates(now: datetime) -> list:
+    """Statements selecting the next job ids to archive, oldest first."""
+    # On SQLite without AUTOINCREMENT a deleted highest id is handed out
+    # again, which would collide in the archive; keep the newest job and
+    # the job of the newest application where they are
+    keep = [
+        Job.id < select(func.max(Job.id)).scalar_subquery(),
+        Job.id.not_in(select(JobApplication.job_id).where(
+            JobApplication.id == select(func.max(JobApplication.id)).scalar_subquery()
+        )),
+    ]
+    statements = [
+        select(Job.id)
+        .where(Job.is_active == False, Job.updated_at < now - timedelta(days=ARCHIVE_INACTIVE_AFTER_DAYS), *keep)
+        .order_by(Job.updated_at, Job.id)
+    ]
+    if JOB_EXPIRY_DAYS > 0:
+        statements.append(
+            select(Job.id)
+            .where(Job.is_active == True, Job.created_at < now - timedelta(days=JOB_EXPIRY_DAYS), *keep)
+            .order_by(Job.created_at, Job.id)
+        )
+    return statements
+
+def archive_jobs(bind=engine, batch_size: int = ARCHIVE_BATCH_SIZE) -> Tuple[int, int]:
+    """Archive every inactive or expired job in batches; returns (jobs, applications) moved."""
+    now = datetime.utcnow()
+    moved_jobs = moved_applications = 0
+    for statement in _candidates(now):
+        while True:
+            with Session(bind=bind) as db:
+                job_ids = db.scalars(statement.limit(batch_size)).all()
+                if not job_ids:
+                    break
+                jobs, applications = move_to_archive(db, job_ids)
+                db.commit()
+                # Search, suggestions, recommendations and pending alerts
+                jobs_removed(db, jobs)
+            response_cache.invalidate(job_ids)
+            moved_jobs += len(jobs)
+            moved_applications += len(applications)
+            if len(job_ids) < batch_size:
+                break
+    return moved_jobs, moved_applications
+
+# ==================== ARCHIVER ====================
+
+class JobArchiver:
+    def __init__(self, interval: float = ARCHIVE_INTERVAL, bind=engine):
+        self.interval = interval
+        self.bind = bind
+        self.archived_jobs = 0
+        self.archived_applications = 0
+        self.last_run = None
+        self.last_duration_ms = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="job-archiver", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def run_once(self):
+        started = time.perf_counter()
+        jobs, applications = archive_jobs(self.bind)
+        self.archived_jobs += jobs
+        self.archived_applications += applications
+        self.last_duration_ms = (time.perf_counter() - started) * 1000
+        self.last_run = datetime.utcnow()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.run_once()
+            except Exception:
+                # A locked or unreachable database just waits for the next run
+                report_failure("archive", "Job archiving failed")
+
+    def metrics(self) -> dict:
+        return {
+            "interval": self.interval,
+            "running": self._thread is not None,
+            "archived_jobs": self.archived_jobs,
+            "archived_applications": self.archived_applications,
+            "last_run": self.last_run,
+            "last_duration_ms": self.last_duration_ms,
+        }
+
+archiver = JobArchiver()
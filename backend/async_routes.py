@@ -0,0 +1,441 @@
+from fastapi import APIRouter, Depends, FastAPI, HTTPException, Query, Request, Response, status
+from fastapi.routing import APIRoute
+from sqlalchemy import select
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.ext.asyncio import AsyncSession
+from datetime import datetime
+from typing import List
+
+from database import get_async_db, get_async_read_db, User, Job, SavedSearch
+from schemas import (
+    UserCreate, UserLogin, UserResponse, Token,
+    VerifyCode, ResendCode,
+    JobCreate, JobResponse, JobSearchResult, JobFacets, BulkIngestResult,
+    JobApplicationCreate, JobApplicationResponse, JobApplicationWithJob,
+    SavedSearchCreate, SavedSearchResponse
+)
+from auth import (
+    get_password_hash_async, verify_and_update_password_async, create_access_token,
+    get_current_active_user_async
+)
+from job_events import jobs_saved
+from jobs import JOB_SORT, SALARY_MATCH, list_jobs, serialize_jobs, serialize_job
+from response_cache import (
+    response_cache, cached_response, store_response,
+    list_key, job_etag, last_modified_of
+)
+from export import EXPORT_FORMAT, export_applications_statements, export_jobs_statements, export_response
+from facets import get_facets
+from ingest import BULK_BATCH_SIZE, BulkIngester, RowError, iter_json_array, iter_ndjson
+from notifications import send_verification_code
+from recommender import recommend_for_user
+from applications import (
+    WRITE_BEHIND, application_writer, insert_application, list_applications, serialize_applications
+)
+from saved_searches import create_saved_search, delete_saved_search
+from serialization import FastJSONResponse
+from verification import issue_code, consume_code
+
+# Async twins of the routes in main.py. Handlers await the database on the
+# event loop instead of holding a threadpool worker for the whole request.
+router = APIRouter()
+
+def install_async_routes(app: FastAPI):
+    """Swap each sync route in app for its async twin, keeping route order.
+
+    A route with no twin here stays sync and runs in the threadpool. That
+    suits the ones that never open a session (suggest, metrics, the job
+    feed); every route using get_db or get_read_db needs a twin, which
+    benchmarks/check_async_routes.py enforces.
+    """
+    replacements = {
+        (route.path, frozenset(route.methods)): route
+        for route in router.routes
+        if isinstance(route, APIRoute)
+    }
+    app.router.routes = [
+        replacements.pop((route.path, frozenset(route.methods)), route)
+        if isinstance(route, APIRoute) else route
+        for route in app.router.routes
+    ]
+    app.router.routes.extend(replacements.values())
+
+async def _first(db: AsyncSession, statement):
+    result = await db.execute(statement)
+    return result.scalars().first()
+
+# ==================== AUTH ROUTES ====================
+
+@router.post("/api/register", response_model=dict, status_code=status.HTTP_201_CREATED)
+async def register(user_data: UserCreate, db: AsyncSession = Depends(get_async_db)):
+    existing_user = await _first(db, select(User).where(
+        (User.email == user_data.email) | (User.phone == user_data.phone)
+    ))
+
+    if existing_user:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="User with this email or phone already exists"
+        )
+
+    if not user_data.email and not user_data.phone:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Either email or phone must be provided"
+        )
+
+    # Argon2 is CPU-bound; the hashing pool keeps it off the event loop
+    password_hash = await get_password_hash_async(user_data.password)
+    new_user = User(
+        first_name=user_data.first_name,
+        last_name=user_data.last_name,
+        email=user_data.email,
+        phone=user_data.phone,
+        dob=user_data.dob,
+        password_hash=password_hash
+    )
+
+    db.add(new_user)
+    await db.flush()
+
+    code = await db.run_sync(issue_code, new_user.id)
+    await db.commit()
+    await db.refresh(new_user)
+
+    if new_user.email:
+        send_verification_code(new_user.email, code)
+
+    return {
+        "message": "User registered successfully",
+        "user_id": new_user.id,
+        "verification_code": code  # Remove in production!
+    }
+
+@router.post("/api/login", response_model=Token)
+async def login(credentials: UserLogin, db: AsyncSession = Depends(get_async_db)):
+    user = None
+    if credentials.email:
+        user = await _first(db, select(User).where(User.email == credentials.email))
+    elif credentials.phone:
+        user = await _first(db, select(User).where(User.phone == credentials.phone))
+
+    valid, new_hash = (
+        await verify_and_update_password_async(credentials.password, user.password_hash)
+        if user else (False, None)
+    )
+    if not valid:
+        raise HTTPException(
+            status_code=status.HTTP_401_UNAUTHORIZED,
+            detail="Incorrect email/phone or password",
+            headers={"WWW-Authenticate": "Bearer"},
+        )
+
+    if new_hash:
+        user.password_hash = new_hash
+        await db.commit()
+
+    if not user.verified:
+        code = await db.run_sync(issue_code, user.id)
+        await db.commit()
+
+        if user.email:
+            send_verification_code(user.email, code)
+
+        raise HTTPException(
+            status_code=status.HTTP_403_FORBIDDEN,
+            detail={
+                "message": "User not verified",
+                "user_id": user.id,
+                "verification_code": code  # Remove in production!
+            }
+        )
+
+    access_token = create_access_token(data={"sub": str(user.id)})
+
+    return {
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": UserResponse.model_validate(user)
+    }
+
+@router.post("/api/verify", response_model=dict)
+async def verify_code(verify_data: VerifyCode, db: AsyncSession = Depends(get_async_db)):
+    if not await db.run_sync(consume_code, verify_data.user_id, verify_data.code):
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Invalid or expired verification code"
+        )
+
+    user = await _first(db, select(User).where(User.id == verify_data.user_id))
+    user.verified = True
+    await db.commit()
+
+    access_token = create_access_token(data={"sub": str(user.id)})
+
+    return {
+        "message": "User verified successfully",
+        "access_token": access_token,
+        "token_type": "bearer",
+        "user": UserResponse.model_validate(user)
+    }
+
+@router.post("/api/resend-code", response_model=dict)
+async def resend_verification_code(resend_data: ResendCode, db: AsyncSession = Depends(get_async_db)):
+    user = await _first(db, select(User).where(User.id == resend_data.user_id))
+
+    if not user:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="User not found"
+        )
+
+    code = await db.run_sync(issue_code, user.id)
+    await db.commit()
+
+    if user.email:
+        send_verification_code(user.email, code)
+
+    return {
+        "message": "Verification code resent",
+        "verification_code": code  # Remove in production!
+    }
+
+# ==================== USER ROUTES ====================
+
+@router.get("/api/users/me", response_model=UserResponse)
+async def get_current_user_info(current_user: User = Depends(get_current_active_user_async)):
+    return current_user
+
+@router.put("/api/users/me", response_model=UserResponse)
+async def update_current_user(
+    user_update: UserCreate,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    current_user.first_name = user_update.first_name
+    current_user.last_name = user_update.last_name
+    current_user.dob = user_update.dob
+
+    await db.commit()
+    await db.refresh(current_user)
+
+    return current_user
+
+# ==================== JOB ROUTES ====================
+
+@router.get("/api/jobs", response_model=List[JobSearchResult])
+async def get_all_jobs(
+    request: Request,
+    skip: int = 0,
+    limit: int = 20,
+    category: str = None,
+    q: str = None,
+    cursor: str = None,
+    job_type: List[str] = Query(None),
+    location: List[str] = Query(None),
+    min_salary: int = Query(None, ge=0),
+    max_salary: int = Query(None, ge=0),
+    salary_match: str = SALARY_MATCH,
+    sort: str = JOB_SORT,
+    ids: List[str] = Query(None),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    key = list_key(request)
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+
+    generation = response_cache.generation
+    # The listing helpers are written against the sync Session API;
+    # run_sync drives them over the async connection without a thread
+    jobs, next_cursor = await db.run_sync(
+        list_jobs, skip=skip, limit=limit, category=category, q=q, cursor=cursor,
+        job_type=job_type, location=location, min_salary=min_salary, max_salary=max_salary,
+        salary_match=salary_match, sort=sort, ids=ids,
+    )
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return store_response(request, key, serialize_jobs(jobs), generation, last_modified_of(jobs), headers)
+
+@router.get("/api/jobs/recommended", response_model=List[JobSearchResult])
+async def get_recommended_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return [
+        JobSearchResult.model_validate(job).model_copy(update={"score": score})
+        for job, score in await db.run_sync(recommend_for_user, current_user.id, limit=limit)
+    ]
+
+@router.get("/api/jobs/facets", response_model=JobFacets)
+async def get_job_facets(
+    category: str = None,
+    job_type: str = None,
+    location: str = None,
+    salary_bucket: str = None,
+    db: AsyncSession = Depends(get_async_read_db)
+):
+    return await db.run_sync(get_facets, {
+        "category": category,
+        "job_type": job_type,
+        "location": location,
+        "salary_bucket": salary_bucket,
+    })
+
+@router.get("/api/jobs/{job_id}", response_model=JobResponse)
+async def get_job_by_id(job_id: int, request: Request, db: AsyncSession = Depends(get_async_read_db)):
+    key = ("job", job_id)
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+
+    generation = response_cache.generation
+    job = await _first(db, select(Job).where(Job.id == job_id, Job.is_active == True))
+
+    if not job:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Job not found"
+        )
+
+    return store_response(request, key, serialize_job(job), generation, job.updated_at, etag=job_etag(job))
+
+@router.post("/api/jobs", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
+async def create_job(
+    job_data: JobCreate,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    new_job = Job(**job_data.model_dump())
+
+    db.add(new_job)
+    try:
+        await db.commit()
+    except IntegrityError:
+        await db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A job with this external_id already exists"
+        )
+    await db.refresh(new_job)
+    await db.run_sync(jobs_saved, [new_job])
+
+    return new_job
+
+@router.post("/api/jobs/bulk", response_model=BulkIngestResult)
+async def bulk_create_jobs(
+    request: Request,
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=10000),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows = iter_ndjson(request.stream())
+    else:
+        rows = iter_json_array(request.stream())
+
+    ingester = BulkIngester(batch_size)
+    try:
+        async for row, value in rows:
+            if ingester.add(row, value):
+                await db.run_sync(ingester.flush)
+    except RowError as exc:
+        ingester.fail(ingester.received, str(exc))
+    await db.run_sync(ingester.flush)
+
+    return ingester.result()
+
+# ==================== JOB APPLICATION ROUTES ====================
+
+@router.post("/api/applications", response_model=JobApplicationResponse, status_code=status.HTTP_201_CREATED)
+async def apply_for_job(
+    application_data: JobApplicationCreate,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    if WRITE_BEHIND:
+        await db.close()
+        return await application_writer.apply_async(current_user.id, application_data.job_id)
+
+    new_application = await db.run_sync(insert_application, current_user.id, application_data.job_id)
+    await db.commit()
+
+    return new_application
+
+@router.get("/api/applications/me", response_model=List[JobApplicationWithJob])
+async def get_my_applications(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str = None,
+    expand: str = Query(None, pattern="^job$"),
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    applications, next_cursor = await db.run_sync(
+        list_applications, current_user.id, skip=skip, limit=limit, cursor=cursor, expand_job=expand == "job"
+    )
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return FastJSONResponse(serialize_applications(applications), headers=headers)
+
+# ==================== SAVED SEARCH ROUTES ====================
+
+@router.post("/api/saved-searches", response_model=SavedSearchResponse, status_code=status.HTTP_201_CREATED)
+async def save_search(
+    search_data: SavedSearchCreate,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    return await db.run_sync(create_saved_search, current_user.id, search_data)
+
+@router.get("/api/saved-searches", response_model=List[SavedSearchResponse])
+async def get_my_saved_searches(
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    result = await db.execute(
+        select(SavedSearch).where(SavedSearch.user_id == current_user.id).order_by(SavedSearch.id)
+    )
+    return result.scalars().all()
+
+@router.delete("/api/saved-searches/{search_id}", status_code=status.HTTP_204_NO_CONTENT)
+async def remove_saved_search(
+    search_id: int,
+    current_user: User = Depends(get_current_active_user_async),
+    db: AsyncSession = Depends(get_async_db)
+):
+    await db.run_sync(delete_saved_search, current_user.id, search_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+# ==================== EXPORT ROUTES ====================
+
+@router.get("/api/export/jobs")
+async def export_jobs(
+    request: Request,
+    fmt: str = EXPORT_FORMAT,
+    category: str = None,
+    is_active: bool = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    include_archived: bool = True,
+    current_user: User = Depends(get_current_active_user_async)
+):
+    statements = export_jobs_statements(category, is_active, created_from, created_to, include_archived)
+    return export_response(request, statements, fmt, "jobs", asynchronous=True)
+
+@router.get("/api/export/applications")
+async def export_applications(
+    request: Request,
+    fmt: str = EXPORT_FORMAT,
+    application_status: str = Query(None, alias="status"),
+    job_id: int = None,
+    applied_from: datetime = None,
+    applied_to: datetime = None,
+    include_archived: bool = True,
+    current_user: User = Depends(get_current_active_user_async)
+):
+    statements = export_applications_statements(
+        current_user.id, application_status, job_id, applied_from, applied_to, include_archived
+    )
+    return export_response(request, statements, fmt, "job_applications", asynchronous=True)
@@ -1,14 +1,17 @@
 from datetime import datetime, timedelta
 from typing import Optional
 from jose import JWTError, jwt
-from passlib.context import CryptContext
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
 from sqlalchemy.orm import Session
+from sqlalchemy.ext.asyncio import AsyncSession
 import os
+import time
 from dotenv import load_dotenv
 
-from database import get_db, User
+from database import get_db, get_async_db, User
+from principals import token_cache, get_cached_user, get_cached_user_async
+from hashing import executor as hashing_executor, argon2_hash, argon2_verify, argon2_verify_and_update
 
 load_dotenv()
 
@@ -16,15 +19,26 @@ SECRET_KEY = os.getenv("SECRET_KEY", "your-secret-key-please-change-in-productio
 ALGORITHM = os.getenv("ALGORITHM", "HS256")
 ACCESS_TOKEN_EXPIRE_MINUTES = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "30"))
 
-# Using argon2 instead of bcrypt - no 72 byte limit!
-pwd_context = CryptContext(schemes=["argon2"], deprecated="auto")
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="login")
 
+# Argon2 runs in the hashing process pool; these raise 503 when its queue is full
+# or, for the sync ones, when too many threadpool threads already wait on it
+
 def verify_password(plain_password: str, hashed_password: str) -> bool:
-    return pwd_context.verify(plain_password, hashed_password)
+    return hashing_executor.run(argon2_verify, plain_password, hashed_password)
 
 def get_password_hash(password: str) -> str:
-    return pwd_context.hash(password)
+    return hashing_executor.run(argon2_hash, password)
+
+def verify_and_update_password(plain_password: str, hashed_password: str):
+    """Return (valid, new_hash); new_hash is set when the stored hash uses outdated parameters."""
+    return hashing_executor.run(argon2_verify_and_update, plain_password, hashed_password)
+
+async def get_password_hash_async(password: str) -> str:
+    return await hashing_executor.run_async(argon2_hash, password)
+
+async def verify_and_update_password_async(plain_password: str, hashed_password: str):
+    return await hashing_executor.run_async(argon2_verify_and_update, plain_password, hashed_password)
 
 def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     to_encode = data.copy()
@@ -36,26 +50,54 @@ def create_access_token(data: dict, expires_delta: Optional[timedelta] = None):
     encoded_jwt = jwt.encode(to_encode, SECRET_KEY, algorithm=ALGORITHM)
     return encoded_jwt
 
-def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
-    credentials_exception = HTTPException(
+def credentials_error() -> HTTPException:
+    return HTTPException(
         status_code=status.HTTP_401_UNAUTHORIZED,
         detail="Could not validate credentials",
         headers={"WWW-Authenticate": "Bearer"},
     )
+
+def decode_user_id(token: str) -> int:
+    # Verified claims are memoized until the token's own exp
+    user_id = token_cache.get(token)
+    if user_id is not None:
+        return user_id
+    
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        user_id: int = payload.get("sub")
-        if user_id is None:
-            raise credentials_exception
-    except JWTError:
-        raise credentials_exception
+        user_id = int(payload.get("sub"))
+    except (JWTError, TypeError, ValueError):
+        raise credentials_error()
+    
+    expires_in = payload["exp"] - time.time() if "exp" in payload else float("inf")
+    if expires_in > 0:
+        token_cache.set(token, user_id, ttl=expires_in)
+    return user_id
+
+def get_current_user(token: str = Depends(oauth2_scheme), db: Session = Depends(get_db)):
+    user_id = decode_user_id(token)
     
-    user = db.query(User).filter(User.id == user_id).first()
+    user = get_cached_user(db, user_id)
     if user is None:
-        raise credentials_exception
+        raise credentials_error()
     return user
 
 def get_current_active_user(current_user: User = Depends(get_current_user)):
+    if not current_user.is_active:
+        raise HTTPException(status_code=400, detail="Inactive user")
+    return current_user
+
+# ==================== ASYNC DEPENDENCIES ====================
+
+async def get_current_user_async(token: str = Depends(oauth2_scheme), db: AsyncSession = Depends(get_async_db)):
+    user_id = decode_user_id(token)
+    
+    user = await get_cached_user_async(db, user_id)
+    if user is None:
+        raise credentials_error()
+    return user
+
+async def get_current_active_user_async(current_user: User = Depends(get_current_user_async)):
     if not current_user.is_active:
         raise HTTPException(status_code=400, detail="Inactive user")
     return current_user
\ No newline at end of file
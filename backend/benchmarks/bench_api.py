@@ -0,0 +1,307 @@
+"""Throughput and p50/p95/p99 latency per API route, saved as JSON.
+
+Seeds a database with datagen.py, then drives the real app with N
+concurrent clients per route: in-process through httpx's ASGI transport
+("asgi", no network or server overhead) and over a live uvicorn ("live").
+Results go to a JSON file; --compare checks them against an earlier file
+and exits non-zero when a route got slower than --threshold allows.
+
+Runs against a temporary SQLite file by default, or any DATABASE_URL,
+e.g. a local Postgres (the tables there are dropped and re-seeded).
+
+Usage (from backend/):
+    python benchmarks/bench_api.py --output results/base.json
+    python benchmarks/bench_api.py --compare results/base.json --output results/new.json
+    python benchmarks/bench_api.py --database-url postgresql://localhost/jobfinder_bench --db-mode async
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from datetime import datetime
+
+from harness import BACKEND_DIR, percentile, start_server, wait_ready
+
+import httpx
+
+from datagen import seed
+
+QUERIES = ["python", "senior engineer", "remote designer", "data", "sales manager"]
+
+# ==================== ROUTES ====================
+# Each factory returns (method, path, request kwargs, expected status)
+
+class Workload:
+    def __init__(self, data: dict, tokens: dict, categories: list, rng: random.Random):
+        self.data = data
+        self.tokens = tokens
+        self.user_ids = list(tokens)
+        self.categories = categories
+        self.rng = rng
+        self._pairs = self._fresh_pairs()
+
+    def _headers(self, user_id=None):
+        user_id = user_id or self.rng.choice(self.user_ids)
+        return {"Authorization": f"Bearer {self.tokens[user_id]}"}
+
+    def _fresh_pairs(self):
+        # (user, job) pairs nobody applied for yet, shared by every target
+        applied = self.data["applied"]
+        for job_id in self.data["job_ids"]:
+            for user_id in self.user_ids:
+                if (user_id, job_id) not in applied:
+                    yield user_id, job_id
+
+    def login(self):
+        email = self.rng.choice(self.data["emails"])
+        return "POST", "/api/login", {"json": {"email": email, "password": self.data["password"]}}, 200
+
+    def jobs(self):
+        return "GET", "/api/jobs", {"params": {"limit": 20}}, 200
+
+    def jobs_filtered(self):
+        params = {"category": self.rng.choice(self.categories), "min_salary": 50000, "limit": 20}
+        return "GET", "/api/jobs", {"params": params}, 200
+
+    def jobs_search(self):
+        return "GET", "/api/jobs", {"params": {"q": self.rng.choice(QUERIES), "limit": 20}}, 200
+
+    def job_detail(self):
+        return "GET", f"/api/jobs/{self.rng.choice(self.data['active_job_ids'])}", {}, 200
+
+    def users_me(self):
+        return "GET", "/api/users/me", {"headers": self._headers()}, 200
+
+    def applications_me(self):
+        return "GET", "/api/applications/me", {"params": {"limit": 20}, "headers": self._headers()}, 200
+
+    def apply(self):
+        user_id, job_id = next(self._pairs)
+        return "POST", "/api/applications", {"json": {"job_id": job_id}, "headers": self._headers(user_id)}, 201
+
+ROUTES = {
+    "login": Workload.login,
+    "jobs": Workload.jobs,
+    "jobs_filtered": Workload.jobs_filtered,
+    "jobs_search": Workload.jobs_search,
+    "job_detail": Workload.job_detail,
+    "users_me": Workload.users_me,
+    "applications_me": Workload.applications_me,
+    "apply": Workload.apply,
+}
+
+# ==================== LOAD GENERATOR ====================
+
+async def drive(client: httpx.AsyncClient, request, concurrency: int, duration: float, warmup: float) -> dict:
+    """Run `concurrency` closed-loop workers issuing request() for warmup + duration seconds."""
+    latencies, statuses = [], Counter()
+    errors = 0
+    measure_from = time.monotonic() + warmup
+    deadline = measure_from + duration
+
+    async def worker():
+        nonlocal errors
+        while time.monotonic() < deadline:
+            try:
+                method, path, kwargs, expected = request()
+            except StopIteration:
+                return
+            started = time.perf_counter()
+            try:
+                response = await client.request(method, path, **kwargs)
+                status = response.status_code
+            except httpx.HTTPError:
+                status = "transport_error"
+            elapsed = time.perf_counter() - started
+            if time.monotonic() < measure_from:
+                continue
+            statuses[status] += 1
+            if status == expected:
+                latencies.append(elapsed)
+            else:
+                errors += 1
+
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    latencies.sort()
+    return {
+        "requests": len(latencies),
+        "errors": errors,
+        "statuses": {str(status): count for status, count in statuses.items()},
+        "throughput_rps": len(latencies) / duration,
+        # None rather than NaN when nothing succeeded, so the file stays valid JSON
+        **{
+            f"latency_ms_{name}": percentile(latencies, q) * 1000 if latencies else None
+            for name, q in (("p50", 0.50), ("p95", 0.95), ("p99", 0.99), ("max", 1.0))
+        },
+    }
+
+async def run_routes(client: httpx.AsyncClient, workload: Workload, args) -> dict:
+    # Resolve every token once so routes do not measure a cold principal cache
+    for user_id in workload.user_ids:
+        await client.get("/api/users/me", headers=workload._headers(user_id))
+
+    results = {}
+    for name in args.routes:
+        result = await drive(client, lambda: ROUTES[name](workload), args.concurrency, args.duration, args.warmup)
+        results[name] = result
+        print(f"  {name:<16} {result['throughput_rps']:>9.1f} "
+              + " ".join(f"{result[key]:>9.1f}" if result[key] is not None else f"{'-':>9}"
+                         for key in ("latency_ms_p50", "latency_ms_p95", "latency_ms_p99"))
+              + f" {result['errors']:>7}")
+    return results
+
+def limits(concurrency):
+    return httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+
+async def run_asgi(workload: Workload, args) -> dict:
+    from main import app
+
+    # ASGITransport does not send lifespan events
+    await app.router.startup()
+    try:
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=60) as client:
+            return await run_routes(client, workload, args)
+    finally:
+        await app.router.shutdown()
+
+def run_live(workload: Workload, args) -> dict:
+    server = start_server(dict(os.environ), args.port, workers=args.server_workers)
+    base_url = f"http://127.0.0.1:{args.port}"
+
+    async def run():
+        await wait_ready(base_url, timeout=60)
+        async with httpx.AsyncClient(base_url=base_url, limits=limits(args.concurrency), timeout=60) as client:
+            return await run_routes(client, workload, args)
+
+    try:
+        return asyncio.run(run())
+    finally:
+        server.terminate()
+        server.wait()
+
+# ==================== RESULTS ====================
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=BACKEND_DIR, capture_output=True, text=True, check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def compare(results: dict, baseline: dict, threshold: float) -> list:
+    """Return a line per (target, route) that regressed against baseline."""
+    regressions = []
+    for target, routes in results["targets"].items():
+        for name, current in routes.items():
+            previous = baseline.get("targets", {}).get(target, {}).get(name)
+            if not previous or not previous["requests"] or not current["requests"]:
+                continue
+            p99, base_p99 = current["latency_ms_p99"], previous["latency_ms_p99"]
+            rps, base_rps = current["throughput_rps"], previous["throughput_rps"]
+            print(f"  {target:<5} {name:<16} rps {base_rps:>9.1f} -> {rps:>9.1f}   "
+                  f"p99 ms {base_p99:>8.1f} -> {p99:>8.1f}")
+            if p99 > base_p99 * (1 + threshold) or rps < base_rps * (1 - threshold):
+                regressions.append(f"{target} {name}: rps {base_rps:.1f} -> {rps:.1f}, p99 {base_p99:.1f} -> {p99:.1f} ms")
+    return regressions
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", help="defaults to a temporary SQLite file")
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    parser.add_argument("--target", choices=["asgi", "live", "both"], default="both")
+    parser.add_argument("--routes", nargs="+", choices=list(ROUTES), default=list(ROUTES))
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--jobs", type=int, default=50000)
+    parser.add_argument("--applications", type=int, default=20, help="seeded applications per user")
+    parser.add_argument("--active-users", type=int, default=100, help="users whose tokens drive authenticated routes")
+    parser.add_argument("--concurrency", type=int, default=50)
+    parser.add_argument("--duration", type=float, default=10, help="measured seconds per route")
+    parser.add_argument("--warmup", type=float, default=2, help="unmeasured seconds per route")
+    parser.add_argument("--port", type=int, default=8766)
+    parser.add_argument("--server-workers", type=int, default=1)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", help="write results as JSON")
+    parser.add_argument("--compare", help="earlier JSON results to check for regressions")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed relative p99/throughput change")
+    args = parser.parse_args()
+
+    tmp = tempfile.TemporaryDirectory()
+    database_url = args.database_url or f"sqlite:///{tmp.name}/bench.db"
+    # Both the in-process app and the live server read these at import
+    os.environ["DATABASE_URL"] = database_url
+    os.environ["DB_MODE"] = args.db_mode
+    os.environ.pop("ASYNC_DATABASE_URL", None)
+
+    print(f"seeding {args.users} users, {args.jobs} jobs, {args.applications} applications per user")
+    data = seed(database_url, args.users, args.jobs, args.applications, args.seed, drop=True)
+    print(f"seeded in {data['seed_seconds']:.1f}s")
+
+    from auth import create_access_token
+    from datagen import CATEGORIES
+
+    rng = random.Random(args.seed)
+    tokens = {
+        user_id: create_access_token({"sub": str(user_id)})
+        for user_id in itertools.islice(data["user_ids"], args.active_users)
+    }
+    workload = Workload(data, tokens, CATEGORIES, rng)
+
+    results = {
+        "meta": {
+            "started_at": datetime.utcnow().isoformat(),
+            "git_revision": git_revision(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "cpus": os.cpu_count(),
+            "dialect": database_url.split(":", 1)[0].split("+", 1)[0],
+            "db_mode": args.db_mode,
+            "concurrency": args.concurrency,
+            "duration": args.duration,
+            "counts": data["counts"],
+        },
+        "targets": {},
+    }
+    targets = ["asgi", "live"] if args.target == "both" else [args.target]
+    header = f"  {'route':<16} {'req/s':>9} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'errors':>7}"
+    for target in targets:
+        print(f"{target} ({args.db_mode}, {results['meta']['dialect']}, concurrency {args.concurrency})")
+        print(header)
+        if target == "asgi":
+            results["targets"][target] = asyncio.run(run_asgi(workload, args))
+        else:
+            results["targets"][target] = run_live(workload, args)
+
+    if args.output:
+        os.makedirs(os.path.dirname(os.path.abspath(args.output)), exist_ok=True)
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2)
+        print(f"results written to {args.output}")
+    tmp.cleanup()
+
+    if args.compare:
+        with open(args.compare) as f:
+            baseline = json.load(f)
+        print(f"compared with {args.compare} ({baseline['meta'].get('git_revision')})")
+        for key in ("dialect", "db_mode", "concurrency", "cpus", "counts"):
+            if baseline["meta"].get(key) != results["meta"][key]:
+                print(f"  warning: {key} differs ({baseline['meta'].get(key)} vs {results['meta'][key]})")
+        regressions = compare(results, baseline, args.threshold)
+        if regressions:
+            print("REGRESSIONS:")
+            for line in regressions:
+                print(f"  {line}")
+            sys.exit(1)
+        print("no regressions")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Hot-table size and query latency before and after archiving closed jobs.
+
+Seeds a temporary SQLite file, closes --inactive-share of the jobs long
+enough ago to be archived, then measures the jobs table and its indexes
+(pages in use, from dbstat) and the latency of typical listing and
+application-history queries. Runs the archiver, reports its throughput,
+and measures again. Also compares the partial "newest" index with the
+full-table index it replaced.
+
+Usage (from backend/):
+    python benchmarks/bench_archive.py --jobs 200000 --inactive-share 0.7
+"""
+import argparse
+import os
+import statistics
+import tempfile
+import time
+from datetime import datetime, timedelta
+
+from harness import timed
+from datagen import seed
+
+def table_sizes(conn, table: str) -> dict:
+    from sqlalchemy import text
+
+    names = [table] + [row[0] for row in conn.execute(
+        text("SELECT name FROM sqlite_master WHERE type = 'index' AND tbl_name = :table"), {"table": table}
+    )]
+    return {
+        name: conn.execute(text("SELECT COALESCE(SUM(pgsize), 0) FROM dbstat WHERE name = :name"), {"name": name}).scalar()
+        for name in names
+    }
+
+def measure(bind, user_ids, repeat: int) -> dict:
+    from sqlalchemy import text
+    from sqlalchemy.orm import Session
+    from applications import list_applications
+    from jobs import list_jobs
+
+    with bind.connect() as conn:
+        sizes = table_sizes(conn, "jobs")
+        active, inactive = conn.execute(text("SELECT SUM(is_active = 1), SUM(is_active = 0) FROM jobs")).one()
+
+    db = Session(bind=bind)
+
+    def deep_page():
+        cursor = None
+        for _ in range(20):
+            _, cursor = list_jobs(db, limit=50, cursor=cursor)
+
+    cases = {
+        "newest, page 1": lambda: list_jobs(db, limit=20),
+        "category=tech": lambda: list_jobs(db, limit=20, category="tech"),
+        "location=Berlin": lambda: list_jobs(db, limit=20, location=["Berlin"]),
+        "min_salary sort=salary": lambda: list_jobs(db, limit=20, min_salary=100000, sort="salary"),
+        "20 cursor pages of 50": deep_page,
+        "count(*) active": lambda: db.execute(text("SELECT COUNT(*) FROM jobs WHERE is_active = 1")).scalar(),
+        "history expand=job": lambda: [list_applications(db, user_id, limit=100, expand_job=True) for user_id in user_ids[:20]],
+    }
+    latencies = {name: statistics.median(timed(fn, repeat, warmup=1)) * 1000 for name, fn in cases.items()}
+    db.close()
+    return {"active": active, "inactive": inactive or 0, "sizes": sizes, "latencies": latencies}
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200000)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--applications", type=int, default=50, help="seeded applications per user")
+    parser.add_argument("--inactive-share", type=float, default=0.7)
+    parser.add_argument("--batch-size", type=int, default=500)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/archive.db"
+        os.environ["DATABASE_URL"] = database_url
+        data = seed(database_url, users=args.users, jobs=args.jobs, applications=args.applications)
+
+        from sqlalchemy import text
+        from database import engine, init_db
+        from archive import archive_jobs
+        from facets import init_facets
+
+        init_db()
+        closed = datetime.utcnow() - timedelta(days=30)
+        with engine.begin() as conn:
+            conn.execute(text(
+                "UPDATE jobs SET is_active = 0, updated_at = :closed WHERE is_active = 0 OR abs(random()) % 10000 < :share"
+            ), {"closed": closed, "share": int(args.inactive_share * 10000)})
+        init_facets()
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+            # The full-table index the partial ix_jobs_live_created replaced
+            conn.execute(text("CREATE INDEX bench_full_created ON jobs (is_active, created_at, id)"))
+            full_index = table_sizes(conn, "jobs")["bench_full_created"]
+            conn.execute(text("DROP INDEX bench_full_created"))
+
+        before = measure(engine, data["user_ids"], args.repeat)
+        started = time.perf_counter()
+        jobs, applications = archive_jobs(engine, batch_size=args.batch_size)
+        archive_seconds = time.perf_counter() - started
+        with engine.begin() as conn:
+            conn.execute(text("ANALYZE"))
+        after = measure(engine, data["user_ids"], args.repeat)
+
+    print(f"{args.jobs:,} jobs: {before['active']:,} active, {before['inactive']:,} closed")
+    print(f"partial ix_jobs_live_created {before['sizes']['ix_jobs_live_created'] / 1e6:.1f} MB "
+          f"vs full-table (is_active, created_at, id) {full_index / 1e6:.1f} MB")
+    print(f"archived {jobs:,} jobs and {applications:,} applications in {archive_seconds:.1f} s "
+          f"({jobs / archive_seconds:,.0f} jobs/s, batches of {args.batch_size})")
+    print(f"\n{'jobs table / index':<34} {'before MB':>10} {'after MB':>10}")
+    for name, size in before["sizes"].items():
+        print(f"{name:<34} {size / 1e6:>10.1f} {after['sizes'].get(name, 0) / 1e6:>10.1f}")
+    total_before, total_after = sum(before["sizes"].values()), sum(after["sizes"].values())
+    print(f"{'total':<34} {total_before / 1e6:>10.1f} {total_after / 1e6:>10.1f}")
+    print(f"\n{'query (median ms)':<34} {'before':>10} {'after':>10}")
+    for name, latency in before["latencies"].items():
+        print(f"{name:<34} {latency:>10.2f} {after['latencies'][name]:>10.2f}")
+
+if __name__ == "__main__":
+    main()
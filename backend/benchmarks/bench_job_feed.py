@@ -0,0 +1,198 @@
+"""Fan-out latency of the live job feed to many subscribers.
+
+In-process: opens --subscribers subscriptions on one JobBroadcaster (half
+unfiltered, half following one category), each drained by its own task
+like a connection would be, plus a share of stalled subscribers that
+never read. Events are published from another thread, the way a sync
+create_job route does. Reports the time for one event to reach every
+queue, publish-to-receive latency per delivery, and checks that stalled
+subscribers are dropped without slowing the rest.
+
+--live additionally starts uvicorn, opens SSE and WebSocket clients on
+/api/jobs/stream and reports POST /api/jobs to event latency end to end;
+it needs the dev requirements (pip install -r requirements-dev.txt).
+
+Usage (from backend/):
+    python benchmarks/bench_job_feed.py --subscribers 10000 --events 200
+    python benchmarks/bench_job_feed.py --subscribers 10000 --live --live-clients 200
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+from harness import percentile_ms, start_server, wait_ready
+
+CATEGORIES = ["tech", "design", "sales", "marketing", "support", "finance", "operations", "healthcare"]
+
+async def in_process(args):
+    from job_feed import DROPPED, JobBroadcaster, LocalFeedBus
+    from serialization import dumps
+
+    broadcaster = JobBroadcaster(LocalFeedBus(), queue_size=args.queue_size, max_subscribers=args.subscribers)
+    broadcaster.start()
+    rng = random.Random(1)
+    sent_at = {}
+    latencies = []
+    dropped_stalled = 0
+
+    async def consume(subscription):
+        while True:
+            message = await subscription.queue.get()
+            if message is DROPPED:
+                return
+            latencies.append(time.perf_counter() - sent_at[id(message)])
+
+    stalled_count = int(args.subscribers * args.stalled)
+    consumers, stalled = [], []
+    for n in range(args.subscribers):
+        # Stalled subscribers follow everything, so they are sure to fill their queue
+        categories = None if n % 2 or n < stalled_count else [rng.choice(CATEGORIES)]
+        subscription = broadcaster.subscribe(categories)
+        if n < stalled_count:
+            stalled.append(subscription)
+        else:
+            consumers.append(asyncio.create_task(consume(subscription)))
+
+    def publish():
+        for n in range(args.events):
+            event = {"type": "job", "job": {"id": n, "category": rng.choice(CATEGORIES), "position": "Engineer"},
+                     "published_at": time.time()}
+            message = dumps(event)
+            sent_at[id(message)] = time.perf_counter()
+            broadcaster.bus.publish(message)
+            time.sleep(1 / args.rate)
+
+    started = time.perf_counter()
+    publisher = threading.Thread(target=publish)
+    publisher.start()
+    while publisher.is_alive():
+        await asyncio.sleep(0.05)
+    # Let the consumers drain what is still queued
+    for _ in range(100):
+        await asyncio.sleep(0.05)
+        if all(subscription.queue.empty() for subscription in broadcaster._all() if subscription not in stalled):
+            break
+    elapsed = time.perf_counter() - started
+    for subscription in stalled:
+        if subscription.queue.qsize() == 1 and subscription.queue.get_nowait() is DROPPED:
+            dropped_stalled += 1
+    for task in consumers:
+        task.cancel()
+
+    metrics = broadcaster.metrics()
+    latencies.sort()
+    print(f"subscribers {args.subscribers} ({stalled_count} stalled), events {args.events} at {args.rate}/s, "
+          f"queue size {args.queue_size}")
+    print(f"  deliveries          {len(latencies):>10}  ({len(latencies) / elapsed:,.0f}/s)")
+    print(f"  fan-out per event   p50 {metrics['fanout_latency_ms_p50']:8.2f} ms   p99 {metrics['fanout_latency_ms_p99']:8.2f} ms")
+    print(f"  publish -> receive  p50 {percentile_ms(latencies, 0.50):8.2f} ms   p95 {percentile_ms(latencies, 0.95):8.2f} ms   "
+          f"p99 {percentile_ms(latencies, 0.99):8.2f} ms   max {percentile_ms(latencies, 1.0):8.2f} ms")
+    print(f"  stalled dropped     {dropped_stalled}/{stalled_count}, total dropped {metrics['dropped']}")
+    if stalled_count and args.events > args.queue_size and dropped_stalled != stalled_count:
+        print("FAIL: stalled subscribers were not all dropped")
+        sys.exit(1)
+
+# ==================== LIVE ====================
+
+async def live(args):
+    import httpx
+    import websockets
+    from auth import create_access_token
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env = dict(os.environ, DATABASE_URL=f"sqlite:///{tmp}/feed.db", HASH_WORKERS="0",
+                   JOB_FEED_MAX_SUBSCRIBERS=str(args.live_clients * 2 + 10))
+        env.pop("ASYNC_DATABASE_URL", None)
+        server = start_server(env, args.port)
+        base_url = f"http://127.0.0.1:{args.port}"
+        try:
+            await wait_ready(base_url)
+            async with httpx.AsyncClient(base_url=base_url, timeout=30) as client:
+                # The database was created on startup; seed a poster directly
+                from sqlalchemy import create_engine, insert
+                from database import User
+                bind = create_engine(env["DATABASE_URL"])
+                with bind.begin() as conn:
+                    user_id = conn.execute(insert(User).returning(User.id), {
+                        "first_name": "Feed", "last_name": "Bench", "email": "feed@example.com",
+                        "password_hash": "unused", "verified": True, "is_active": True,
+                    }).scalar()
+                bind.dispose()
+                headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+
+                latencies = {"sse": [], "websocket": []}
+                posted_at = {}
+                connected = 0
+
+                async def sse_client():
+                    nonlocal connected
+                    limits = httpx.Limits(max_connections=1)
+                    async with httpx.AsyncClient(base_url=base_url, timeout=None, limits=limits) as sse:
+                        async with sse.stream("GET", "/api/jobs/stream") as response:
+                            connected += 1
+                            async for line in response.aiter_lines():
+                                if line.startswith("data: ") and line != "data: {}":
+                                    job = json.loads(line[6:])["job"]
+                                    latencies["sse"].append(time.perf_counter() - posted_at[job["company_name"]])
+
+                async def websocket_client():
+                    nonlocal connected
+                    async with websockets.connect(f"ws://127.0.0.1:{args.port}/api/jobs/stream") as ws:
+                        connected += 1
+                        async for message in ws:
+                            job = json.loads(message)["job"]
+                            latencies["websocket"].append(time.perf_counter() - posted_at[job["company_name"]])
+
+                clients = [asyncio.create_task(sse_client()) for _ in range(args.live_clients)]
+                clients += [asyncio.create_task(websocket_client()) for _ in range(args.live_clients)]
+                while connected < len(clients):
+                    await asyncio.sleep(0.1)
+
+                for n in range(args.live_events):
+                    name = f"Company {n}"
+                    posted_at[name] = time.perf_counter()
+                    response = await client.post("/api/jobs", headers=headers, json={
+                        "company_name": name, "position": "Engineer", "location": "Remote", "category": "tech",
+                    })
+                    response.raise_for_status()
+                    await asyncio.sleep(1 / args.rate)
+                await asyncio.sleep(1)
+                for task in clients:
+                    task.cancel()
+                await asyncio.gather(*clients, return_exceptions=True)
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"live: {args.live_clients} SSE + {args.live_clients} WebSocket clients, {args.live_events} posts")
+    for transport, values in latencies.items():
+        values.sort()
+        expected = args.live_clients * args.live_events
+        print(f"  {transport:<10} received {len(values)}/{expected}   POST -> event p50 {percentile_ms(values, 0.5):8.2f} ms   "
+              f"p99 {percentile_ms(values, 0.99):8.2f} ms")
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--subscribers", type=int, default=10000)
+    parser.add_argument("--events", type=int, default=200)
+    parser.add_argument("--rate", type=float, default=50, help="events per second")
+    parser.add_argument("--queue-size", type=int, default=100)
+    parser.add_argument("--stalled", type=float, default=0.01, help="share of subscribers that never read")
+    parser.add_argument("--live", action="store_true")
+    parser.add_argument("--live-clients", type=int, default=100, help="per transport")
+    parser.add_argument("--live-events", type=int, default=50)
+    parser.add_argument("--port", type=int, default=8767)
+    args = parser.parse_args()
+
+    asyncio.run(in_process(args))
+    if args.live:
+        asyncio.run(live(args))
+
+if __name__ == "__main__":
+    main()
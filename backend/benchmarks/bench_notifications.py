@@ -0,0 +1,106 @@
+"""Notification queue throughput against a local aiosmtpd stand-in.
+
+Starts an in-process SMTP sink (optionally refusing a share of recipients
+to exercise retries), pushes messages through NotificationQueue with the
+SMTP transport and reports delivery metrics. With --serve it only runs the
+sink, for local development with NOTIFY_TRANSPORT=smtp.
+
+Usage (from backend/):
+    python benchmarks/bench_notifications.py --messages 5000 --workers 4 --fail-rate 0.05
+    python benchmarks/bench_notifications.py --serve --port 8025
+"""
+import argparse
+import json
+import os
+import random
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+try:
+    from aiosmtpd.controller import Controller
+except ImportError:
+    sys.exit("aiosmtpd is required: pip install -r requirements-dev.txt")
+
+import notifications
+from notifications import Notification, NotificationQueue, SMTPTransport
+
+class Sink:
+    def __init__(self, fail_rate: float, verbose: bool):
+        self.fail_rate = fail_rate
+        self.verbose = verbose
+        self.received = 0
+        self.refused = 0
+        self._lock = threading.Lock()
+
+    async def handle_RCPT(self, server, session, envelope, address, rcpt_options):
+        if random.random() < self.fail_rate:
+            with self._lock:
+                self.refused += 1
+            return "451 Try again later"
+        envelope.rcpt_tos.append(address)
+        return "250 OK"
+
+    async def handle_DATA(self, server, session, envelope):
+        with self._lock:
+            self.received += 1
+        if self.verbose:
+            print(f"{envelope.mail_from} -> {', '.join(envelope.rcpt_tos)}")
+            print(envelope.content.decode("utf-8", "replace"))
+        return "250 Message accepted"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--messages", type=int, default=2000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--batch-size", type=int, default=50)
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="share of recipients refused with a 451")
+    parser.add_argument("--port", type=int, default=8025)
+    parser.add_argument("--serve", action="store_true", help="only run the SMTP sink")
+    args = parser.parse_args()
+
+    sink = Sink(args.fail_rate, verbose=args.serve)
+    controller = Controller(sink, hostname="127.0.0.1", port=args.port)
+    controller.start()
+    try:
+        if args.serve:
+            print(f"SMTP sink listening on 127.0.0.1:{args.port}; Ctrl+C to stop")
+            while True:
+                time.sleep(3600)
+
+        # Retries come back quickly so the run finishes in reasonable time
+        notifications.NOTIFY_RETRY_BASE_SECONDS = 0.05
+        transport = SMTPTransport(host="127.0.0.1", port=args.port, pool_size=args.workers)
+        outbox = NotificationQueue(transport, workers=args.workers, batch_size=args.batch_size,
+                                   queue_size=args.messages)
+        outbox.start()
+        started = time.perf_counter()
+        for n in range(args.messages):
+            outbox.enqueue(Notification(f"user{n}@example.com", "Verification code", f"Your code is {n:06d}"))
+        enqueued = time.perf_counter() - started
+
+        while True:
+            metrics = outbox.metrics()
+            if metrics["sent"] + metrics["failed"] >= args.messages:
+                break
+            time.sleep(0.01)
+        elapsed = time.perf_counter() - started
+        outbox.stop()
+
+        metrics.update(
+            enqueue_us_per_message=enqueued / args.messages * 1e6,
+            messages_per_second=args.messages / elapsed,
+            smtp_connections_opened=transport.connections_opened,
+            sink_received=sink.received,
+            sink_refused=sink.refused,
+        )
+        print(json.dumps(metrics, indent=2))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        controller.stop()
+
+if __name__ == "__main__":
+    main()
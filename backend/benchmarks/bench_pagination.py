@@ -0,0 +1,64 @@
+"""Page latency for OFFSET vs keyset (cursor) pagination at increasing depth.
+
+Usage (from backend/):
+    python benchmarks/bench_pagination.py --jobs 200000 --pages 1 100 1000 5000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+from datetime import datetime, timedelta
+
+from harness import insert_rows, timed
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database import Base, Job
+from pagination import paginate_jobs, encode_cursor
+
+def seed(bind, size, rng):
+    started = datetime(2024, 1, 1)
+    insert_rows(bind, Job, (
+        {
+            "company_name": f"Company {n}",
+            "position": "Engineer",
+            "location": "Remote",
+            "category": rng.choice(["tech", "design", "sales"]),
+            "is_active": True,
+            "created_at": started + timedelta(seconds=n),
+        }
+        for n in range(size)
+    ))
+
+def measure(fn, repeat):
+    return statistics.median(timed(fn, repeat)) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=200000)
+    parser.add_argument("--pages", type=int, nargs="+", default=[1, 100, 1000, 5000])
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        bind = create_engine(f"sqlite:///{tmp}/bench.db")
+        Base.metadata.create_all(bind=bind)
+        seed(bind, args.jobs, random.Random(42))
+
+        print(f"{'page':>6} {'offset ms':>10} {'cursor ms':>10}")
+        with Session(bind=bind) as db:
+            base = db.query(Job).filter(Job.is_active == True, Job.category == "tech")
+            for page in args.pages:
+                skip = (page - 1) * args.limit
+                # The cursor for page N is the key of the last row on page N - 1
+                previous = base.order_by(Job.created_at.desc(), Job.id.desc()).offset(skip - 1).first() if skip else None
+                cursor = encode_cursor(previous) if previous else None
+                offset_ms = measure(lambda: paginate_jobs(base, args.limit, skip=skip), args.repeat)
+                cursor_ms = measure(lambda: paginate_jobs(base, args.limit, cursor=cursor), args.repeat)
+                print(f"{page:>6} {offset_ms:>10.2f} {cursor_ms:>10.2f}")
+        bind.dispose()
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,144 @@
+"""Saved-search percolation against a large number of saved searches.
+
+Builds the reverse index from --searches random saved searches, then
+matches --jobs random postings against it and reports build time and
+memory, match latency, and how many index entries each match looked at
+compared with the number it returned. A sample of postings is also
+matched by scanning every search, to check both give the same result
+and to show what the index saves. --from-db stores the searches in a
+temporary SQLite file and times the startup load instead.
+
+Usage (from backend/):
+    python benchmarks/bench_percolator.py --searches 1000000 --jobs 5000
+    python benchmarks/bench_percolator.py --searches 1000000 --from-db
+"""
+import argparse
+import os
+import random
+import resource
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from harness import percentile
+from datagen import CATEGORIES, CITIES, JOB_TYPES, _job
+
+def random_search(rng: random.Random, search_id: int) -> tuple:
+    """An INDEX_COLUMNS row; users mostly filter on category, often on place, rarely on type."""
+    category = rng.choice(CATEGORIES) if rng.random() < 0.7 else None
+    location = rng.choice(CITIES) if rng.random() < 0.5 else None
+    job_type = rng.choice(JOB_TYPES) if rng.random() < 0.3 else None
+    min_salary = max_salary = None
+    kind = rng.random()
+    if kind < 0.4:
+        min_salary = rng.randrange(30, 150) * 1000
+    elif kind < 0.5:
+        max_salary = rng.randrange(40, 200) * 1000
+    elif kind < 0.65:
+        min_salary = rng.randrange(30, 150) * 1000
+        max_salary = min_salary + rng.randrange(10, 60) * 1000
+    if not (category or location or job_type or min_salary or max_salary):
+        category = rng.choice(CATEGORIES)
+    return (search_id, category, location, job_type, min_salary, max_salary)
+
+def scan(searches, job: dict) -> set:
+    """Reference matcher: every search, checked one by one."""
+    matched = set()
+    for search_id, category, location, job_type, min_salary, max_salary in searches:
+        if category is not None and category != job["category"]:
+            continue
+        if location is not None and location != job["location"]:
+            continue
+        if job_type is not None and job_type != job["job_type"]:
+            continue
+        if min_salary is not None and (job["salary_max"] is None or job["salary_max"] < min_salary):
+            continue
+        if max_salary is not None and (job["salary_min"] is None or job["salary_min"] > max_salary):
+            continue
+        matched.add(search_id)
+    return matched
+
+def rss_mb() -> float:
+    # ru_maxrss is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--searches", type=int, default=1000000)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--verify", type=int, default=50, help="postings also matched by a full scan")
+    parser.add_argument("--from-db", action="store_true")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    searches = [random_search(rng, n + 1) for n in range(args.searches)]
+
+    if args.from_db:
+        tmp = tempfile.mkdtemp()
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/percolator.db"
+    from sqlalchemy import insert
+    from database import Base, SavedSearch, User, engine
+    from saved_searches import PercolatorIndex, percolator, sync_saved_searches
+
+    if args.from_db:
+        Base.metadata.create_all(bind=engine)
+        columns = ["id", "category", "location", "job_type", "min_salary", "max_salary"]
+        with engine.begin() as conn:
+            conn.execute(insert(User), {"first_name": "Bench", "last_name": "User", "email": "bench@example.com",
+                                         "password_hash": "unused", "verified": True, "is_active": True})
+            for i in range(0, len(searches), 50000):
+                conn.execute(insert(SavedSearch), [
+                    dict(zip(columns, row), user_id=1, created_at=datetime.utcnow())
+                    for row in searches[i:i + 50000]
+                ])
+        index = percolator
+        before = rss_mb()
+        started = time.perf_counter()
+        sync_saved_searches(engine)
+        build_seconds = time.perf_counter() - started
+    else:
+        index = PercolatorIndex()
+        before = rss_mb()
+        started = time.perf_counter()
+        index.load(searches)
+        build_seconds = time.perf_counter() - started
+    print(f"{len(index):,} saved searches in {index.metrics()['buckets']:,} buckets, "
+          f"{'loaded from SQLite' if args.from_db else 'built'} in {build_seconds:.2f} s, "
+          f"~{rss_mb() - before:,.0f} MB peak RSS growth")
+
+    now = datetime.utcnow()
+    jobs = [_job(rng, n, now) for n in range(args.jobs)]
+    latencies, matches, candidates = [], [], []
+    for job in jobs:
+        started = time.perf_counter()
+        matched, looked_at = index.match(job["category"], job["location"], job["job_type"],
+                                         job["salary_min"], job["salary_max"])
+        latencies.append(time.perf_counter() - started)
+        matches.append(len(matched))
+        candidates.append(looked_at)
+    latencies.sort()
+    print(f"percolate {args.jobs:,} postings: p50 {percentile(latencies, 0.5) * 1000:.2f} ms   "
+          f"p99 {percentile(latencies, 0.99) * 1000:.2f} ms   max {latencies[-1] * 1000:.2f} ms   "
+          f"({args.jobs / sum(latencies):,.0f} postings/s)")
+    print(f"  matches per posting      mean {sum(matches) / len(matches):,.0f}   max {max(matches):,}")
+    print(f"  entries looked at        mean {sum(candidates) / len(candidates):,.0f}   "
+          f"({sum(candidates) / max(sum(matches), 1):.2f} per match, {sum(candidates) / len(candidates) / len(index):.2%} of the index)")
+
+    scan_seconds = 0.0
+    for job in jobs[:args.verify]:
+        started = time.perf_counter()
+        expected = scan(searches, job)
+        scan_seconds += time.perf_counter() - started
+        matched, _ = index.match(job["category"], job["location"], job["job_type"], job["salary_min"], job["salary_max"])
+        if set(matched) != expected or len(matched) != len(expected):
+            print(f"MISMATCH for {job}: index {len(matched)}, scan {len(expected)}")
+            sys.exit(1)
+    if args.verify:
+        index_seconds = sum(latencies) / len(latencies)
+        print(f"full scan: {scan_seconds / args.verify * 1000:.1f} ms per posting "
+              f"({scan_seconds / args.verify / index_seconds:,.0f}x the index); results identical on {args.verify} postings")
+
+if __name__ == "__main__":
+    main()
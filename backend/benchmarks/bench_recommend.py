@@ -0,0 +1,59 @@
+"""Recommendation scoring latency over a large synthetic catalogue.
+
+Usage (from backend/):
+    python benchmarks/bench_recommend.py --jobs 100000 --seeds 5
+"""
+import argparse
+import random
+import statistics
+import time
+from types import SimpleNamespace
+
+from harness import percentile, timed
+
+from recommender import TfidfRecommender, job_terms
+
+WORDS = [f"term{n}" for n in range(5000)]
+CATEGORIES = ["tech", "design", "sales", "marketing", "support", "finance"]
+
+def fake_job(rng):
+    return SimpleNamespace(
+        position=" ".join(rng.sample(WORDS[:500], 3)),
+        description=" ".join(rng.choices(WORDS, k=60)),
+        requirements=" ".join(rng.choices(WORDS, k=20)),
+        category=rng.choice(CATEGORIES),
+    )
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=100000)
+    parser.add_argument("--seeds", type=int, default=5)
+    parser.add_argument("--limit", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    recommender = TfidfRecommender()
+    started = time.perf_counter()
+    for job_id in range(args.jobs):
+        recommender.add(job_id, job_terms(fake_job(rng)))
+    build_seconds = time.perf_counter() - started
+
+    # Incremental append cost, as paid by create_job
+    started = time.perf_counter()
+    for job_id in range(args.jobs, args.jobs + 1000):
+        recommender.add(job_id, job_terms(fake_job(rng)))
+    append_us = (time.perf_counter() - started) / 1000 * 1e6
+
+    def score():
+        seeds = rng.sample(range(args.jobs), args.seeds)
+        recommender.recommend(seeds, limit=args.limit, exclude=seeds)
+
+    timings = timed(score, args.repeat)
+
+    print(f"jobs={len(recommender)} vocabulary={len(recommender.vocabulary)}")
+    print(f"build: {build_seconds:.1f}s  append: {append_us:.0f}us/job")
+    print(f"score p50: {statistics.median(timings) * 1000:.2f}ms  p95: {percentile(timings, 0.95) * 1000:.2f}ms")
+
+if __name__ == "__main__":
+    main()
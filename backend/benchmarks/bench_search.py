@@ -0,0 +1,74 @@
+"""Full-text search latency at increasing catalogue sizes.
+
+Usage (from backend/):
+    python benchmarks/bench_search.py --sizes 10000 100000 1000000
+"""
+import argparse
+import random
+import statistics
+import tempfile
+
+from harness import insert_rows, percentile, timed
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from database import Base, Job
+import search
+
+WORDS = (
+    "python java golang rust react flutter kotlin swift backend frontend mobile data "
+    "engineer developer designer manager senior junior remote cloud aws docker kubernetes "
+    "postgres sql api design product marketing sales support analyst security devops"
+).split()
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Wonka"]
+QUERIES = ["python", "senior backend engineer", "flutter mobile", "remote devops kubernetes", "designer"]
+
+def fake_job(rng):
+    return {
+        "company_name": rng.choice(COMPANIES),
+        "position": " ".join(rng.sample(WORDS, 3)),
+        "location": "Remote",
+        "category": rng.choice(["tech", "design", "sales"]),
+        "description": " ".join(rng.choices(WORDS, k=40)),
+        "requirements": " ".join(rng.choices(WORDS, k=15)),
+        "is_active": True,
+    }
+
+def seed(bind, size, rng):
+    insert_rows(bind, Job, (fake_job(rng) for _ in range(size)))
+
+def measure(fn, repeat):
+    timings = timed(fn, repeat)
+    return statistics.median(timings) * 1000, percentile(timings, 0.95) * 1000
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000, 1000000])
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--limit", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'backend':<8} {'jobs':>9} {'query':<26} {'p50 ms':>8} {'p95 ms':>8}")
+    for size in args.sizes:
+        with tempfile.TemporaryDirectory() as tmp:
+            bind = create_engine(f"sqlite:///{tmp}/bench.db")
+            Base.metadata.create_all(bind=bind)
+            search.init_search(bind)
+            seed(bind, size, rng)
+
+            index = search.InMemoryJobIndex()
+            with Session(bind=bind) as db:
+                for row in db.query(Job.id, *[getattr(Job, name) for name in search.SEARCH_FIELDS]).yield_per(10000):
+                    index.add(row.id, {name: getattr(row, name) for name in search.SEARCH_FIELDS})
+
+                for q in QUERIES:
+                    fts = measure(lambda: search.search_jobs(db, q, limit=args.limit), args.repeat)
+                    mem = measure(lambda: index.search(q)[:args.limit], args.repeat)
+                    print(f"{'fts5':<8} {size:>9} {q:<26} {fts[0]:>8.2f} {fts[1]:>8.2f}")
+                    print(f"{'memory':<8} {size:>9} {q:<26} {mem[0]:>8.2f} {mem[1]:>8.2f}")
+            bind.dispose()
+
+if __name__ == "__main__":
+    main()
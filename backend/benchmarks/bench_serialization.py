@@ -0,0 +1,133 @@
+"""CPU per request for list endpoints, SERIALIZATION_MODE=pydantic vs =fast.
+
+Seeds a temporary SQLite file, then runs each mode in its own process
+(the mode is read at import) and measures process CPU time per request,
+both for the whole request through the ASGI app and for the handler's
+query + serialization alone. The response cache is disabled so every
+request is really served. Also checks both modes return identical bodies.
+
+Usage (from backend/):
+    python benchmarks/bench_serialization.py --jobs 20000 --requests 300
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import subprocess
+import sys
+import tempfile
+import time
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+CASES = {
+    "jobs limit=20": ("/api/jobs", {"limit": 20}),
+    "jobs limit=100": ("/api/jobs", {"limit": 100}),
+    "jobs category limit=100": ("/api/jobs", {"category": "tech", "limit": 100}),
+    "applications limit=100": ("/api/applications/me", {"limit": 100}),
+    "applications expand=job limit=100": ("/api/applications/me", {"limit": 100, "expand": "job"}),
+}
+
+def measure_child(args):
+    import httpx
+    from main import app
+    from auth import create_access_token
+    from database import SessionLocal
+    from jobs import list_jobs, serialize_jobs
+    from applications import list_applications, serialize_applications
+
+    headers = {"Authorization": f"Bearer {create_access_token({'sub': str(args.user_id)})}"}
+
+    def handler(path, params):
+        db = SessionLocal()
+        try:
+            if path == "/api/jobs":
+                jobs, _ = list_jobs(db, limit=params["limit"], category=params.get("category"))
+                return serialize_jobs(jobs)
+            applications, _ = list_applications(
+                db, args.user_id, limit=params["limit"], expand_job=params.get("expand") == "job"
+            )
+            return serialize_applications(applications)
+        finally:
+            db.close()
+
+    async def run():
+        await app.router.startup()
+        results = {}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", headers=headers) as client:
+            for name, (path, params) in CASES.items():
+                body = (await client.get(path, params=params)).content
+                started_cpu, started = time.process_time(), time.perf_counter()
+                for _ in range(args.requests):
+                    response = await client.get(path, params=params)
+                    assert response.status_code == 200, response.text
+                request_cpu = (time.process_time() - started_cpu) / args.requests
+                request_wall = (time.perf_counter() - started) / args.requests
+
+                started_cpu = time.process_time()
+                for _ in range(args.requests):
+                    handler(path, params)
+                handler_cpu = (time.process_time() - started_cpu) / args.requests
+                results[name] = {
+                    "request_cpu_ms": request_cpu * 1000,
+                    "request_wall_ms": request_wall * 1000,
+                    "handler_cpu_ms": handler_cpu * 1000,
+                    "bytes": len(body),
+                    "body_sha": hashlib.sha256(body).hexdigest(),
+                }
+        await app.router.shutdown()
+        return results
+
+    print(json.dumps(asyncio.run(run())))
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--requests", type=int, default=300)
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    # Internal: run one mode against an already seeded database
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("--user-id", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        measure_child(args)
+        return
+
+    from datagen import seed
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/serialization.db"
+        data = seed(database_url, users=10, jobs=args.jobs, applications=200)
+        results = {}
+        for mode in ("pydantic", "fast"):
+            env = dict(os.environ, DATABASE_URL=database_url, DB_MODE=args.db_mode, SERIALIZATION_MODE=mode,
+                       RESPONSE_CACHE_BYTES="0", HASH_WORKERS="0")
+            env.pop("ASYNC_DATABASE_URL", None)
+            output = subprocess.run(
+                [sys.executable, os.path.abspath(__file__), "--child", "--requests", str(args.requests),
+                 "--user-id", str(data["user_ids"][0])],
+                cwd=tmp, env=env, capture_output=True, text=True, check=True,
+            ).stdout
+            results[mode] = json.loads(output.strip().splitlines()[-1])
+
+    print(f"CPU ms per request ({args.db_mode}, {args.requests} requests per case)")
+    print(f"{'case':<36} {'request pyd':>11} {'request fast':>12} {'handler pyd':>11} {'handler fast':>12} {'speedup':>8}")
+    mismatched = []
+    for name in CASES:
+        before, after = results["pydantic"][name], results["fast"][name]
+        print(f"{name:<36} {before['request_cpu_ms']:>11.2f} {after['request_cpu_ms']:>12.2f} "
+              f"{before['handler_cpu_ms']:>11.2f} {after['handler_cpu_ms']:>12.2f} "
+              f"{before['request_cpu_ms'] / after['request_cpu_ms']:>7.2f}x")
+        if before["body_sha"] != after["body_sha"]:
+            mismatched.append(name)
+    if mismatched:
+        print(f"BODIES DIFFER: {', '.join(mismatched)}")
+        sys.exit(1)
+    print("bodies identical in both modes")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""Autocomplete lookup latency and memory at increasing numbers of distinct values.
+
+Usage (from backend/):
+    python benchmarks/bench_suggest.py --sizes 10000 100000
+"""
+import argparse
+import random
+import string
+import time
+
+from harness import percentile
+
+from suggest import PrefixIndex
+
+WORDS = (
+    "senior junior lead staff principal python java golang rust react flutter data "
+    "backend frontend mobile cloud security platform product marketing sales support "
+    "engineer developer designer manager analyst scientist architect consultant"
+).split()
+
+def fake_value(rng):
+    return " ".join(rng.choice(WORDS) for _ in range(rng.randint(2, 4))) + f" {rng.randint(1, 10**6)}"
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--lookups", type=int, default=20000)
+    parser.add_argument("--limit", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    print(f"{'values':>10} {'build s':>9} {'MiB':>8} {'p50 us':>8} {'p99 us':>8} {'add us':>8}")
+    for size in args.sizes:
+        rows = [(fake_value(rng), rng.randint(1, 500)) for _ in range(size)]
+        rows.sort(key=lambda row: -row[1])
+        index = PrefixIndex(max_values=size * 2)
+
+        started = time.perf_counter()
+        index.load(rows)
+        build = time.perf_counter() - started
+
+        # Mix of keystroke lengths, as a search box would send them
+        prefixes = []
+        for _ in range(args.lookups):
+            word = rng.choice(WORDS)
+            prefixes.append(word[:rng.randint(1, len(word))] if rng.random() < 0.9 else rng.choice(string.ascii_lowercase))
+        timings = []
+        for prefix in prefixes:
+            started = time.perf_counter()
+            index.top(prefix, args.limit)
+            timings.append(time.perf_counter() - started)
+
+        adds = []
+        for _ in range(1000):
+            started = time.perf_counter()
+            index.add(fake_value(rng))
+            adds.append(time.perf_counter() - started)
+        timings.sort()
+        adds.sort()
+
+        print(f"{size:>10} {build:>9.2f} {index.approx_bytes / 2**20:>8.1f} "
+              f"{percentile(timings, 0.5) * 1e6:>8.1f} {percentile(timings, 0.99) * 1e6:>8.1f} "
+              f"{percentile(adds, 0.5) * 1e6:>8.1f}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+"""Check that the write-behind application writer survives losing its database.
+
+Runs an ApplicationWriter over a bind whose connect() fails --failures
+times, the first time only once --queued applications are waiting. Checks
+that those applications fail with the connection error instead of hanging,
+that the writer reconnects with backoff, and that applications submitted
+once it is back are committed. Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_application_writer.py --failures 3 --queued 5
+"""
+import argparse
+import os
+import sys
+import tempfile
+import threading
+
+from harness import insert_rows
+
+TIMEOUT_SECONDS = 10
+
+class ConnectFailed(Exception):
+    pass
+
+class FlakyBind:
+    """Delegates to an engine, but its first connects raise once the gate opens."""
+
+    def __init__(self, bind, failures: int):
+        self.bind = bind
+        self.failures = failures
+        self.gate = threading.Event()
+        self.connected = threading.Event()
+
+    def connect(self):
+        self.gate.wait()
+        if self.failures > 0:
+            self.failures -= 1
+            raise ConnectFailed("database unreachable")
+        connection = self.bind.connect()
+        self.connected.set()
+        return connection
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--failures", type=int, default=3)
+    parser.add_argument("--queued", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/writer.db"
+        from sqlalchemy import func, select
+        from database import Job, JobApplication, User, engine, init_db
+        import applications
+        from instrumentation import metrics
+
+        init_db()
+        users = 2 * args.queued
+        insert_rows(engine, User, (
+            {"first_name": "Writer", "last_name": str(n), "email": f"writer{n}@example.com",
+             "password_hash": "unused", "verified": True, "is_active": True}
+            for n in range(users)
+        ))
+        insert_rows(engine, Job, [{"company_name": "Acme", "position": "Engineer", "location": "Remote"}])
+        job_id = 1
+
+        applications.APPLICATION_RECONNECT_BASE_SECONDS = 0.05
+        bind = FlakyBind(engine, args.failures)
+        writer = applications.ApplicationWriter(flush_ms=1, bind=bind)
+        problems = []
+        try:
+            waiting = [writer.submit(user_id, job_id) for user_id in range(1, args.queued + 1)]
+            bind.gate.set()
+            for future in waiting:
+                try:
+                    future.result(timeout=TIMEOUT_SECONDS)
+                    problems.append("an application queued while the database was down was reported as written")
+                except ConnectFailed:
+                    pass
+                except TimeoutError:
+                    problems.append(f"an application queued while the database was down hung for {TIMEOUT_SECONDS}s")
+
+            if not bind.connected.wait(TIMEOUT_SECONDS):
+                problems.append(f"the writer did not reconnect within {TIMEOUT_SECONDS}s")
+            later = [writer.submit(user_id, job_id) for user_id in range(args.queued + 1, users + 1)]
+            for future in later:
+                try:
+                    future.result(timeout=TIMEOUT_SECONDS)
+                except Exception as exc:
+                    problems.append(f"an application submitted after the outage failed: {exc!r}")
+        finally:
+            writer.stop()
+
+        with engine.connect() as conn:
+            written = conn.execute(select(func.count()).select_from(JobApplication)).scalar()
+        engine.dispose()
+
+    stats = writer.metrics()
+    print(f"reconnects {stats['reconnects']}   rows written {written}   "
+          f"failures reported {metrics.background_failures['applications']}")
+    if stats["reconnects"] != args.failures:
+        problems.append(f"expected {args.failures} reconnects, got {stats['reconnects']}")
+    if written != users - args.queued:
+        problems.append(f"expected {users - args.queued} rows, found {written}")
+    if metrics.background_failures["applications"] != args.failures:
+        problems.append("connection failures were not reported")
+    for problem in problems[:10]:
+        print(f"  FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
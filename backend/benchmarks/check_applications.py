@@ -0,0 +1,157 @@
+"""Fire thousands of parallel job applications and check nothing is duplicated.
+
+Each (user, job) pair is submitted several times at once, alongside
+applications for a job that does not exist. The script checks that exactly
+one submit per pair got a 201, the rest got 400 or 404, and the table holds
+one row per pair. It reports throughput for APPLICATION_WRITE_MODE=direct
+and =write_behind, each against a live uvicorn. Exits non-zero on any
+correctness failure.
+
+Usage (from backend/):
+    python benchmarks/check_applications.py --users 200 --jobs 10 --duplicates 2 --concurrency 200
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from harness import percentile_ms, start_server, wait_ready
+
+import httpx
+from sqlalchemy import create_engine, func, insert, select
+
+from auth import create_access_token
+
+MISSING_JOB_ID = 10**9
+
+def seed(database_url, users, jobs):
+    from database import Base, Job, User
+
+    bind = create_engine(database_url)
+    Base.metadata.create_all(bind=bind)
+    with bind.begin() as conn:
+        user_ids = conn.execute(insert(User).returning(User.id), [
+            {"first_name": "Load", "last_name": str(n), "email": f"load{n}@example.com",
+             "password_hash": "unused", "verified": True, "is_active": True}
+            for n in range(users)
+        ]).scalars().all()
+        job_ids = conn.execute(insert(Job).returning(Job.id), [
+            {"company_name": f"Company {n}", "position": "Engineer", "location": "Remote", "is_active": True}
+            for n in range(jobs)
+        ]).scalars().all()
+    bind.dispose()
+    return user_ids, job_ids
+
+def count_rows(database_url):
+    from database import JobApplication
+
+    bind = create_engine(database_url)
+    with bind.connect() as conn:
+        total = conn.execute(select(func.count()).select_from(JobApplication)).scalar()
+        distinct = conn.execute(
+            select(func.count()).select_from(
+                select(JobApplication.user_id, JobApplication.job_id).distinct().subquery()
+            )
+        ).scalar()
+    bind.dispose()
+    return total, distinct
+
+async def warm_up(base_url, tokens, concurrency=10):
+    # Signed-in users normally have a warm principal cache; a cold one makes
+    # every request hold a pooled connection while it waits for a thread
+    gate = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, timeout=60) as client:
+        async def touch(token):
+            async with gate:
+                await client.get("/api/users/me", headers={"Authorization": f"Bearer {token}"})
+        await asyncio.gather(*(touch(token) for token in tokens))
+
+async def fire(base_url, submissions, concurrency):
+    statuses = Counter()
+    latencies = []
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    gate = asyncio.Semaphore(concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def submit(token, job_id):
+            async with gate:
+                started = time.perf_counter()
+                try:
+                    response = await client.post(
+                        "/api/applications", json={"job_id": job_id},
+                        headers={"Authorization": f"Bearer {token}"},
+                    )
+                    statuses[response.status_code] += 1
+                except httpx.HTTPError as exc:
+                    statuses[type(exc).__name__] += 1
+                latencies.append(time.perf_counter() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(submit(token, job_id) for token, job_id in submissions))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return statuses, len(submissions) / elapsed, percentile_ms(latencies, 0.99)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--jobs", type=int, default=10)
+    parser.add_argument("--duplicates", type=int, default=2, help="submits per (user, job) pair")
+    parser.add_argument("--missing", type=int, default=100, help="submits for a job that does not exist")
+    parser.add_argument("--concurrency", type=int, default=200)
+    parser.add_argument("--modes", nargs="+", default=["direct", "write_behind"])
+    parser.add_argument("--db-mode", default="sync", choices=["sync", "async"])
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    failures = 0
+    print(f"{'mode':<13} {'req/s':>9} {'p99 ms':>9}  statuses")
+    for mode in args.modes:
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = f"sqlite:///{tmp}/applications.db"
+            user_ids, job_ids = seed(database_url, args.users, args.jobs)
+            tokens = {user_id: create_access_token({"sub": str(user_id)}) for user_id in user_ids}
+            pairs = [(user_id, job_id) for user_id in user_ids for job_id in job_ids]
+            submissions = [(tokens[user_id], job_id) for user_id, job_id in pairs for _ in range(args.duplicates)]
+            submissions += [(tokens[random.choice(user_ids)], MISSING_JOB_ID) for _ in range(args.missing)]
+            random.shuffle(submissions)
+
+            env = dict(os.environ, DATABASE_URL=database_url, DB_MODE=args.db_mode,
+                       APPLICATION_WRITE_MODE=mode, HASH_WORKERS="0")
+            env.pop("ASYNC_DATABASE_URL", None)
+            server = start_server(env, args.port)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                asyncio.run(wait_ready(base_url))
+                asyncio.run(warm_up(base_url, tokens.values()))
+                statuses, rps, p99 = asyncio.run(fire(base_url, submissions, args.concurrency))
+            finally:
+                server.terminate()
+                server.wait()
+
+            total, distinct = count_rows(database_url)
+            print(f"{mode:<13} {rps:>9.1f} {p99:>9.1f}  {dict(sorted(statuses.items(), key=str))}")
+            expected = {
+                201: len(pairs),
+                400: len(pairs) * (args.duplicates - 1),
+                404: args.missing,
+            }
+            problems = [
+                f"{code}: expected {count}, got {statuses.get(code, 0)}"
+                for code, count in expected.items() if statuses.get(code, 0) != count
+            ]
+            if total != len(pairs) or distinct != len(pairs):
+                problems.append(f"rows: expected {len(pairs)}, got {total} ({distinct} distinct)")
+            for problem in problems:
+                print(f"  FAIL {problem}")
+            failures += len(problems)
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""Check that DB_MODE=async serves every database-backed route from async_routes.
+
+install_async_routes leaves a route without an async twin in place, so it
+keeps running in the threadpool on the sync engine. That is what routes
+that never open a session want (suggest, metrics, the job feed), but a
+database route left behind quietly brings back the blocking I/O async
+mode is there to avoid. Builds the app in async mode and fails if any
+route still depends on get_db or get_read_db, directly or through a
+dependency such as get_current_active_user. Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_async_routes.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+from harness import BACKEND_DIR
+
+def dependency_calls(dependant):
+    for dependency in dependant.dependencies:
+        yield dependency.call
+        yield from dependency_calls(dependency)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.parse_args()
+
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DATABASE_URL=f"sqlite:///{tmp}/routes.db", DB_MODE="async", HASH_WORKERS="0")
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        os.chdir(BACKEND_DIR)
+        from fastapi.routing import APIRoute
+        from main import app
+        from database import get_db, get_read_db
+
+        sync_sessions = {get_db, get_read_db}
+        served = 0
+        for route in app.routes:
+            if not isinstance(route, APIRoute):
+                continue
+            if route.endpoint.__module__ == "async_routes":
+                served += 1
+            elif sync_sessions.intersection(dependency_calls(route.dependant)):
+                problems.append(f"{', '.join(sorted(route.methods))} {route.path} has no async twin")
+    print(f"{served} routes served by async twins")
+
+    for problem in problems:
+        print(f"  FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,121 @@
+"""Check the facet aggregate against counts taken straight from the jobs table.
+
+Seeds --jobs random active and inactive jobs, then empties job_facet_counts
+and has --workers threads run init_facets at the same moment, as workers
+starting together would. Checks that the table ends up with exactly one
+count per active job, and that get_facets answers a set of filter
+combinations the same as counting the jobs in Python. Exits non-zero on
+any failure.
+
+Usage (from backend/):
+    python benchmarks/check_facets.py --jobs 5000 --workers 4
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+from collections import Counter
+
+from harness import insert_rows
+
+CATEGORIES = ["tech", "design", "sales", None]
+JOB_TYPES = ["full-time", "part-time", "contract", None]
+LOCATIONS = ["Berlin", "Remote", "Paris", "Oslo", None]
+
+def expected_facets(keys, filters):
+    from facets import FACET_FIELDS
+
+    active = {name: value for name, value in filters.items() if value is not None}
+    total, counts = 0, {name: Counter() for name in FACET_FIELDS}
+    for key, count in keys.items():
+        key = dict(zip(FACET_FIELDS, key))
+        mismatched = [name for name, value in active.items() if key[name] != value]
+        total += count if not mismatched else 0
+        for name in FACET_FIELDS:
+            if not mismatched or mismatched == [name]:
+                counts[name][key[name]] += count
+    return {
+        "total": total,
+        **{name: sorted(({"value": value or None, "count": count} for value, count in counts[name].items()),
+                        key=lambda entry: (-entry["count"], entry["value"] or ""))
+           for name in FACET_FIELDS},
+    }
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--workers", type=int, default=4)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/facets.db"
+        from sqlalchemy import delete, func, select
+        from database import Job, JobFacetCount, SessionLocal, engine, init_db
+        from facets import facet_key, get_facets, init_facets
+
+        init_db()
+        rng = random.Random(3)
+        insert_rows(engine, Job, (
+            {"company_name": f"Company {n}", "position": "Engineer", "location": rng.choice(LOCATIONS) or "Remote",
+             "category": rng.choice(CATEGORIES), "job_type": rng.choice(JOB_TYPES),
+             "salary_min": rng.choice([None, 20000, 45000, 70000, 100000, 150000]), "is_active": rng.random() > 0.2}
+            for n in range(args.jobs)
+        ))
+        with engine.connect() as conn:
+            active_jobs = conn.execute(select(Job).where(Job.is_active == True)).all()
+        keys = Counter(facet_key(row._mapping) for row in active_jobs)
+
+        problems = []
+        for _ in range(args.rounds):
+            with engine.begin() as conn:
+                conn.execute(delete(JobFacetCount))
+            barrier = threading.Barrier(args.workers)
+            errors = []
+
+            def start():
+                barrier.wait()
+                try:
+                    init_facets(engine)
+                except Exception as exc:
+                    errors.append(exc)
+
+            threads = [threading.Thread(target=start) for _ in range(args.workers)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            with engine.connect() as conn:
+                seeded = conn.execute(select(func.sum(JobFacetCount.count))).scalar()
+            if errors:
+                problems.append(f"init_facets raised {errors[0]!r}")
+            if seeded != len(active_jobs):
+                problems.append(f"seeded {seeded} job counts for {len(active_jobs)} active jobs")
+        print(f"{args.rounds} rounds of {args.workers} concurrent init_facets over {len(active_jobs)} active jobs")
+
+        db = SessionLocal()
+        try:
+            for filters in [
+                {},
+                {"category": "tech"},
+                {"category": "tech", "location": "Berlin"},
+                {"job_type": "contract", "salary_bucket": "80000-120000"},
+                {"category": "design", "job_type": "full-time", "location": "Oslo", "salary_bucket": ""},
+                {"location": "Nowhere"},
+            ]:
+                filters = {name: filters.get(name) for name in ("category", "job_type", "location", "salary_bucket")}
+                if get_facets(db, filters) != expected_facets(keys, filters):
+                    problems.append(f"get_facets disagrees with the jobs table for {filters}")
+        finally:
+            db.close()
+        engine.dispose()
+
+    for problem in problems[:10]:
+        print(f"  FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
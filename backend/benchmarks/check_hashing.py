@@ -0,0 +1,125 @@
+"""Check that a login storm gets 503s instead of starving GET /api/jobs.
+
+Starts uvicorn in DB_MODE=sync with a deliberately large HASH_QUEUE_SIZE,
+so only the cap on threads blocked waiting for Argon2 (HASH_MAX_BLOCKING)
+stands between the storm and the threadpool. --logins clients log in back
+to back, honouring Retry-After, for --duration seconds while --readers
+clients keep listing jobs. Checks that some logins were turned away with
+503, every listing succeeded and the slowest took under --max-jobs-ms.
+Without the cap, listings wait behind Argon2 until the connection pool
+times out (30 s) and fail with 500. Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_hashing.py --logins 100 --readers 5 --duration 10
+"""
+import argparse
+import asyncio
+import os
+import random
+import sys
+import tempfile
+import time
+from collections import Counter
+
+from harness import insert_rows, percentile_ms, start_server, wait_ready
+
+import httpx
+from sqlalchemy import create_engine
+
+PASSWORD = "storm-password"
+
+def seed(database_url, users, jobs):
+    from database import Base, Job, User
+    from hashing import argon2_hash
+
+    bind = create_engine(database_url)
+    Base.metadata.create_all(bind=bind)
+    password_hash = argon2_hash(PASSWORD)
+    insert_rows(bind, User, (
+        {"first_name": "Storm", "last_name": str(n), "email": f"storm{n}@example.com",
+         "password_hash": password_hash, "verified": True, "is_active": True}
+        for n in range(users)
+    ))
+    insert_rows(bind, Job, (
+        {"company_name": f"Company {n}", "position": "Engineer", "location": "Remote", "is_active": True}
+        for n in range(jobs)
+    ))
+    bind.dispose()
+
+async def storm(base_url, logins, users, readers, duration):
+    login_statuses, job_statuses = Counter(), Counter()
+    job_latencies = []
+    deadline = time.monotonic() + duration
+    limits = httpx.Limits(max_connections=logins + readers, max_keepalive_connections=logins + readers)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=120) as client:
+        async def login(n):
+            while time.monotonic() < deadline:
+                response = await client.post(
+                    "/api/login", json={"email": f"storm{n % users}@example.com", "password": PASSWORD}
+                )
+                login_statuses[response.status_code] += 1
+                if response.status_code == 503:
+                    # As a well-behaved client would, with jitter so retries do not arrive in waves
+                    await asyncio.sleep(float(response.headers.get("Retry-After", 1)) * random.uniform(1, 2))
+
+        async def reader(n):
+            page = 0
+            while time.monotonic() < deadline:
+                page += 1
+                started = time.perf_counter()
+                # A distinct query each time, so the response cache cannot answer it
+                response = await client.get("/api/jobs", params={"limit": 5, "skip": (n * 1000 + page) % 50})
+                job_latencies.append(time.perf_counter() - started)
+                job_statuses[response.status_code] += 1
+
+        await asyncio.gather(*(login(n) for n in range(logins)), *(reader(n) for n in range(readers)))
+        hashing = (await client.get("/api/metrics/hashing")).json()
+    job_latencies.sort()
+    return login_statuses, job_statuses, job_latencies, hashing
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--logins", type=int, default=100, help="concurrent login clients")
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--readers", type=int, default=5)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--hash-workers", type=int, default=1)
+    parser.add_argument("--hash-queue-size", type=int, default=1000)
+    parser.add_argument("--max-jobs-ms", type=float, default=10000)
+    parser.add_argument("--port", type=int, default=8768)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        database_url = f"sqlite:///{tmp}/hashing.db"
+        seed(database_url, args.users, 200)
+        env = dict(os.environ, DATABASE_URL=database_url, DB_MODE="sync",
+                   HASH_WORKERS=str(args.hash_workers), HASH_QUEUE_SIZE=str(args.hash_queue_size))
+        env.pop("ASYNC_DATABASE_URL", None)
+        server = start_server(env, args.port)
+        try:
+            base_url = f"http://127.0.0.1:{args.port}"
+            asyncio.run(wait_ready(base_url))
+            logins, listings, latencies, hashing = asyncio.run(
+                storm(base_url, args.logins, args.users, args.readers, args.duration)
+            )
+        finally:
+            server.terminate()
+            server.wait()
+
+    print(f"logins    {dict(sorted(logins.items()))}   (max {hashing.get('max_blocking')} threads waiting on Argon2)")
+    print(f"/api/jobs {dict(sorted(listings.items()))}   p50 {percentile_ms(latencies, 0.50):.1f} ms   "
+          f"p95 {percentile_ms(latencies, 0.95):.1f} ms   max {percentile_ms(latencies, 1.0):.1f} ms")
+    problems = []
+    if not logins.get(503):
+        problems.append("no login was turned away with 503; raise --logins")
+    if set(listings) != {200}:
+        problems.append(f"listings failed: {dict(listings)}")
+    if not latencies or percentile_ms(latencies, 1.0) > args.max_jobs_ms:
+        problems.append(f"slowest listing took over {args.max_jobs_ms:.0f} ms")
+    for problem in problems:
+        print(f"  FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
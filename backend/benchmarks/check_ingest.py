@@ -0,0 +1,102 @@
+"""Check that bulk ingestion accounts for every row it receives.
+
+Posts a feed to POST /api/jobs/bulk through the ASGI app that repeats an
+external_id within a batch and across batches, next to plain and invalid
+rows. Checks that received = inserted + upserted + failed, that each row
+superseded within its batch is reported, and that the table ends up with
+the last version of every posting. Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_ingest.py --db-mode async
+"""
+import argparse
+import asyncio
+import json
+import os
+import sys
+import tempfile
+
+from harness import BACKEND_DIR
+
+BATCH_SIZE = 3
+
+def job(company, external_id=None):
+    return {"company_name": company, "position": "Engineer", "location": "Remote", "external_id": external_id}
+
+FEED = [
+    job("A1", "a"),
+    job("A2", "a"),  # replaces row 0 within the batch
+    job("Plain 1"),
+    job("A3", "a"),  # next batch: updates the job row 1 created
+    job("B1", "b"),
+    job("B2", "b"),  # replaces row 4 within the batch
+    {"company_name": "no position or location"},
+    job("Plain 2"),
+]
+EXPECTED = {"received": 8, "inserted": 4, "upserted": 1, "failed": 3}
+SUPERSEDED_ROWS = {0, 4}
+FINAL = {"a": "A3", "b": "B2", None: {"Plain 1", "Plain 2"}}
+
+async def run():
+    import httpx
+    from sqlalchemy import insert, select
+    from main import app
+    from auth import create_access_token
+    from database import Job, User, engine
+
+    await app.router.startup()
+    try:
+        with engine.begin() as conn:
+            user_id = conn.execute(insert(User).returning(User.id), {
+                "first_name": "Feed", "last_name": "Partner", "email": "feed@example.com",
+                "password_hash": "unused", "verified": True, "is_active": True,
+            }).scalar()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}",
+                   "Content-Type": "application/x-ndjson"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            response = await client.post(
+                "/api/jobs/bulk", params={"batch_size": BATCH_SIZE}, headers=headers,
+                content="\n".join(json.dumps(row) for row in FEED),
+            )
+        with engine.connect() as conn:
+            jobs = conn.execute(select(Job.external_id, Job.company_name)).all()
+    finally:
+        await app.router.shutdown()
+    return response, jobs
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DATABASE_URL=f"sqlite:///{tmp}/ingest.db", DB_MODE=args.db_mode, HASH_WORKERS="0")
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        os.chdir(BACKEND_DIR)
+        response, jobs = asyncio.run(run())
+
+    problems = []
+    if response.status_code != 200:
+        sys.exit(f"FAIL bulk ingest returned {response.status_code}: {response.text}")
+    result = response.json()
+    print({key: result[key] for key in EXPECTED})
+    for key, count in EXPECTED.items():
+        if result[key] != count:
+            problems.append(f"{key}: expected {count}, got {result[key]}")
+    if result["received"] != result["inserted"] + result["upserted"] + result["failed"]:
+        problems.append("inserted + upserted + failed does not add up to received")
+    superseded = {error["row"] for error in result["errors"] if "duplicate external_id" in error["error"]}
+    if superseded != SUPERSEDED_ROWS:
+        problems.append(f"superseded rows reported: expected {sorted(SUPERSEDED_ROWS)}, got {sorted(superseded)}")
+    keyed = {external_id: company for external_id, company in jobs if external_id is not None}
+    plain = {company for external_id, company in jobs if external_id is None}
+    if keyed != {"a": FINAL["a"], "b": FINAL["b"]} or plain != FINAL[None]:
+        problems.append(f"jobs table holds {sorted(jobs, key=str)}")
+    for problem in problems:
+        print(f"  FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
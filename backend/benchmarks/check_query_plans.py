@@ -0,0 +1,173 @@
+"""Fail if any GET /api/jobs filter or sort shape makes SQLite scan the jobs table.
+
+Runs list_jobs for every shape against a seeded database, captures the SQL it
+issues and checks EXPLAIN QUERY PLAN for a bare "SCAN jobs". Also checks that
+no export, archive included, sorts in a temporary B-tree: that holds the
+whole export before its first row is streamed.
+
+Usage (from backend/):
+    python benchmarks/check_query_plans.py --jobs 20000
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, event, insert, text
+from sqlalchemy.orm import Session
+
+from database import ArchivedJob, ArchivedJobApplication, Base, Job, JobApplication, User
+from export import export_applications_statements, export_jobs_statements
+from jobs import list_jobs
+import search
+
+JOB_TYPES = ["full-time", "part-time", "contract", "internship"]
+LOCATIONS = ["Remote", "Berlin", "London", "New York", "Lagos", "Tokyo"]
+CATEGORIES = ["tech", "design", "sales", "marketing"]
+
+SHAPES = {
+    "newest": {},
+    "category": {"category": "tech"},
+    "job_type": {"job_type": ["full-time"]},
+    "job_type multi": {"job_type": ["full-time,contract"]},
+    "location multi": {"location": ["Remote", "Berlin"]},
+    "min_salary": {"min_salary": 80000},
+    "salary overlap": {"min_salary": 60000, "max_salary": 90000},
+    "salary within": {"min_salary": 60000, "max_salary": 90000, "salary_match": "within"},
+    "remote full-time 80k": {"job_type": ["full-time"], "location": ["Remote"], "min_salary": 80000},
+    "sort salary": {"sort": "salary"},
+    "sort salary + category": {"sort": "salary", "category": "design"},
+    "sort salary + min_salary": {"sort": "salary", "min_salary": 80000},
+    "search + filters": {"q": "python", "job_type": ["full-time"], "min_salary": 50000},
+}
+
+EXPORTS = {
+    "export jobs": lambda: export_jobs_statements(),
+    "export jobs, live only": lambda: export_jobs_statements(include_archived=False),
+    "export jobs + filters": lambda: export_jobs_statements(
+        category="tech", is_active=True, created_from=datetime(2024, 1, 1, 2),
+    ),
+    "export inactive jobs": lambda: export_jobs_statements(is_active=False),
+    "export active jobs": lambda: export_jobs_statements(is_active=True),
+    "export applications": lambda: export_applications_statements(1),
+    "export applications, live only": lambda: export_applications_statements(1, include_archived=False),
+    "export applications + filters": lambda: export_applications_statements(
+        1, status="pending", applied_from=datetime(2024, 1, 1, 2),
+    ),
+}
+
+def seed(bind, size, rng):
+    started = datetime(2024, 1, 1)
+    rows = []
+    for n in range(size):
+        salary_min = rng.choice([None, rng.randrange(30000, 120000, 5000)])
+        rows.append({
+            "company_name": f"Company {n}",
+            "position": rng.choice(["Python developer", "Designer", "Sales lead", "Data engineer"]),
+            "description": "Work on things",
+            "job_type": rng.choice(JOB_TYPES),
+            "location": rng.choice(LOCATIONS),
+            "category": rng.choice(CATEGORIES),
+            "salary_min": salary_min,
+            "salary_max": None if salary_min is None else salary_min + rng.randrange(0, 40000, 5000),
+            "is_active": rng.random() < 0.9,
+            "created_at": started + timedelta(seconds=n),
+        })
+    with bind.begin() as conn:
+        conn.execute(insert(Job), rows)
+        conn.execute(insert(ArchivedJob), [dict(row, archived_at=started) for row in rows[: size // 10]])
+        conn.execute(insert(User), [
+            {"first_name": "Plan", "last_name": str(n), "email": f"plan{n}@example.com", "password_hash": "unused"}
+            for n in range(20)
+        ])
+        applications = [
+            {"user_id": rng.randrange(1, 21), "job_id": job_id, "status": rng.choice(["pending", "reviewed"]),
+             "applied_at": started + timedelta(seconds=job_id)}
+            for job_id in range(1, size + 1, 2)
+        ]
+        conn.execute(insert(JobApplication), applications)
+        conn.execute(insert(ArchivedJobApplication), [
+            dict(row, archived_at=started) for row in applications[: len(applications) // 10]
+        ])
+        conn.execute(text("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')"))
+        # Give the planner real statistics, as a long-lived database would have
+        conn.execute(text("ANALYZE"))
+
+def capture(bind, fn, wanted=lambda statement: "FROM jobs" in statement or "JOIN jobs" in statement):
+    statements = []
+
+    def record(conn, cursor, statement, parameters, context, executemany):
+        if wanted(statement):
+            statements.append((statement, parameters))
+
+    event.listen(bind, "before_cursor_execute", record)
+    try:
+        fn()
+    finally:
+        event.remove(bind, "before_cursor_execute", record)
+    return statements
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=20000)
+    parser.add_argument("--verbose", action="store_true", help="print every plan")
+    args = parser.parse_args()
+
+    rng = random.Random(42)
+    with tempfile.TemporaryDirectory() as tmp:
+        bind = create_engine(f"sqlite:///{os.path.join(tmp, 'plans.db')}")
+        Base.metadata.create_all(bind)
+        search.init_search(bind)
+        seed(bind, args.jobs, rng)
+
+        failures = 0
+        with Session(bind=bind) as db:
+            for name, params in SHAPES.items():
+                # Check the first page and, where there is one, a cursor page
+                pages = [params]
+                first, next_cursor = list_jobs(db, **params)
+                if next_cursor:
+                    pages.append(dict(params, cursor=next_cursor))
+
+                for page in pages:
+                    label = name + (" (cursor)" if "cursor" in page else "")
+                    statements = capture(bind, lambda: list_jobs(db, **page))
+                    for statement, parameters in statements:
+                        plan = [row[-1] for row in db.connection().exec_driver_sql(
+                            "EXPLAIN QUERY PLAN " + statement, parameters
+                        )]
+                        scans = [step for step in plan if step == "SCAN jobs"]
+                        status = "FAIL" if scans else "ok"
+                        failures += bool(scans)
+                        print(f"{status:4} {label}")
+                        if scans or args.verbose:
+                            for step in plan:
+                                print(f"       {step}")
+
+            for name, build in EXPORTS.items():
+                # Exports read through their own session, so run the statements here
+                executed = capture(bind, lambda: [db.execute(statement).all() for statement in build()],
+                                   wanted=lambda statement: statement.startswith("SELECT"))
+                for statement, parameters in executed:
+                    plan = [row[-1] for row in db.connection().exec_driver_sql(
+                        "EXPLAIN QUERY PLAN " + statement, parameters
+                    )]
+                    sorts = [step for step in plan if "USE TEMP B-TREE" in step]
+                    status = "FAIL" if sorts else "ok"
+                    failures += bool(sorts)
+                    print(f"{status:4} {name}")
+                    if sorts or args.verbose:
+                        for step in plan:
+                            print(f"       {step}")
+        bind.dispose()
+
+    if failures:
+        print(f"{failures} query shape(s) fall back to a full table scan or a temporary sort")
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Check that the recommender drops dead rows without changing its answers.
+
+Indexes --jobs synthetic postings, then churns them for --rounds: each
+round re-indexes a share of the jobs with new text (which leaves their
+old row dead) and removes a few. Checks that dead rows never pass
+DEAD_ROW_RATIO of the matrix, and that recommendations match those of a
+recommender built from scratch over the surviving jobs. Exits non-zero
+on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_recommender.py --jobs 5000 --rounds 10
+"""
+import argparse
+import random
+import sys
+
+import numpy as np
+
+# Also puts backend/ on sys.path, through harness
+from bench_recommend import fake_job
+
+from recommender import DEAD_ROW_RATIO, PENDING_ROWS, TfidfRecommender, job_terms
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--jobs", type=int, default=5000)
+    parser.add_argument("--rounds", type=int, default=10)
+    parser.add_argument("--churn", type=float, default=0.3, help="share of jobs re-indexed each round")
+    parser.add_argument("--queries", type=int, default=20)
+    args = parser.parse_args()
+
+    rng = random.Random(7)
+    churned = TfidfRecommender()
+    current = {}
+    for job_id in range(args.jobs):
+        current[job_id] = (job_terms(fake_job(rng)), rng.random() > 0.1)
+        churned.add(job_id, *current[job_id])
+
+    problems = []
+    added = args.jobs
+    for _ in range(args.rounds):
+        for job_id in rng.sample(sorted(current), int(len(current) * args.churn)):
+            current[job_id] = (job_terms(fake_job(rng)), rng.random() > 0.1)
+            churned.add(job_id, *current[job_id])
+            added += 1
+        for job_id in rng.sample(sorted(current), len(current) // 50):
+            del current[job_id]
+            churned.remove(job_id)
+        churned.recommend([next(iter(current))], limit=1)
+        dead = churned._rows - len(current)
+        if dead > max(PENDING_ROWS, DEAD_ROW_RATIO * churned._rows):
+            problems.append(f"{dead} dead rows out of {churned._rows}")
+    print(f"{added} rows added for {len(current)} jobs; the matrix holds {churned._rows}")
+
+    fresh = TfidfRecommender()
+    for job_id, (terms, active) in current.items():
+        fresh.add(job_id, terms, active)
+    for _ in range(args.queries):
+        seeds = rng.sample(sorted(current), 3)
+        got, expected = churned.recommend(seeds, limit=20), fresh.recommend(seeds, limit=20)
+        if [job_id for job_id, _ in got] != [job_id for job_id, _ in expected] or not np.allclose(
+            [score for _, score in got], [score for _, score in expected], rtol=1e-5
+        ):
+            problems.append(f"seeds {seeds}: got {got[:3]}..., expected {expected[:3]}...")
+            break
+
+    for problem in problems[:10]:
+        print(f"  FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""Check that saved-search alerts agree with the job listing and miss no search.
+
+Stores --searches random saved searches, some with comma lists of
+locations or job types, and --jobs random postings. For every posting,
+the searches the percolator matches must be exactly those whose filters,
+run through the listing's own job_filters, return it. Then commits a
+search stamped before one already synced, as a transaction that
+committed late would, and checks that the next sync still indexes it.
+Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_saved_searches.py --searches 300 --jobs 200
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+from datetime import datetime, timedelta
+
+from harness import insert_rows
+from datagen import CATEGORIES, CITIES, JOB_TYPES
+
+def pick(rng, values, chance):
+    if rng.random() >= chance:
+        return None
+    # Sometimes several values, in the ?location=a,b form the listing accepts
+    return ", ".join(rng.sample(values, rng.choice([1, 1, 2, 3])))
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--searches", type=int, default=300)
+    parser.add_argument("--jobs", type=int, default=200)
+    args = parser.parse_args()
+
+    rng = random.Random(5)
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/saved_searches.db"
+        from sqlalchemy import select
+        from sqlalchemy.orm import Session
+        from database import Job, SavedSearch, User, engine, init_db
+        from jobs import job_filters
+        from saved_searches import percolator, sync_saved_searches
+
+        init_db()
+        insert_rows(engine, User, [{"first_name": "Alert", "last_name": "Check", "email": "alerts@example.com",
+                                    "password_hash": "unused", "verified": True, "is_active": True}])
+        searches = []
+        # Id 1 is left for the late search below, as a sequence hands out
+        # ids before the transactions using them commit
+        for search_id in range(2, args.searches + 2):
+            min_salary = rng.choice([None, None, rng.randrange(30, 150) * 1000])
+            max_salary = rng.choice([None, None, rng.randrange(40, 200) * 1000])
+            if min_salary is not None and max_salary is not None and min_salary > max_salary:
+                min_salary, max_salary = max_salary, min_salary
+            searches.append({
+                "id": search_id, "user_id": 1, "category": rng.choice(CATEGORIES) if rng.random() < 0.5 else None,
+                "location": pick(rng, CITIES[:6], 0.6), "job_type": pick(rng, JOB_TYPES, 0.4),
+                "min_salary": min_salary, "max_salary": max_salary, "created_at": datetime.utcnow(),
+            })
+        insert_rows(engine, SavedSearch, searches)
+        jobs = []
+        for _ in range(args.jobs):
+            salary_min = rng.choice([None, rng.randrange(30, 150) * 1000])
+            salary_max = rng.choice([None, (salary_min or 30000) + rng.randrange(0, 60) * 1000])
+            jobs.append({
+                "company_name": "Acme", "position": "Engineer", "location": rng.choice(CITIES[:6] + ["Berlin, Remote"]),
+                "category": rng.choice(CATEGORIES), "job_type": rng.choice(JOB_TYPES),
+                "salary_min": salary_min, "salary_max": salary_max,
+            })
+        insert_rows(engine, Job, jobs)
+        sync_saved_searches(engine)
+
+        with Session(bind=engine) as db:
+            listed = {job.id: set() for job in db.scalars(select(Job))}
+            for search in db.scalars(select(SavedSearch)):
+                statement = select(Job.id).where(*job_filters(
+                    search.category, [search.job_type] if search.job_type else None,
+                    [search.location] if search.location else None, search.min_salary, search.max_salary,
+                ))
+                for job_id in db.scalars(statement):
+                    listed[job_id].add(search.id)
+            disagreements = 0
+            for job in db.scalars(select(Job)):
+                matched, _ = percolator.match(job.category, job.location, job.job_type, job.salary_min, job.salary_max)
+                if len(matched) != len(set(matched)):
+                    problems.append(f"job {job.id} matched a search more than once")
+                if set(matched) != listed[job.id]:
+                    disagreements += 1
+                    if disagreements <= 3:
+                        problems.append(f"job {job.id} ({job.location!r}, {job.job_type!r}): alerts for "
+                                        f"{sorted(set(matched) - listed[job.id])} not listed, listed by "
+                                        f"{sorted(listed[job.id] - set(matched))} without an alert")
+        print(f"{args.jobs} postings against {args.searches} searches, {disagreements} disagree with the listing")
+
+        # A transaction takes its id and created_at before it commits: one
+        # still open while later searches commit and sync lands behind both
+        with engine.begin() as conn:
+            conn.execute(SavedSearch.__table__.insert(), {
+                "id": 1, "user_id": 1, "category": "late",
+                "created_at": max(search["created_at"] for search in searches) - timedelta(seconds=5),
+            })
+        sync_saved_searches(engine)
+        if len(percolator) != args.searches + 1:
+            problems.append("a search stamped before the last sync was never indexed")
+        engine.dispose()
+
+    for problem in problems:
+        print(f"  FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
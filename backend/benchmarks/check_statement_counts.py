@@ -0,0 +1,99 @@
+"""Assert how many SQL statements the list endpoints issue per request.
+
+The counts must not grow with the number of rows returned: that is the
+N+1 pattern ?expand=job and ?ids= exist to remove.
+
+Usage (from backend/):
+    python benchmarks/check_statement_counts.py
+    DB_MODE=async python benchmarks/check_statement_counts.py
+"""
+import argparse
+import os
+import sys
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+tmp = tempfile.mkdtemp()
+os.environ["DATABASE_URL"] = f"sqlite:///{tmp}/statements.db"
+os.environ.pop("ASYNC_DATABASE_URL", None)
+os.environ.setdefault("HASH_WORKERS", "0")
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+import database
+from response_cache import response_cache
+from main import app
+
+# Statements allowed per request, with a warm principal cache
+BUDGETS = {
+    "/api/applications/me": 1,
+    "/api/applications/me?expand=job": 1,
+    "/api/applications/me?expand=job&limit=10&cursor={cursor}": 1,
+    "/api/jobs?ids={ids}": 1,
+}
+
+class StatementCounter:
+    def __init__(self, bind):
+        self.bind = bind
+        self.statements = []
+
+    def __enter__(self):
+        event.listen(self.bind, "before_cursor_execute", self._record)
+        return self
+
+    def __exit__(self, *exc):
+        event.remove(self.bind, "before_cursor_execute", self._record)
+
+    def _record(self, conn, cursor, statement, parameters, context, executemany):
+        self.statements.append(statement)
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[1, 50])
+    parser.add_argument("--verbose", action="store_true", help="print every statement")
+    args = parser.parse_args()
+
+    bind = database.async_engine.sync_engine if database.async_engine is not None else database.engine
+    failures = 0
+    with TestClient(app) as client:
+        response = client.post("/api/register", json={
+            "first_name": "Count", "last_name": "Statements", "email": "count@example.com", "password": "secret1",
+        }).json()
+        token = client.post("/api/verify", json={
+            "user_id": response["user_id"], "code": response["verification_code"],
+        }).json()["access_token"]
+        headers = {"Authorization": f"Bearer {token}"}
+
+        applied = []
+        print(f"{'applications':>12}  {'statements':>10}  path")
+        for size in sorted(args.sizes):
+            while len(applied) < size:
+                job = client.post("/api/jobs", headers=headers, json={
+                    "company_name": "Acme", "position": f"Engineer {len(applied)}", "location": "Remote",
+                }).json()
+                client.post("/api/applications", headers=headers, json={"job_id": job["id"]})
+                applied.append(job["id"])
+
+            # A first page of 10 gives the cursor for the second
+            cursor = client.get("/api/applications/me?limit=10", headers=headers).headers.get("x-next-cursor", "")
+            for template, budget in BUDGETS.items():
+                path = template.format(cursor=cursor, ids=",".join(map(str, applied)))
+                response_cache.invalidate()
+                with StatementCounter(bind) as counter:
+                    response = client.get(path, headers=headers)
+                ok = response.status_code == 200 and len(counter.statements) <= budget
+                if "expand=job" in path and ok:
+                    ok = all(item["job"] and item["job"]["id"] == item["job_id"] for item in response.json())
+                failures += not ok
+                print(f"{size:>12}  {len(counter.statements):>10}  {template}{'' if ok else '  FAIL'}")
+                if args.verbose or not ok:
+                    for statement in counter.statements:
+                        print("      " + " ".join(statement.split()))
+
+    if failures:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
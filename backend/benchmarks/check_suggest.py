@@ -0,0 +1,116 @@
+"""Check that ORM edits keep the suggestion index in step with the jobs table.
+
+Creates jobs through POST /api/jobs, then edits them through the ORM the
+way an admin script would: an unrelated column, a suggested column, a
+deactivation, a reactivation and a delete. After each step checks what
+GET /api/suggest returns, and at the end that every field's counts match
+a GROUP BY over the active jobs. Exits non-zero on any failure.
+
+Usage (from backend/):
+    python benchmarks/check_suggest.py --db-mode async
+"""
+import argparse
+import asyncio
+import os
+import sys
+import tempfile
+
+from harness import BACKEND_DIR
+
+JOBS = [
+    {"company_name": "Acme", "position": "Python Developer", "location": "Remote"},
+    {"company_name": "Acme", "position": "Python Developer", "location": "Berlin"},
+    {"company_name": "Globex", "position": "Product Manager", "location": "Paris"},
+]
+
+async def run(problems):
+    import httpx
+    from sqlalchemy import func, insert, select
+    from main import app
+    from auth import create_access_token
+    from database import Job, SessionLocal, User, engine
+    from suggest import SUGGEST_FIELDS, normalize, suggest_index
+
+    await app.router.startup()
+    try:
+        with engine.begin() as conn:
+            user_id = conn.execute(insert(User).returning(User.id), {
+                "first_name": "Check", "last_name": "Suggest", "email": "suggest@example.com",
+                "password_hash": "unused", "verified": True, "is_active": True,
+            }).scalar()
+        headers = {"Authorization": f"Bearer {create_access_token({'sub': str(user_id)})}"}
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://check") as client:
+            ids = []
+            for job in JOBS:
+                response = await client.post("/api/jobs", headers=headers, json=job)
+                ids.append(response.json()["id"])
+
+            async def expect(step, prefix, field, expected):
+                response = await client.get("/api/suggest", params={"prefix": prefix, "field": field})
+                got = {item["value"]: item["count"] for item in response.json()}
+                print(f"{step:28} {field}:{prefix!r} -> {got}")
+                if got != expected:
+                    problems.append(f"{step}: {field} {prefix!r} gave {got}, expected {expected}")
+
+            def edit(job_id, **values):
+                db = SessionLocal()
+                try:
+                    job = db.get(Job, job_id)
+                    if values.pop("delete", False):
+                        db.delete(job)
+                    for name, value in values.items():
+                        setattr(job, name, value)
+                    db.commit()
+                finally:
+                    db.close()
+
+            await expect("created", "py", "position", {"Python Developer": 2})
+            edit(ids[0], description="Now with a description")
+            await expect("unrelated column edited", "py", "position", {"Python Developer": 2})
+            await expect("unrelated column edited", "acm", "company", {"Acme": 2})
+            edit(ids[1], position="Go Developer")
+            await expect("position edited", "py", "position", {"Python Developer": 1})
+            await expect("position edited", "go", "position", {"Go Developer": 1})
+            await expect("position edited", "ber", "location", {"Berlin": 1})
+            edit(ids[2], is_active=False)
+            await expect("deactivated", "glo", "company", {})
+            edit(ids[2], is_active=True, location="Paris, France")
+            await expect("reactivated and edited", "glo", "company", {"Globex": 1})
+            await expect("reactivated and edited", "par", "location", {"Paris, France": 1})
+            edit(ids[0], delete=True)
+            await expect("deleted", "py", "position", {})
+            await expect("deleted", "acm", "company", {"Acme": 1})
+
+        with engine.connect() as conn:
+            for field, column in SUGGEST_FIELDS.items():
+                expected = {
+                    normalize(value): count for value, count in conn.execute(
+                        select(column, func.count()).where(Job.is_active == True, column.isnot(None)).group_by(column)
+                    )
+                }
+                got = {value: count for value, (_, count) in suggest_index.fields[field]._values.items()}
+                if got != expected:
+                    problems.append(f"{field} index holds {got}, the jobs table {expected}")
+    finally:
+        await app.router.shutdown()
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--db-mode", choices=["sync", "async"], default="sync")
+    args = parser.parse_args()
+
+    problems = []
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(DATABASE_URL=f"sqlite:///{tmp}/suggest.db", DB_MODE=args.db_mode, HASH_WORKERS="0")
+        os.environ.pop("ASYNC_DATABASE_URL", None)
+        os.chdir(BACKEND_DIR)
+        asyncio.run(run(problems))
+
+    for problem in problems:
+        print(f"  FAIL {problem}")
+    if problems:
+        sys.exit(1)
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,151 @@
+"""Seed a database with realistic volumes of users, jobs and applications.
+
+Used by bench_api.py; can also be run on its own to prepare a database
+for manual testing. Works against SQLite and Postgres. --reset drops the
+existing tables first.
+
+Usage (from backend/):
+    python benchmarks/datagen.py --database-url sqlite:///./bench.db --users 1000 --jobs 50000 --reset
+    python benchmarks/datagen.py --database-url postgresql://localhost/jobfinder_bench --reset
+"""
+import argparse
+import os
+import random
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from sqlalchemy import create_engine, insert, text
+
+BENCH_PASSWORD = "benchmark-password"
+CHUNK_SIZE = 5000
+
+CATEGORIES = ["tech", "design", "sales", "marketing", "support", "finance", "operations", "healthcare"]
+JOB_TYPES = ["full-time", "part-time", "contract", "internship", "remote"]
+CITIES = [
+    "Remote", "Berlin", "London", "New York", "San Francisco", "Toronto", "Paris", "Amsterdam",
+    "Madrid", "Warsaw", "Lisbon", "Austin", "Seattle", "Sydney", "Singapore", "Dublin",
+]
+LEVELS = ["Junior", "", "", "Senior", "Lead", "Principal", "Staff"]
+ROLES = [
+    "Python Developer", "Backend Engineer", "Frontend Engineer", "Data Scientist", "Product Designer",
+    "Account Executive", "Marketing Manager", "Support Specialist", "Financial Analyst", "DevOps Engineer",
+    "QA Engineer", "Machine Learning Engineer", "Sales Manager", "Content Writer", "Nurse",
+]
+SKILLS = [
+    "python", "fastapi", "django", "sql", "postgres", "react", "typescript", "kubernetes", "aws",
+    "figma", "excel", "salesforce", "seo", "communication", "leadership", "docker", "spark", "go",
+]
+
+def _job(rng: random.Random, n: int, now: datetime) -> dict:
+    role = rng.choice(ROLES)
+    position = f"{rng.choice(LEVELS)} {role}".strip()
+    skills = rng.sample(SKILLS, 4)
+    salary_min = rng.randrange(30, 150) * 1000 if rng.random() < 0.8 else None
+    return {
+        "company_name": f"Company {rng.randrange(max(n // 20, 50))}",
+        "position": position,
+        "location": rng.choice(CITIES),
+        "salary_min": salary_min,
+        "salary_max": salary_min + rng.randrange(5, 60) * 1000 if salary_min else None,
+        "job_type": rng.choice(JOB_TYPES),
+        "category": rng.choice(CATEGORIES),
+        "description": f"We are hiring a {position.lower()} with experience in {', '.join(skills)}.",
+        "requirements": f"{rng.randrange(1, 10)}+ years; {skills[0]} and {skills[1]} required.",
+        "is_active": rng.random() < 0.9,
+        # Spread over the last year so keyset pages walk real ranges
+        "created_at": now - timedelta(seconds=rng.randrange(365 * 24 * 3600)),
+        "updated_at": now,
+    }
+
+def _insert_chunks(conn, table, rows, returning=None):
+    ids = []
+    for i in range(0, len(rows), CHUNK_SIZE):
+        chunk = rows[i:i + CHUNK_SIZE]
+        if returning is None:
+            conn.execute(insert(table), chunk)
+        else:
+            ids += conn.execute(insert(table).returning(returning, sort_by_parameter_order=True), chunk).scalars().all()
+    return ids
+
+def reset(bind):
+    from database import Base
+
+    if bind.dialect.name == "sqlite":
+        with bind.begin() as conn:
+            conn.execute(text("DROP TABLE IF EXISTS jobs_fts"))
+    Base.metadata.drop_all(bind=bind)
+
+def seed(database_url: str, users: int = 1000, jobs: int = 50000, applications: int = 20,
+         seed_value: int = 1, drop: bool = False) -> dict:
+    """Fill database_url and return what the load generator needs to address it.
+
+    Every user is verified and shares BENCH_PASSWORD. `applications` random
+    jobs per user are already applied for; `applied` lists those pairs so
+    the load generator only submits new ones.
+    """
+    from database import Base, Job, JobApplication, User
+    from hashing import argon2_hash
+
+    rng = random.Random(seed_value)
+    now = datetime.utcnow()
+    bind = create_engine(database_url)
+    if drop:
+        reset(bind)
+    Base.metadata.create_all(bind=bind)
+
+    started = time.perf_counter()
+    # Hashing is deliberately slow; one hash shared by every user keeps seeding fast
+    password_hash = argon2_hash(BENCH_PASSWORD)
+    with bind.begin() as conn:
+        user_ids = _insert_chunks(conn, User, [
+            {"first_name": "Bench", "last_name": str(n), "email": f"bench{n}@example.com",
+             "password_hash": password_hash, "verified": True, "is_active": True,
+             "created_at": now, "updated_at": now}
+            for n in range(users)
+        ], returning=User.id)
+        job_rows = [_job(rng, jobs, now) for n in range(jobs)]
+        job_ids = _insert_chunks(conn, Job, job_rows, returning=Job.id)
+        per_user = min(applications, len(job_ids))
+        application_rows, applied = [], set()
+        for user_id in user_ids:
+            for job_id in rng.sample(job_ids, per_user):
+                applied.add((user_id, job_id))
+                application_rows.append({
+                    "user_id": user_id, "job_id": job_id, "status": "pending",
+                    "applied_at": now - timedelta(seconds=rng.randrange(90 * 24 * 3600)),
+                })
+        _insert_chunks(conn, JobApplication, application_rows)
+    bind.dispose()
+
+    return {
+        "database_url": database_url,
+        "user_ids": user_ids,
+        "job_ids": job_ids,
+        "active_job_ids": [job_id for job_id, row in zip(job_ids, job_rows) if row["is_active"]],
+        "applied": applied,
+        "emails": [f"bench{n}@example.com" for n in range(users)],
+        "password": BENCH_PASSWORD,
+        "seed_seconds": time.perf_counter() - started,
+        "counts": {"users": len(user_ids), "jobs": len(job_ids), "applications": len(application_rows)},
+    }
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--database-url", required=True)
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--jobs", type=int, default=50000)
+    parser.add_argument("--applications", type=int, default=20, help="seeded applications per user")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--reset", action="store_true", help="drop existing tables first")
+    args = parser.parse_args()
+
+    result = seed(args.database_url, args.users, args.jobs, args.applications, args.seed, args.reset)
+    counts = result["counts"]
+    print(f"seeded {counts['users']} users, {counts['jobs']} jobs, {counts['applications']} applications "
+          f"in {result['seed_seconds']:.1f}s")
+
+if __name__ == "__main__":
+    main()
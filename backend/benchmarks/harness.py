@@ -0,0 +1,67 @@
+"""Helpers shared by the benchmark and check scripts.
+
+Timing (timed; percentile comes from stats.py so the numbers match what
+/metrics reports), chunked seeding (insert_rows) and running the app
+under uvicorn (start_server, wait_ready). Not a script of its own.
+"""
+import asyncio
+import math
+import os
+import subprocess
+import sys
+import time
+from itertools import islice
+from typing import Callable, Iterable, List
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, BACKEND_DIR)
+
+from stats import percentile
+
+def percentile_ms(seconds: List[float], q: float) -> float:
+    """The q-quantile of sorted durations in seconds, in milliseconds; NaN when there are none."""
+    return percentile(seconds, q, math.nan) * 1000
+
+def timed(fn: Callable, repeat: int, warmup: int = 0) -> List[float]:
+    """Seconds taken by each of repeat calls to fn, sorted; warmup calls are not timed."""
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        started = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - started)
+    samples.sort()
+    return samples
+
+def insert_rows(bind, table, rows: Iterable[dict], batch: int = 10000):
+    """Insert rows in chunks of batch, all in one transaction."""
+    from sqlalchemy import insert
+
+    rows = iter(rows)
+    with bind.begin() as conn:
+        while True:
+            chunk = list(islice(rows, batch))
+            if not chunk:
+                return
+            conn.execute(insert(table), chunk)
+
+def start_server(env: dict, port: int, workers: int = 1) -> subprocess.Popen:
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "main:app", "--port", str(port), "--log-level", "warning",
+         "--workers", str(workers)],
+        cwd=BACKEND_DIR, env=env,
+    )
+
+async def wait_ready(base_url: str, timeout: float = 30):
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient(base_url=base_url) as client:
+        while time.monotonic() < deadline:
+            try:
+                await client.get("/")
+                return
+            except httpx.TransportError:
+                await asyncio.sleep(0.2)
+    raise RuntimeError("server did not start")
@@ -0,0 +1,87 @@
+"""Requests/sec and p99 latency for DB_MODE=sync vs DB_MODE=async under load.
+
+Starts uvicorn once per mode against a freshly seeded SQLite file, then
+drives it with N concurrent keep-alive clients. Needs the dev requirements
+(pip install -r requirements-dev.txt).
+
+Usage (from backend/):
+    python benchmarks/load_test.py --concurrency 500 --duration 15
+"""
+import argparse
+import asyncio
+import os
+import tempfile
+import time
+
+from harness import insert_rows, percentile_ms, start_server, wait_ready
+
+import httpx
+from sqlalchemy import create_engine
+
+def seed(database_url, jobs):
+    from database import Base, Job
+
+    bind = create_engine(database_url)
+    Base.metadata.create_all(bind=bind)
+    insert_rows(bind, Job, (
+        {"company_name": f"Company {n}", "position": "Engineer", "location": "Remote",
+         "category": "tech", "is_active": True}
+        for n in range(jobs)
+    ))
+    bind.dispose()
+
+async def drive(base_url, path, concurrency, duration):
+    latencies, errors = [], 0
+    limits = httpx.Limits(max_connections=concurrency, max_keepalive_connections=concurrency)
+    async with httpx.AsyncClient(base_url=base_url, limits=limits, timeout=60) as client:
+        deadline = time.monotonic() + duration
+
+        async def worker():
+            nonlocal errors
+            while time.monotonic() < deadline:
+                started = time.perf_counter()
+                try:
+                    response = await client.get(path)
+                    if response.status_code != 200:
+                        errors += 1
+                        continue
+                except httpx.HTTPError:
+                    errors += 1
+                    continue
+                latencies.append(time.perf_counter() - started)
+
+        started = time.monotonic()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        elapsed = time.monotonic() - started
+
+    latencies.sort()
+    return len(latencies) / elapsed, percentile_ms(latencies, 0.50), percentile_ms(latencies, 0.99), errors
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--concurrency", type=int, default=500)
+    parser.add_argument("--duration", type=float, default=15)
+    parser.add_argument("--path", default="/api/jobs?limit=20")
+    parser.add_argument("--jobs", type=int, default=10000)
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    print(f"{'mode':<6} {'req/s':>9} {'p50 ms':>9} {'p99 ms':>9} {'errors':>7}")
+    for mode in ("sync", "async"):
+        with tempfile.TemporaryDirectory() as tmp:
+            database_url = f"sqlite:///{tmp}/load.db"
+            seed(database_url, args.jobs)
+            env = dict(os.environ, DB_MODE=mode, DATABASE_URL=database_url)
+            env.pop("ASYNC_DATABASE_URL", None)
+            server = start_server(env, args.port)
+            try:
+                base_url = f"http://127.0.0.1:{args.port}"
+                asyncio.run(wait_ready(base_url))
+                rps, p50, p99, errors = asyncio.run(drive(base_url, args.path, args.concurrency, args.duration))
+                print(f"{mode:<6} {rps:>9.1f} {p50:>9.1f} {p99:>9.1f} {errors:>7}")
+            finally:
+                server.terminate()
+                server.wait()
+
+if __name__ == "__main__":
+    main()
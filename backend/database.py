@@ -1,21 +1,142 @@
-from sqlalchemy import create_engine, Column, Integer, String, DateTime, Boolean, ForeignKey
+from sqlalchemy import create_engine, event, inspect, text, Column, Integer, String, DateTime, Boolean, ForeignKey, Index
+from sqlalchemy.engine import make_url
 from sqlalchemy.ext.declarative import declarative_base
-from sqlalchemy.orm import sessionmaker, relationship
+from sqlalchemy.orm import column_property, sessionmaker, relationship
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 from datetime import datetime
 import os
+import time
 from dotenv import load_dotenv
 
 load_dotenv()
 
 DATABASE_URL = os.getenv("DATABASE_URL", "sqlite:///./jobfinder.db")
+# Optional read replica for the catalogue GET routes; unset, they read the primary
+DATABASE_REPLICA_URL = os.getenv("DATABASE_REPLICA_URL")
+# Turn off when several workers share a database whose schema is managed separately
+DB_INIT_ON_STARTUP = os.getenv("DB_INIT_ON_STARTUP", "true").lower() == "true"
 
-engine = create_engine(
-    DATABASE_URL, 
-    connect_args={"check_same_thread": False} if "sqlite" in DATABASE_URL else {}
-)
+# ==================== ENGINES ====================
+
+# Per process and engine. Pool size plus overflow should cover the
+# threadpool (40 workers), or sync routes hold a thread while they queue
+# for a connection
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "20"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+# Replace server connections before the server or a proxy drops them idle
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+
+# WAL lets readers carry on while a write commits, and with it
+# synchronous=NORMAL stays crash-safe while only syncing at checkpoints
+SQLITE_JOURNAL_MODE = os.getenv("SQLITE_JOURNAL_MODE", "wal")
+SQLITE_SYNCHRONOUS = os.getenv("SQLITE_SYNCHRONOUS", "normal")
+SQLITE_MMAP_SIZE = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
+# Page cache per connection; negative values are KiB
+SQLITE_CACHE_SIZE = int(os.getenv("SQLITE_CACHE_SIZE", "-65536"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+
+def _set_sqlite_pragmas(dbapi_connection, connection_record):
+    cursor = dbapi_connection.cursor()
+    cursor.execute(f"PRAGMA journal_mode = {SQLITE_JOURNAL_MODE}")
+    cursor.execute(f"PRAGMA synchronous = {SQLITE_SYNCHRONOUS}")
+    cursor.execute(f"PRAGMA mmap_size = {SQLITE_MMAP_SIZE}")
+    cursor.execute(f"PRAGMA cache_size = {SQLITE_CACHE_SIZE}")
+    cursor.execute(f"PRAGMA busy_timeout = {SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.execute("PRAGMA temp_store = memory")
+    cursor.close()
+
+# Called with the seconds each pool checkout took: waiting for a free
+# connection plus opening one. The metrics registry subscribes here
+pool_checkout_observers = []
+
+class _TimedCheckout:
+    # The pool events fire once a connection is in hand, so the wait
+    # before it is timed around the public Pool.connect() instead
+    def connect(self):
+        started = time.perf_counter()
+        try:
+            return super().connect()
+        finally:
+            elapsed = time.perf_counter() - started
+            for observe in pool_checkout_observers:
+                observe(elapsed)
+
+class TimedQueuePool(_TimedCheckout, QueuePool):
+    pass
+
+class TimedAsyncAdaptedQueuePool(_TimedCheckout, AsyncAdaptedQueuePool):
+    pass
+
+def create_tuned_engine(url: str, asynchronous: bool = False):
+    """Engine for url with the pool settings above and, on SQLite, the pragmas."""
+    parsed = make_url(url)
+    sqlite = parsed.get_backend_name() == "sqlite"
+    # In-memory SQLite lives in a single connection, so it has no pool to size
+    memory = sqlite and parsed.database in (None, "", ":memory:")
+    options = {}
+    if sqlite and not asynchronous:
+        options["connect_args"] = {"check_same_thread": False}
+    if not memory:
+        # Also what aiosqlite needs, or it opens (and sets pragmas on) a connection per checkout
+        options["poolclass"] = TimedAsyncAdaptedQueuePool if asynchronous else TimedQueuePool
+        options.update(pool_size=DB_POOL_SIZE, max_overflow=DB_MAX_OVERFLOW, pool_timeout=DB_POOL_TIMEOUT)
+        if not sqlite:
+            options.update(pool_recycle=DB_POOL_RECYCLE, pool_pre_ping=DB_POOL_PRE_PING)
+
+    if asynchronous:
+        from sqlalchemy.ext.asyncio import create_async_engine
+
+        bind = create_async_engine(url, **options)
+        sync_bind = bind.sync_engine
+    else:
+        bind = sync_bind = create_engine(url, **options)
+    if sqlite:
+        event.listen(sync_bind, "connect", _set_sqlite_pragmas)
+    return bind
+
+engine = create_tuned_engine(DATABASE_URL)
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
+if DATABASE_REPLICA_URL:
+    read_engine = create_tuned_engine(DATABASE_REPLICA_URL)
+    ReadSessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=read_engine)
+else:
+    read_engine = engine
+    ReadSessionLocal = SessionLocal
 Base = declarative_base()
 
+# "sync" serves requests from the threadpool, "async" from the event loop
+DB_MODE = os.getenv("DB_MODE", "sync").lower()
+
+def to_async_url(url: str) -> str:
+    # Map the sync driver onto its asyncio counterpart
+    if url.startswith("sqlite:"):
+        return url.replace("sqlite:", "sqlite+aiosqlite:", 1)
+    if url.startswith(("postgresql:", "postgresql+psycopg2:", "postgres:")):
+        return "postgresql+asyncpg:" + url.split(":", 1)[1]
+    return url
+
+ASYNC_DATABASE_URL = os.getenv("ASYNC_DATABASE_URL", to_async_url(DATABASE_URL))
+ASYNC_DATABASE_REPLICA_URL = os.getenv(
+    "ASYNC_DATABASE_REPLICA_URL", to_async_url(DATABASE_REPLICA_URL) if DATABASE_REPLICA_URL else None
+)
+
+async_engine = async_read_engine = None
+AsyncSessionLocal = AsyncReadSessionLocal = None
+if DB_MODE == "async":
+    from sqlalchemy.ext.asyncio import async_sessionmaker
+    
+    async_engine = create_tuned_engine(ASYNC_DATABASE_URL, asynchronous=True)
+    # Objects stay loaded after commit so responses never lazy-load outside a greenlet
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+    if ASYNC_DATABASE_REPLICA_URL:
+        async_read_engine = create_tuned_engine(ASYNC_DATABASE_REPLICA_URL, asynchronous=True)
+        AsyncReadSessionLocal = async_sessionmaker(async_read_engine, autoflush=False, expire_on_commit=False)
+    else:
+        async_read_engine = async_engine
+        AsyncReadSessionLocal = AsyncSessionLocal
+
 class User(Base):
     __tablename__ = "users"
     
@@ -45,24 +166,64 @@ class Verification(Base):
     
     user = relationship("User", back_populates="verifications")
 
+    __table_args__ = (
+        # One live code per user; issuing a new one upserts over the old
+        Index("ux_verifications_user_id", "user_id", unique=True),
+        # Range-scanned by the expiry sweeper
+        Index("ix_verifications_expires_at", "expires_at"),
+    )
+
+# Compiles to the same "is_active = 1" / "is_active = true" the queries use,
+# which is what lets the planners pick the partial indexes
+_ACTIVE_ONLY = {"sqlite_where": text("is_active = 1"), "postgresql_where": text("is_active = true")}
+# Full-table indexes the partial ones below replaced; dropped by init_db
+SUPERSEDED_INDEXES = [
+    "ix_jobs_active_category_created", "ix_jobs_active_created", "ix_jobs_active_type_created",
+    "ix_jobs_active_location_created", "ix_jobs_active_salary",
+]
+
+def _tracked(column: Column):
+    # The facet and suggestion hooks take back a job's previous values on
+    # flush; active history loads them even when the job had been expired
+    # (e.g. by a commit) before it was changed
+    return column_property(column, active_history=True)
+
 class Job(Base):
     __tablename__ = "jobs"
     
     id = Column(Integer, primary_key=True, index=True)
-    company_name = Column(String, nullable=False)
-    position = Column(String, nullable=False)
-    location = Column(String, nullable=False)
-    salary_min = Column(Integer)
-    salary_max = Column(Integer)
-    job_type = Column(String)
-    category = Column(String)
+    company_name = _tracked(Column(String, nullable=False))
+    position = _tracked(Column(String, nullable=False))
+    location = _tracked(Column(String, nullable=False))
+    salary_min = _tracked(Column(Integer))
+    salary_max = _tracked(Column(Integer))
+    job_type = _tracked(Column(String))
+    category = _tracked(Column(String))
     description = Column(String)
     requirements = Column(String)
-    is_active = Column(Boolean, default=True)
+    # Partner feed identifier; bulk ingestion upserts on it
+    external_id = Column(String, nullable=True)
+    is_active = _tracked(Column(Boolean, default=True))
     created_at = Column(DateTime, default=datetime.utcnow)
     updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
     
     applications = relationship("JobApplication", back_populates="job", cascade="all, delete-orphan")
+    
+    __table_args__ = (
+        # Keyset pagination: equality filters first, then the (created_at, id) sort key.
+        # Partial on is_active, which every listing filters on, so inactive
+        # postings waiting for the archiver stay out of the hot indexes
+        Index("ix_jobs_live_category_created", "category", "created_at", "id", **_ACTIVE_ONLY),
+        Index("ix_jobs_live_created", "created_at", "id", **_ACTIVE_ONLY),
+        Index("ix_jobs_live_type_created", "job_type", "created_at", "id", **_ACTIVE_ONLY),
+        Index("ix_jobs_live_location_created", "location", "created_at", "id", **_ACTIVE_ONLY),
+        # Salary filters and the "salary" sort both range-scan salary_max
+        Index("ix_jobs_live_salary", "salary_max", "id", **_ACTIVE_ONLY),
+        # The archiver's scan for inactive postings
+        Index("ix_jobs_inactive_updated", "updated_at", "id", sqlite_where=text("is_active = 0"),
+              postgresql_where=text("is_active = false")),
+        Index("ux_jobs_external_id", "external_id", unique=True),
+    )
 
 class JobApplication(Base):
     __tablename__ = "job_applications"
@@ -76,12 +237,146 @@ class JobApplication(Base):
     user = relationship("User", back_populates="job_applications")
     job = relationship("Job", back_populates="applications")
 
+    __table_args__ = (
+        # One application per user and job, enforced by the database so
+        # concurrent submits cannot both succeed
+        Index("ux_job_applications_user_job", "user_id", "job_id", unique=True),
+        # The applications list pages newest first per user
+        Index("ix_job_applications_user_applied", "user_id", "applied_at", "id"),
+    )
+
+class SavedSearch(Base):
+    __tablename__ = "saved_searches"
+
+    id = Column(Integer, primary_key=True, index=True)
+    user_id = Column(Integer, ForeignKey("users.id"), nullable=False)
+    name = Column(String, nullable=True)
+    # Unset criteria match anything; the rest match as the list endpoint's
+    # filters do: exact text (any of a comma list for location and job
+    # type), and its "overlap" rule for salary bounds
+    category = Column(String, nullable=True)
+    location = Column(String, nullable=True)
+    job_type = Column(String, nullable=True)
+    min_salary = Column(Integer, nullable=True)
+    max_salary = Column(Integer, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+
+    __table_args__ = (
+        Index("ix_saved_searches_user", "user_id", "id"),
+        # Other workers pick up new searches by created_at
+        Index("ix_saved_searches_created", "created_at"),
+        # Ids are never reused, so a worker still holding a deleted search's
+        # id never mistakes a newer search for it
+        {"sqlite_autoincrement": True},
+    )
+
+# ==================== ARCHIVE ====================
+# Jobs the archiver moved out of jobs, with their applications. Rows keep
+# their original ids, so application history reads both tables as one.
+
+class ArchivedJob(Base):
+    __tablename__ = "jobs_archive"
+
+    id = Column(Integer, primary_key=True)
+    company_name = Column(String, nullable=False)
+    position = Column(String, nullable=False)
+    location = Column(String, nullable=False)
+    salary_min = Column(Integer)
+    salary_max = Column(Integer)
+    job_type = Column(String)
+    category = Column(String)
+    description = Column(String)
+    requirements = Column(String)
+    external_id = Column(String, nullable=True)
+    is_active = Column(Boolean, default=False)
+    created_at = Column(DateTime)
+    updated_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+class ArchivedJobApplication(Base):
+    __tablename__ = "job_applications_archive"
+
+    id = Column(Integer, primary_key=True)
+    user_id = Column(Integer, nullable=False)
+    job_id = Column(Integer, nullable=False)
+    status = Column(String)
+    applied_at = Column(DateTime)
+    archived_at = Column(DateTime, default=datetime.utcnow)
+
+    job = relationship(
+        "ArchivedJob", primaryjoin="foreign(ArchivedJobApplication.job_id) == ArchivedJob.id", viewonly=True
+    )
+
+    __table_args__ = (
+        Index("ix_job_applications_archive_user_applied", "user_id", "applied_at", "id"),
+    )
+
+# Active-job counts per facet combination, kept current on every job write
+class JobFacetCount(Base):
+    __tablename__ = "job_facet_counts"
+    
+    # Missing values are stored as "" so they can be part of the key
+    category = Column(String, primary_key=True, default="")
+    job_type = Column(String, primary_key=True, default="")
+    location = Column(String, primary_key=True, default="")
+    salary_bucket = Column(String, primary_key=True, default="")
+    count = Column(Integer, nullable=False, default=0)
+
 def init_db():
     Base.metadata.create_all(bind=engine)
+    # create_all skips tables that already exist, so add any nullable
+    # columns and indexes they are missing
+    existing = inspect(engine)
+    with engine.begin() as conn:
+        for table in Base.metadata.sorted_tables:
+            present = {column["name"] for column in existing.get_columns(table.name)}
+            for column in table.columns:
+                if column.name not in present and column.nullable:
+                    column_type = column.type.compile(dialect=engine.dialect)
+                    conn.execute(text(f'ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}'))
+        # Older databases kept several codes per user; keep the newest so
+        # the one-code-per-user index can be built
+        if "ux_verifications_user_id" not in {index["name"] for index in existing.get_indexes("verifications")}:
+            conn.execute(text(
+                "DELETE FROM verifications WHERE id NOT IN "
+                "(SELECT MAX(id) FROM verifications GROUP BY user_id)"
+            ))
+        # Likewise keep only the first of any duplicate applications
+        if "ux_job_applications_user_job" not in {index["name"] for index in existing.get_indexes("job_applications")}:
+            conn.execute(text(
+                "DELETE FROM job_applications WHERE id NOT IN "
+                "(SELECT MIN(id) FROM job_applications GROUP BY user_id, job_id)"
+            ))
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.create(bind=engine, checkfirst=True)
+    with engine.begin() as conn:
+        for name in SUPERSEDED_INDEXES:
+            conn.execute(text(f"DROP INDEX IF EXISTS {name}"))
 
 def get_db():
     db = SessionLocal()
     try:
         yield db
     finally:
-        db.close()
\ No newline at end of file
+        db.close()
+
+async def get_async_db():
+    async with AsyncSessionLocal() as db:
+        yield db
+
+def _get_read_db():
+    db = ReadSessionLocal()
+    try:
+        yield db
+    finally:
+        db.close()
+
+async def _get_async_read_db():
+    async with AsyncReadSessionLocal() as db:
+        yield db
+
+# Without a replica these are the very same dependencies as get_db and
+# get_async_db, so a route that also authenticates still gets one session
+get_read_db = _get_read_db if DATABASE_REPLICA_URL else get_db
+get_async_read_db = _get_async_read_db if ASYNC_DATABASE_REPLICA_URL else get_async_db
\ No newline at end of file
@@ -0,0 +1,189 @@
+import csv
+import io
+import json
+import zlib
+from datetime import datetime
+from typing import AsyncIterator, Callable, Iterator, List, Optional
+
+from fastapi import Query, Request
+from fastapi.responses import StreamingResponse
+from sqlalchemy import DateTime, Select, literal, select
+
+from database import (
+    ReadSessionLocal, AsyncReadSessionLocal,
+    Job, ArchivedJob, JobApplication, ArchivedJobApplication
+)
+
+# Rows fetched per round-trip; Postgres streams them from a server-side cursor
+EXPORT_YIELD_PER = 1000
+# Output is buffered up to this size before being sent to the client
+EXPORT_CHUNK_BYTES = 64 * 1024
+
+MEDIA_TYPES = {"ndjson": "application/x-ndjson", "csv": "text/csv"}
+EXPORT_FORMAT = Query("ndjson", alias="format", pattern="^(ndjson|csv)$")
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def _rows(statements: List[Select]) -> Iterator:
+    # Own session: the response body is produced after the route has returned.
+    # Exports are long scans, so they go to the replica when there is one
+    db = ReadSessionLocal()
+    try:
+        for statement in statements:
+            result = db.execute(statement.execution_options(stream_results=True, yield_per=EXPORT_YIELD_PER))
+            for partition in result.partitions():
+                yield from partition
+    finally:
+        db.close()
+
+async def _rows_async(statements: List[Select]) -> AsyncIterator:
+    async with AsyncReadSessionLocal() as db:
+        for statement in statements:
+            result = await db.stream(statement.execution_options(yield_per=EXPORT_YIELD_PER))
+            async for partition in result.partitions():
+                for row in partition:
+                    yield row
+
+class _Encoder:
+    """Turns rows into NDJSON or CSV bytes, buffered up to EXPORT_CHUNK_BYTES and optionally gzipped."""
+
+    def __init__(self, columns: List[str], fmt: str, compress: bool):
+        self.columns = columns
+        self.buffer = io.StringIO()
+        self.writer = csv.writer(self.buffer) if fmt == "csv" else None
+        self.compressor = zlib.compressobj(wbits=16 + zlib.MAX_WBITS) if compress else None
+        if self.writer is not None:
+            self.writer.writerow(columns)
+
+    def feed(self, row) -> bytes:
+        """Encode one row; returns the bytes to send once a chunk is full, else b""."""
+        if self.writer is not None:
+            self.writer.writerow(["" if value is None else value for value in row])
+        else:
+            self.buffer.write(json.dumps(dict(zip(self.columns, row)), default=_json_default))
+            self.buffer.write("\n")
+        if self.buffer.tell() < EXPORT_CHUNK_BYTES:
+            return b""
+        return self._drain()
+
+    def finish(self) -> bytes:
+        data = self._drain()
+        if self.compressor is not None:
+            data += self.compressor.flush()
+        return data
+
+    def _drain(self) -> bytes:
+        data = self.buffer.getvalue().encode("utf-8")
+        self.buffer.seek(0)
+        self.buffer.truncate()
+        return self.compressor.compress(data) if self.compressor is not None else data
+
+def stream_export(statements: List[Select], fmt: str, compress: bool) -> Iterator[bytes]:
+    """Yield the rows selected by statements, one after the other, as NDJSON or CSV bytes, optionally gzipped."""
+    encoder = _Encoder([column.key for column in statements[0].selected_columns], fmt, compress)
+    for row in _rows(statements):
+        data = encoder.feed(row)
+        if data:
+            yield data
+    yield encoder.finish()
+
+async def stream_export_async(statements: List[Select], fmt: str, compress: bool) -> AsyncIterator[bytes]:
+    """stream_export over the async read engine, so no threadpool worker is held for the download."""
+    encoder = _Encoder([column.key for column in statements[0].selected_columns], fmt, compress)
+    async for row in _rows_async(statements):
+        data = encoder.feed(row)
+        if data:
+            yield data
+    yield encoder.finish()
+
+def with_archive(rows: Callable[[type], Select], live, archived, order_by: Callable = lambda model: [model.id]) -> List[Select]:
+    """rows(model) for the live table, then for its archive, each in order_by(model) order.
+
+    Two statements rather than one sorted UNION ALL: SQLite can only sort
+    a union in a temporary B-tree, which holds the whole export before the
+    first row is sent. Live rows get a NULL archived_at, so both halves
+    have the same columns.
+    """
+    return [
+        rows(live).add_columns(literal(None, DateTime).label("archived_at")).order_by(*order_by(live)),
+        rows(archived).add_columns(archived.archived_at).order_by(*order_by(archived)),
+    ]
+
+def export_jobs_statements(
+    category: Optional[str] = None,
+    is_active: Optional[bool] = None,
+    created_from: Optional[datetime] = None,
+    created_to: Optional[datetime] = None,
+    include_archived: bool = True,
+) -> List[Select]:
+    # Archived jobs are included by default so an export stays a full backup
+    def rows(model):
+        statement = select(*(model.__table__.c[column.key] for column in Job.__table__.columns))
+        if category:
+            statement = statement.where(model.category == category)
+        if is_active is not None:
+            statement = statement.where(model.is_active == is_active)
+        if created_from:
+            statement = statement.where(model.created_at >= created_from)
+        if created_to:
+            statement = statement.where(model.created_at < created_to)
+        return statement
+
+    def order(model):
+        # A filter on is_active gets planned with one of the partial indexes,
+        # so stream in that index's order; everything else in id order
+        if model is Job and is_active is not None:
+            return [Job.created_at, Job.id] if is_active else [Job.updated_at, Job.id]
+        return [model.id]
+
+    return with_archive(rows, Job, ArchivedJob, order) if include_archived else [rows(Job).order_by(*order(Job))]
+
+def export_applications_statements(
+    user_id: int,
+    status: Optional[str] = None,
+    job_id: Optional[int] = None,
+    applied_from: Optional[datetime] = None,
+    applied_to: Optional[datetime] = None,
+    include_archived: bool = True,
+) -> List[Select]:
+    # Applications are personal data: each user exports only their own
+    def rows(model):
+        statement = (
+            select(*(model.__table__.c[column.key] for column in JobApplication.__table__.columns))
+            .where(model.user_id == user_id)
+        )
+        if status:
+            statement = statement.where(model.status == status)
+        if job_id is not None:
+            statement = statement.where(model.job_id == job_id)
+        if applied_from:
+            statement = statement.where(model.applied_at >= applied_from)
+        if applied_to:
+            statement = statement.where(model.applied_at < applied_to)
+        return statement
+
+    # The order of both tables' (user_id, applied_at, id) indexes
+    def order(model):
+        return [model.applied_at, model.id]
+
+    return (
+        with_archive(rows, JobApplication, ArchivedJobApplication, order) if include_archived
+        else [rows(JobApplication).order_by(*order(JobApplication))]
+    )
+
+def export_response(
+    request: Request, statements: List[Select], fmt: str, filename: str, asynchronous: bool = False
+) -> StreamingResponse:
+    # gzip on the fly whenever the client says it can decode it
+    compress = "gzip" in request.headers.get("accept-encoding", "")
+    headers = {
+        "Content-Disposition": f'attachment; filename="{filename}.{fmt}"',
+        "Vary": "Accept-Encoding",
+    }
+    if compress:
+        headers["Content-Encoding"] = "gzip"
+    stream = stream_export_async if asynchronous else stream_export
+    return StreamingResponse(stream(statements, fmt, compress), media_type=MEDIA_TYPES[fmt], headers=headers)
@@ -0,0 +1,155 @@
+from collections import Counter
+from collections.abc import Mapping
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy import delete, event, func, insert, literal, select, union_all, update
+from sqlalchemy.engine import Connection
+from sqlalchemy.orm import Session
+
+from database import engine, Job, JobFacetCount
+from job_events import previous_value
+
+FACET_FIELDS = ("category", "job_type", "location", "salary_bucket")
+# Lower bounds of the salary buckets, applied to salary_min (or salary_max)
+SALARY_BUCKET_EDGES = (0, 30000, 50000, 80000, 120000)
+MAX_FACET_VALUES = 50
+
+FacetKey = Tuple[str, str, str, str]
+
+def salary_bucket(salary_min: Optional[int], salary_max: Optional[int]) -> str:
+    salary = salary_min if salary_min is not None else salary_max
+    if salary is None:
+        return ""
+    label = ""
+    for lower, upper in zip(SALARY_BUCKET_EDGES, SALARY_BUCKET_EDGES[1:] + (None,)):
+        if salary >= lower:
+            label = f"{lower}-{upper}" if upper is not None else f"{lower}+"
+    return label
+
+def facet_key(values) -> FacetKey:
+    """Facet key for a Job, row or dict of job column values."""
+    get = values.get if isinstance(values, Mapping) else (lambda name: getattr(values, name, None))
+    return (
+        get("category") or "",
+        get("job_type") or "",
+        get("location") or "",
+        salary_bucket(get("salary_min"), get("salary_max")),
+    )
+
+# ==================== MAINTENANCE ====================
+
+def adjust_counts(connection: Connection, deltas: Dict[FacetKey, int]):
+    """Apply count deltas inside the caller's transaction."""
+    rows = [dict(zip(FACET_FIELDS, key), count=delta) for key, delta in deltas.items() if delta]
+    if not rows:
+        return
+
+    dialect = connection.dialect.name
+    if dialect in ("sqlite", "postgresql"):
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        else:
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        statement = dialect_insert(JobFacetCount)
+        connection.execute(statement.on_conflict_do_update(
+            index_elements=list(FACET_FIELDS),
+            set_={"count": JobFacetCount.count + statement.excluded["count"]},
+        ), rows)
+        return
+
+    for row in rows:
+        where = [getattr(JobFacetCount, name) == row[name] for name in FACET_FIELDS]
+        result = connection.execute(
+            update(JobFacetCount).where(*where).values(count=JobFacetCount.count + row["count"])
+        )
+        if result.rowcount == 0:
+            connection.execute(insert(JobFacetCount).values(row))
+
+def _previous_key(job: Job) -> FacetKey:
+    return facet_key({name: previous_value(job, name) for name in
+                      ("category", "job_type", "location", "salary_min", "salary_max")})
+
+@event.listens_for(Session, "after_flush")
+def _count_flushed_jobs(session, flush_context):
+    # Runs inside the flush's transaction, so counts commit or roll back with the jobs
+    deltas = Counter()
+    for job in session.new:
+        if isinstance(job, Job) and job.is_active is not False:
+            deltas[facet_key(job)] += 1
+    for job in session.dirty:
+        if isinstance(job, Job) and session.is_modified(job):
+            if previous_value(job, "is_active") is not False:
+                deltas[_previous_key(job)] -= 1
+            if job.is_active is not False:
+                deltas[facet_key(job)] += 1
+    for job in session.deleted:
+        if isinstance(job, Job) and previous_value(job, "is_active") is not False:
+            deltas[_previous_key(job)] -= 1
+    if deltas:
+        adjust_counts(session.connection(), deltas)
+
+def init_facets(bind=engine):
+    """Seed the aggregate table with one GROUP BY the first time it is empty.
+
+    Workers starting together can all find it empty. Each then rebuilds it
+    from scratch in a single transaction, so the last one to commit leaves
+    the same counts rather than adding its own on top.
+    """
+    with bind.connect() as conn:
+        if conn.execute(select(JobFacetCount.count).limit(1)).first() is not None:
+            return
+    with bind.begin() as conn:
+        # Writing first takes SQLite's write lock before the jobs are read
+        conn.execute(delete(JobFacetCount))
+        rows = conn.execute(
+            select(Job.category, Job.job_type, Job.location, Job.salary_min, Job.salary_max, func.count())
+            .where(Job.is_active == True)
+            .group_by(Job.category, Job.job_type, Job.location, Job.salary_min, Job.salary_max)
+        )
+        deltas = Counter()
+        for row in rows:
+            deltas[facet_key(row._mapping)] += row[-1]
+        adjust_counts(conn, deltas)
+
+# ==================== QUERY ====================
+
+def _matching(filters: Dict[str, str], skip: Optional[str] = None) -> list:
+    return [JobFacetCount.count > 0] + [
+        getattr(JobFacetCount, name) == value for name, value in filters.items() if name != skip
+    ]
+
+def get_facets(db: Session, filters: Dict[str, Optional[str]]) -> dict:
+    """Count active jobs per facet value.
+
+    Each facet is counted under every filter except its own, so a client
+    can show the alternatives to the value it has selected. The filters
+    and grouping run in the database, one UNION ALL branch per facet.
+    """
+    active = {name: value for name, value in filters.items() if value is not None}
+    total = func.coalesce(func.sum(JobFacetCount.count), 0)
+    branches = [
+        select(literal("").label("facet"), literal("").label("value"), total.label("count"))
+        .where(*_matching(active))
+    ]
+    for name in FACET_FIELDS:
+        column = getattr(JobFacetCount, name)
+        top = (
+            select(literal(name).label("facet"), column.label("value"), total.label("count"))
+            .where(*_matching(active, skip=name))
+            .group_by(column)
+            .order_by(total.desc(), column)
+            .limit(MAX_FACET_VALUES)
+            .subquery()
+        )
+        branches.append(select(top))
+
+    result = {"total": 0, **{name: [] for name in FACET_FIELDS}}
+    for facet, value, count in db.execute(union_all(*branches)):
+        if facet:
+            result[facet].append({"value": value or None, "count": count})
+        else:
+            result["total"] = count
+    # UNION ALL does not promise to keep each branch's order
+    for name in FACET_FIELDS:
+        result[name].sort(key=lambda entry: (-entry["count"], entry["value"] or ""))
+    return result
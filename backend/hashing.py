@@ -0,0 +1,157 @@
+import asyncio
+import multiprocessing
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from typing import Optional, Tuple
+
+from fastapi import HTTPException, status
+from passlib.context import CryptContext
+from dotenv import load_dotenv
+
+from stats import percentile
+
+load_dotenv()
+
+# Raising any of these makes existing hashes "need update"; they are
+# transparently rehashed the next time their owner logs in
+ARGON2_TIME_COST = int(os.getenv("ARGON2_TIME_COST", "3"))
+ARGON2_MEMORY_COST = int(os.getenv("ARGON2_MEMORY_COST", "65536"))
+ARGON2_PARALLELISM = int(os.getenv("ARGON2_PARALLELISM", "4"))
+
+# 0 workers hashes inline in the calling thread (handy for local debugging)
+HASH_WORKERS = int(os.getenv("HASH_WORKERS", str(os.cpu_count() or 1)))
+# Hash jobs allowed in flight (running + waiting) before requests get a 503
+HASH_QUEUE_SIZE = int(os.getenv("HASH_QUEUE_SIZE", str(HASH_WORKERS * 8 or 8)))
+# Sync routes wait for their hash on a threadpool thread, and AnyIO's
+# default limiter has THREADPOOL_SIZE of them. Only this many may wait at
+# once, whatever HASH_QUEUE_SIZE is, so a login storm gets 503s before it
+# can take the threads every other sync route needs
+THREADPOOL_SIZE = 40
+HASH_MAX_BLOCKING = min(int(os.getenv("HASH_MAX_BLOCKING", str(THREADPOOL_SIZE // 4))), THREADPOOL_SIZE // 2)
+HASH_RETRY_AFTER_SECONDS = 1
+
+# Using argon2 instead of bcrypt - no 72 byte limit!
+pwd_context = CryptContext(
+    schemes=["argon2"],
+    deprecated="auto",
+    argon2__rounds=ARGON2_TIME_COST,
+    argon2__memory_cost=ARGON2_MEMORY_COST,
+    argon2__parallelism=ARGON2_PARALLELISM,
+)
+
+# ==================== WORKER FUNCTIONS ====================
+# These run inside the pool processes, so they must stay module-level.
+
+def argon2_hash(password: str) -> str:
+    return pwd_context.hash(password)
+
+def argon2_verify(password: str, hashed: str) -> bool:
+    return pwd_context.verify(password, hashed)
+
+def argon2_verify_and_update(password: str, hashed: str) -> Tuple[bool, Optional[str]]:
+    return pwd_context.verify_and_update(password, hashed)
+
+# ==================== EXECUTOR ====================
+
+class HashingExecutor:
+    """Process pool for Argon2 with a bounded backlog and latency metrics."""
+
+    def __init__(self, workers: int, queue_size: int, max_blocking: int = HASH_MAX_BLOCKING,
+                 latency_window: int = 1000):
+        self.workers = workers
+        self.queue_size = queue_size
+        self.max_blocking = min(max_blocking, queue_size)
+        self._pool = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        # Of _pending, the jobs whose caller holds a thread while it waits
+        self._blocking = 0
+        self._latencies = deque(maxlen=latency_window)
+        self.completed = 0
+        self.rejected = 0
+        self.latency_total = 0.0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        if self._pool is None:
+            # spawn keeps worker processes free of the server's threads and sockets
+            self._pool = ProcessPoolExecutor(
+                max_workers=self.workers,
+                mp_context=multiprocessing.get_context("spawn"),
+            )
+        return self._pool
+
+    def _admit(self, blocking: bool = False):
+        with self._lock:
+            if self._pending >= self.queue_size or (blocking and self._blocking >= self.max_blocking):
+                self.rejected += 1
+                raise HTTPException(
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                    detail="Server busy, please retry",
+                    headers={"Retry-After": str(HASH_RETRY_AFTER_SECONDS)},
+                )
+            self._pending += 1
+            if blocking:
+                self._blocking += 1
+            if self.workers > 0:
+                return self._get_pool()
+            return None
+
+    def _done(self, started: float, blocking: bool = False):
+        elapsed = time.perf_counter() - started
+        with self._lock:
+            self._pending -= 1
+            if blocking:
+                self._blocking -= 1
+            self.completed += 1
+            self.latency_total += elapsed
+            self._latencies.append(elapsed)
+
+    def run(self, fn, *args):
+        """Run fn in the pool and block the calling thread for the result."""
+        pool = self._admit(blocking=True)
+        started = time.perf_counter()
+        try:
+            if pool is None:
+                return fn(*args)
+            return pool.submit(fn, *args).result()
+        finally:
+            self._done(started, blocking=True)
+
+    async def run_async(self, fn, *args):
+        """Run fn in the pool without blocking the event loop."""
+        pool = self._admit()
+        started = time.perf_counter()
+        try:
+            if pool is None:
+                return fn(*args)
+            return await asyncio.wrap_future(pool.submit(fn, *args))
+        finally:
+            self._done(started)
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._latencies)
+            pending = self._pending
+            blocking = self._blocking
+        return {
+            "workers": self.workers,
+            "queue_size": self.queue_size,
+            "queue_depth": pending,
+            "max_blocking": self.max_blocking,
+            "blocking": blocking,
+            "completed": self.completed,
+            "rejected": self.rejected,
+            "latency_ms_avg": (self.latency_total / self.completed * 1000) if self.completed else 0.0,
+            "latency_ms_p50": percentile(latencies, 0.50) * 1000,
+            "latency_ms_p99": percentile(latencies, 0.99) * 1000,
+        }
+
+    def shutdown(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+executor = HashingExecutor(HASH_WORKERS, HASH_QUEUE_SIZE)
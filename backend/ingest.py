@@ -0,0 +1,256 @@
+import json
+import os
+from collections import Counter
+from datetime import datetime
+from typing import AsyncIterator, List, Tuple
+
+from pydantic import ValidationError
+from sqlalchemy import insert, select
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from database import Job
+from schemas import JobCreate
+from job_events import jobs_saved
+from facets import adjust_counts, facet_key
+from response_cache import response_cache
+from suggest import unindex_suggestions
+
+load_dotenv()
+
+BULK_BATCH_SIZE = int(os.getenv("BULK_BATCH_SIZE", "1000"))
+# Per-row errors kept in the response; the count keeps going past this
+MAX_REPORTED_ERRORS = 1000
+# A single row larger than this is rejected instead of buffered
+MAX_ROW_BYTES = 1024 * 1024
+
+_decoder = json.JSONDecoder()
+
+class RowError(Exception):
+    pass
+
+# ==================== STREAM PARSING ====================
+
+async def iter_ndjson(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (row_number, value) per non-blank line; bad lines yield a RowError."""
+    buffer = b""
+    row = 0
+    async for chunk in chunks:
+        buffer += chunk
+        *lines, buffer = buffer.split(b"\n")
+        if len(buffer) > MAX_ROW_BYTES:
+            raise RowError(f"row {row} exceeds {MAX_ROW_BYTES} bytes")
+        for line in lines:
+            if line.strip():
+                yield row, _parse_line(line)
+                row += 1
+    if buffer.strip():
+        yield row, _parse_line(buffer)
+
+def _parse_line(line: bytes):
+    try:
+        return json.loads(line)
+    except ValueError as exc:
+        return RowError(f"invalid JSON: {exc}")
+
+async def iter_json_array(chunks: AsyncIterator[bytes]) -> AsyncIterator[Tuple[int, object]]:
+    """Yield (row_number, value) for each element of a top-level JSON array.
+
+    Only the element currently being decoded is buffered.
+    """
+    text = ""
+    pending = b""
+    started = False
+    row = 0
+    async for chunk in chunks:
+        # Keep incomplete UTF-8 sequences for the next chunk
+        pending += chunk
+        try:
+            text += pending.decode("utf-8")
+            pending = b""
+        except UnicodeDecodeError as exc:
+            text += pending[:exc.start].decode("utf-8")
+            pending = pending[exc.start:]
+
+        position = 0
+        while True:
+            position = _skip_whitespace(text, position)
+            if position >= len(text):
+                break
+            if not started:
+                if text[position] != "[":
+                    raise RowError("body must be a JSON array or NDJSON")
+                started = True
+                position += 1
+                continue
+            if text[position] == ",":
+                position += 1
+                continue
+            if text[position] == "]":
+                return
+            try:
+                value, position = _decoder.raw_decode(text, position)
+            except ValueError:
+                # Element continues in the next chunk
+                break
+            yield row, value
+            row += 1
+        text = text[position:]
+        if len(text) > MAX_ROW_BYTES:
+            raise RowError(f"row {row} exceeds {MAX_ROW_BYTES} bytes")
+    if started:
+        raise RowError("unterminated JSON array")
+
+def _skip_whitespace(text: str, position: int) -> int:
+    while position < len(text) and text[position] in " \t\r\n":
+        position += 1
+    return position
+
+# ==================== BATCH WRITER ====================
+
+class BulkIngester:
+    """Validates rows incrementally and writes them in fixed-size batches.
+
+    The session is passed to each flush rather than held, so the async
+    route can hand one over through AsyncSession.run_sync.
+    """
+
+    def __init__(self, batch_size: int = BULK_BATCH_SIZE):
+        self.batch_size = batch_size
+        self.batch: List[Tuple[int, dict]] = []
+        self.received = 0
+        self.inserted = 0
+        self.upserted = 0
+        self.failed = 0
+        self.errors: List[dict] = []
+
+    def add(self, row: int, value) -> bool:
+        """Validate one row; returns True when a batch is ready to flush."""
+        self.received += 1
+        if isinstance(value, RowError):
+            self.fail(row, str(value))
+            return False
+        try:
+            job = JobCreate.model_validate(value)
+        except ValidationError as exc:
+            self.fail(row, "; ".join(
+                f"{'.'.join(str(part) for part in error['loc']) or 'row'}: {error['msg']}"
+                for error in exc.errors()
+            ))
+            return False
+        self.batch.append((row, job.model_dump()))
+        return len(self.batch) >= self.batch_size
+
+    def fail(self, row: int, message: str):
+        self.failed += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append({"row": row, "error": message})
+
+    def flush(self, db: Session):
+        batch, self.batch = self._drop_superseded(self.batch), []
+        if not batch:
+            return
+        try:
+            saved = self._write(db, batch)
+        except DBAPIError:
+            db.rollback()
+            # Isolate the offending rows instead of losing the whole batch
+            saved = []
+            for row, values in batch:
+                try:
+                    saved += self._write(db, [(row, values)])
+                except DBAPIError as exc:
+                    db.rollback()
+                    self.fail(row, str(exc.orig))
+
+        # Core inserts bypass the ORM flush hooks, so notify explicitly
+        response_cache.invalidate([job.id for job in saved])
+        jobs_saved(db, saved)
+
+    def _drop_superseded(self, batch: List[Tuple[int, dict]]) -> List[Tuple[int, dict]]:
+        # Last occurrence wins when a feed repeats an external_id within a
+        # batch; the earlier ones are reported, so every received row is
+        # either inserted, upserted or failed
+        last = {values["external_id"]: row for row, values in batch if values.get("external_id") is not None}
+        kept = []
+        for row, values in batch:
+            key = values.get("external_id")
+            if key is not None and last[key] != row:
+                self.fail(row, f"duplicate external_id in batch, superseded by row {last[key]}")
+            else:
+                kept.append((row, values))
+        return kept
+
+    def _write(self, db: Session, batch: List[Tuple[int, dict]]) -> List[Job]:
+        now = datetime.utcnow()
+        plain, keyed = [], {}
+        for _, values in batch:
+            values = dict(values, is_active=True, created_at=now, updated_at=now)
+            if values.get("external_id") is not None:
+                keyed[values["external_id"]] = values
+            else:
+                plain.append(values)
+
+        # Core statements skip the ORM flush hook that maintains facet counts
+        deltas = Counter(facet_key(values) for values in plain)
+        previous = []
+        if keyed:
+            previous = db.execute(
+                select(Job.external_id, Job.is_active, Job.category, Job.job_type, Job.location,
+                       Job.salary_min, Job.salary_max, Job.position, Job.company_name)
+                .where(Job.external_id.in_(list(keyed)))
+            ).all()
+            deltas.subtract(facet_key(row._mapping) for row in previous if row.is_active)
+            deltas.update(facet_key(values) for values in keyed.values())
+
+        saved = []
+        if plain:
+            ids = db.execute(
+                insert(Job).returning(Job.id, sort_by_parameter_order=True), plain
+            ).scalars().all()
+            saved += [Job(id=job_id, **values) for job_id, values in zip(ids, plain)]
+        if keyed:
+            rows = list(keyed.values())
+            ids = db.execute(
+                self._upsert(db).returning(Job.id, sort_by_parameter_order=True), rows
+            ).scalars().all()
+            saved += [Job(id=job_id, **values) for job_id, values in zip(ids, rows)]
+        adjust_counts(db.connection(), deltas)
+        db.commit()
+        # The replaced values stop counting; jobs_saved adds the new ones
+        unindex_suggestions(row for row in previous if row.is_active)
+
+        # Keyed rows only count as upserted when they replaced an existing job
+        self.inserted += len(plain) + len(keyed) - len(previous)
+        self.upserted += len(previous)
+        return saved
+
+    def _upsert(self, db: Session):
+        dialect = db.get_bind().dialect.name
+        if dialect == "sqlite":
+            from sqlalchemy.dialects.sqlite import insert as dialect_insert
+        elif dialect == "postgresql":
+            from sqlalchemy.dialects.postgresql import insert as dialect_insert
+        else:
+            # No portable upsert; duplicates surface as per-row errors
+            return insert(Job)
+        statement = dialect_insert(Job)
+        updated = {
+            name: statement.excluded[name]
+            for name in JobCreate.model_fields
+            if name != "external_id"
+        }
+        # Keep created_at from the original posting
+        updated.update(is_active=True, updated_at=statement.excluded.updated_at)
+        return statement.on_conflict_do_update(index_elements=[Job.external_id], set_=updated)
+
+    def result(self) -> dict:
+        return {
+            "received": self.received,
+            "inserted": self.inserted,
+            "upserted": self.upserted,
+            "failed": self.failed,
+            "errors": self.errors,
+            "errors_truncated": self.failed > len(self.errors),
+        }
@@ -0,0 +1,441 @@
+import contextvars
+import logging
+import os
+import re
+import sys
+import threading
+import time
+from bisect import bisect_left
+from collections import Counter, deque
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+import anyio.to_thread
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from dotenv import load_dotenv
+
+from database import engine, read_engine, async_engine, async_read_engine, pool_checkout_observers
+
+load_dotenv()
+
+# Requests slower than this get their sampled stacks written to PROFILE_DIR;
+# 0 leaves the profiler off
+PROFILE_SLOW_REQUESTS_MS = float(os.getenv("PROFILE_SLOW_REQUESTS_MS", "0"))
+PROFILE_SAMPLE_INTERVAL_MS = float(os.getenv("PROFILE_SAMPLE_INTERVAL_MS", "5"))
+PROFILE_DIR = os.getenv("PROFILE_DIR", "profiles")
+# Dumps written per process, so a slow spell cannot fill the disk
+PROFILE_MAX_DUMPS = int(os.getenv("PROFILE_MAX_DUMPS", "100"))
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4"
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+QUERY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.5, 1.0)
+QUERY_COUNT_BUCKETS = (0, 1, 2, 3, 5, 10, 20, 50, 100)
+POOL_WAIT_BUCKETS = (0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+
+class Histogram:
+    __slots__ = ("buckets", "counts", "sum", "count")
+
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value: float):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+class RequestStats:
+    __slots__ = ("started", "method", "route", "sql_queries", "sql_seconds", "pool_wait_seconds",
+                 "threads", "samples")
+
+    def __init__(self, method: str):
+        self.started = time.perf_counter()
+        self.method = method
+        self.route = "unmatched"
+        self.sql_queries = 0
+        self.sql_seconds = 0.0
+        self.pool_wait_seconds = 0.0
+        # Threads the request ran on, for the profiler
+        self.threads = {threading.get_ident()}
+        self.samples = Counter()
+
+# Set for the duration of each HTTP request; copied into threadpool workers
+# and SQLAlchemy's greenlets, so the engine events below can find it
+_current_request: contextvars.ContextVar[Optional[RequestStats]] = contextvars.ContextVar(
+    "current_request", default=None
+)
+
+# ==================== REGISTRY ====================
+
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = Counter()
+        self.durations: Dict[Tuple[str, str], Histogram] = {}
+        self.route_queries: Dict[str, Histogram] = {}
+        self.route_sql_seconds = Counter()
+        self.queries = Histogram(QUERY_BUCKETS)
+        self.query_errors = 0
+        self.pool_waits = Histogram(POOL_WAIT_BUCKETS)
+        self.saturated_requests = 0
+        self.background_failures = Counter()
+        self.in_flight: List[RequestStats] = []
+        self.engines: Dict[str, Engine] = {}
+        self.collectors: Dict[str, Tuple[Callable[[], dict], frozenset]] = {}
+
+    def register_collector(self, name: str, collect: Callable[[], dict], counters: Iterable[str] = ()):
+        """Export the numeric values of a component's metrics() dict.
+
+        Keys listed in counters only ever grow and become Prometheus
+        counters (with a _total suffix); everything else is a gauge.
+        """
+        self.collectors[name] = (collect, frozenset(counters))
+
+    def begin(self, stats: RequestStats):
+        if profiler.enabled:
+            with self._lock:
+                self.in_flight.append(stats)
+
+    def end(self, stats: RequestStats, status_code: int, elapsed: float, saturated: bool):
+        with self._lock:
+            if profiler.enabled:
+                self.in_flight.remove(stats)
+            self.requests[(stats.method, stats.route, str(status_code))] += 1
+            key = (stats.method, stats.route)
+            histogram = self.durations.get(key)
+            if histogram is None:
+                histogram = self.durations[key] = Histogram(LATENCY_BUCKETS)
+            histogram.observe(elapsed)
+            histogram = self.route_queries.get(stats.route)
+            if histogram is None:
+                histogram = self.route_queries[stats.route] = Histogram(QUERY_COUNT_BUCKETS)
+            histogram.observe(stats.sql_queries)
+            self.route_sql_seconds[stats.route] += stats.sql_seconds
+            if saturated:
+                self.saturated_requests += 1
+        if profiler.enabled and elapsed * 1000 >= PROFILE_SLOW_REQUESTS_MS:
+            profiler.dump(stats, elapsed)
+
+    def observe_query(self, elapsed: float, failed: bool = False):
+        stats = _current_request.get()
+        if stats is not None:
+            stats.sql_queries += 1
+            stats.sql_seconds += elapsed
+        with self._lock:
+            self.queries.observe(elapsed)
+            if failed:
+                self.query_errors += 1
+
+    def observe_pool_wait(self, elapsed: float):
+        stats = _current_request.get()
+        if stats is not None:
+            stats.pool_wait_seconds += elapsed
+        with self._lock:
+            self.pool_waits.observe(elapsed)
+
+metrics = Metrics()
+
+def report_failure(component: str, message: str):
+    """Log a background worker's failure with its traceback and count it.
+
+    Call from the except block. Counts are exported per component as
+    jobfinder_background_failures_total, so a worker that keeps failing
+    shows up on a dashboard and not only in the log.
+    """
+    with metrics._lock:
+        metrics.background_failures[component] += 1
+    logging.getLogger(f"jobfinder.{component}").error(message, exc_info=True)
+
+# ==================== SQLALCHEMY ====================
+# Listening on the Engine class covers the sync engine, the async engine's
+# sync core and any connection background workers open themselves.
+
+@event.listens_for(Engine, "before_cursor_execute")
+def _before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault("query_started", []).append(time.perf_counter())
+    stats = _current_request.get()
+    if stats is not None:
+        stats.threads.add(threading.get_ident())
+
+@event.listens_for(Engine, "after_cursor_execute")
+def _after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+    metrics.observe_query(time.perf_counter() - conn.info["query_started"].pop())
+
+@event.listens_for(Engine, "handle_error")
+def _handle_error(context):
+    started = context.connection.info.get("query_started") if context.connection is not None else None
+    if started:
+        metrics.observe_query(time.perf_counter() - started.pop(), failed=True)
+
+# Checkouts are timed by the engines' pool class (see database.py)
+pool_checkout_observers.append(metrics.observe_pool_wait)
+
+def instrument_engine(name: str, bind: Engine):
+    """Report the pool gauges of bind."""
+    metrics.engines[name] = bind
+
+instrument_engine("sync", engine)
+if read_engine is not engine:
+    instrument_engine("sync_read", read_engine)
+if async_engine is not None:
+    instrument_engine("async", async_engine.sync_engine)
+if async_read_engine is not async_engine:
+    instrument_engine("async_read", async_read_engine.sync_engine)
+
+# ==================== MIDDLEWARE ====================
+
+_route_paths: Dict[Callable, str] = {}
+
+def _route_label(scope) -> str:
+    # Label by route template, not raw path, so /api/jobs/1 and /api/jobs/2 share a series
+    endpoint = scope.get("endpoint")
+    if endpoint is None:
+        return "unmatched"
+    path = _route_paths.get(endpoint)
+    if path is None:
+        for route in scope["app"].routes:
+            if getattr(route, "endpoint", None) is endpoint:
+                path = _route_paths[endpoint] = route.path
+                break
+        else:
+            return "unmatched"
+    return path
+
+class MetricsMiddleware:
+    """Times every HTTP request and attributes its SQL and pool waits to it.
+
+    Adds a Server-Timing header so a single slow response can be read off
+    in the browser's network panel.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        stats = RequestStats(scope["method"])
+        token = _current_request.set(stats)
+        limiter = anyio.to_thread.current_default_thread_limiter()
+        # Sync routes arriving now wait for a worker thread
+        saturated = limiter.borrowed_tokens >= limiter.total_tokens
+        status_code = 500
+
+        async def send_with_timing(message):
+            nonlocal status_code
+            if message["type"] == "http.response.start":
+                status_code = message["status"]
+                timing = (
+                    f'app;dur={(time.perf_counter() - stats.started) * 1000:.1f}, '
+                    f'db;dur={stats.sql_seconds * 1000:.1f};desc="{stats.sql_queries} queries", '
+                    f'pool;dur={stats.pool_wait_seconds * 1000:.1f}'
+                )
+                message["headers"] = [*message.get("headers", []), (b"server-timing", timing.encode())]
+            await send(message)
+
+        metrics.begin(stats)
+        try:
+            await self.app(scope, receive, send_with_timing)
+        finally:
+            _current_request.reset(token)
+            stats.route = _route_label(scope)
+            metrics.end(stats, status_code, time.perf_counter() - stats.started, saturated)
+
+# ==================== PROFILER ====================
+
+def _fold(frame) -> str:
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    return ";".join(reversed(stack))
+
+class SlowRequestProfiler:
+    """Samples the stacks of in-flight requests; dumps the slow ones.
+
+    A request is sampled on the event loop thread and on every thread it
+    ran SQL from. In async mode the loop thread is shared, so concurrent
+    requests see each other's loop samples. Dumps use the collapsed-stack
+    format ("frame;frame;frame count") that flamegraph.pl and speedscope read.
+    """
+
+    def __init__(self, slow_ms: float = PROFILE_SLOW_REQUESTS_MS, interval_ms: float = PROFILE_SAMPLE_INTERVAL_MS,
+                 directory: str = PROFILE_DIR, max_dumps: int = PROFILE_MAX_DUMPS):
+        self.enabled = slow_ms > 0
+        self.interval = interval_ms / 1000
+        self.directory = directory
+        self.max_dumps = max_dumps
+        self._pending = deque()
+        self._stop = threading.Event()
+        self._thread = None
+        self.samples = 0
+        self.dumps = 0
+        self.skipped = 0
+
+    def start(self):
+        if not self.enabled or self._thread is not None:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="request-profiler", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def dump(self, stats: RequestStats, elapsed: float):
+        # Written from the profiler thread, never the event loop
+        if self.dumps + len(self._pending) >= self.max_dumps:
+            self.skipped += 1
+            return
+        self._pending.append((stats, elapsed, dict(stats.samples)))
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self._sample()
+            while self._pending:
+                self._write(*self._pending.popleft())
+
+    def _sample(self):
+        with metrics._lock:
+            in_flight = list(metrics.in_flight)
+        if not in_flight:
+            return
+        frames = sys._current_frames()
+        folded = {}
+        for stats in in_flight:
+            for ident in list(stats.threads):
+                frame = frames.get(ident)
+                if frame is None:
+                    continue
+                if ident not in folded:
+                    folded[ident] = _fold(frame)
+                stats.samples[folded[ident]] += 1
+                self.samples += 1
+
+    def _write(self, stats: RequestStats, elapsed: float, samples: dict):
+        route = re.sub(r"[^A-Za-z0-9]+", "_", stats.route).strip("_") or "root"
+        path = os.path.join(
+            self.directory, f"{int(time.time() * 1000)}-{stats.method}-{route}-{elapsed * 1000:.0f}ms.folded"
+        )
+        try:
+            with open(path, "w") as f:
+                for stack, count in sorted(samples.items()):
+                    f.write(f"{stack} {count}\n")
+            self.dumps += 1
+        except OSError:
+            report_failure("profiler", f"Could not write profile {path}")
+
+    def metrics(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "slow_request_ms": PROFILE_SLOW_REQUESTS_MS,
+            "samples": self.samples,
+            "dumps": self.dumps,
+            "skipped": self.skipped,
+        }
+
+profiler = SlowRequestProfiler()
+PROFILER_COUNTERS = frozenset({"samples", "dumps", "skipped"})
+
+# ==================== PROMETHEUS ====================
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _labels(**labels) -> str:
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+def _histogram(lines: List[str], name: str, histogram: Histogram, **labels):
+    cumulative = 0
+    for bound, count in zip(histogram.buckets, histogram.counts):
+        cumulative += count
+        lines.append(f"{name}_bucket{_labels(**labels, le=bound)} {cumulative}")
+    lines.append(f"{name}_bucket{_labels(**labels, le='+Inf')} {histogram.count}")
+    lines.append(f"{name}_sum{_labels(**labels) if labels else ''} {histogram.sum}")
+    lines.append(f"{name}_count{_labels(**labels) if labels else ''} {histogram.count}")
+
+def _flatten(prefix: str, values: dict, gauges: Dict[str, float], counters: Dict[str, float],
+             counter_keys: frozenset = frozenset()):
+    for key, value in values.items():
+        name = f"{prefix}_{re.sub(r'[^a-zA-Z0-9_]', '_', str(key))}"
+        if isinstance(value, dict):
+            _flatten(name, value, gauges, counters, counter_keys)
+        elif isinstance(value, (bool, int, float)):
+            if key in counter_keys:
+                counters[f"{name}_total"] = float(value)
+            else:
+                gauges[name] = float(value)
+
+def render_prometheus() -> str:
+    """The registry in the Prometheus text exposition format.
+
+    Reads the thread limiter, so call it from the event loop.
+    """
+    lines = []
+    with metrics._lock:
+        lines.append("# TYPE jobfinder_http_requests_total counter")
+        for (method, route, status_code), count in sorted(metrics.requests.items()):
+            lines.append(f"jobfinder_http_requests_total{_labels(method=method, route=route, status=status_code)} {count}")
+        lines.append("# TYPE jobfinder_http_request_duration_seconds histogram")
+        for (method, route), histogram in sorted(metrics.durations.items()):
+            _histogram(lines, "jobfinder_http_request_duration_seconds", histogram, method=method, route=route)
+        lines.append("# TYPE jobfinder_http_request_sql_queries histogram")
+        for route, histogram in sorted(metrics.route_queries.items()):
+            _histogram(lines, "jobfinder_http_request_sql_queries", histogram, route=route)
+        lines.append("# TYPE jobfinder_http_request_sql_seconds_total counter")
+        for route, seconds in sorted(metrics.route_sql_seconds.items()):
+            lines.append(f"jobfinder_http_request_sql_seconds_total{_labels(route=route)} {seconds}")
+        lines.append("# TYPE jobfinder_sql_query_duration_seconds histogram")
+        _histogram(lines, "jobfinder_sql_query_duration_seconds", metrics.queries)
+        lines.append("# TYPE jobfinder_sql_query_errors_total counter")
+        lines.append(f"jobfinder_sql_query_errors_total {metrics.query_errors}")
+        lines.append("# TYPE jobfinder_db_pool_checkout_wait_seconds histogram")
+        _histogram(lines, "jobfinder_db_pool_checkout_wait_seconds", metrics.pool_waits)
+        lines.append("# TYPE jobfinder_threadpool_saturated_requests_total counter")
+        lines.append(f"jobfinder_threadpool_saturated_requests_total {metrics.saturated_requests}")
+        lines.append("# TYPE jobfinder_background_failures_total counter")
+        for component, count in sorted(metrics.background_failures.items()):
+            lines.append(f"jobfinder_background_failures_total{_labels(component=component)} {count}")
+
+    for gauge in ("size", "checkedout", "overflow", "checkedin"):
+        lines.append(f"# TYPE jobfinder_db_pool_{gauge} gauge")
+        for name, bind in metrics.engines.items():
+            read = getattr(bind.pool, gauge, None)
+            if callable(read):
+                lines.append(f"jobfinder_db_pool_{gauge}{_labels(engine=name)} {read()}")
+
+    limiter = anyio.to_thread.current_default_thread_limiter()
+    threadpool = limiter.statistics()
+    lines.append("# TYPE jobfinder_threadpool_size gauge")
+    lines.append(f"jobfinder_threadpool_size {threadpool.total_tokens}")
+    lines.append("# TYPE jobfinder_threadpool_busy gauge")
+    lines.append(f"jobfinder_threadpool_busy {threadpool.borrowed_tokens}")
+    lines.append("# TYPE jobfinder_threadpool_waiting gauge")
+    lines.append(f"jobfinder_threadpool_waiting {threadpool.tasks_waiting}")
+
+    gauges: Dict[str, float] = {}
+    counters: Dict[str, float] = {}
+    _flatten("jobfinder_profiler", profiler.metrics(), gauges, counters, PROFILER_COUNTERS)
+    for name, (collect, counter_keys) in metrics.collectors.items():
+        try:
+            _flatten(f"jobfinder_{name}", collect(), gauges, counters, counter_keys)
+        except Exception:
+            report_failure("metrics", f"Metrics collector {name} failed")
+    for name, value in sorted(counters.items()):
+        lines.append(f"# TYPE {name} counter")
+        lines.append(f"{name} {value}")
+    for name, value in sorted(gauges.items()):
+        lines.append(f"# TYPE {name} gauge")
+        lines.append(f"{name} {value}")
+    return "\n".join(lines) + "\n"
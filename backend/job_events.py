@@ -0,0 +1,45 @@
+from typing import Callable, List, Sequence
+
+from sqlalchemy import inspect
+from sqlalchemy.orm import Session
+
+from database import Job
+
+# Derived structures (search index, caches, ...) register here so that
+# create_job and bulk ingestion keep all of them in step.
+_saved_listeners: List[Callable[[Session, List[Job]], None]] = []
+# The same structures, for jobs that left the jobs table (the archiver)
+_removed_listeners: List[Callable[[Session, Sequence], None]] = []
+
+def on_jobs_saved(listener: Callable[[Session, List[Job]], None]):
+    _saved_listeners.append(listener)
+    return listener
+
+def jobs_saved(db: Session, jobs: List[Job]):
+    """Notify listeners about jobs that were just committed (inserted or updated)."""
+    for listener in _saved_listeners:
+        listener(db, jobs)
+
+def on_jobs_removed(listener: Callable[[Session, Sequence], None]):
+    _removed_listeners.append(listener)
+    return listener
+
+def jobs_removed(db: Session, jobs: Sequence):
+    """Notify listeners about jobs whose delete was just committed.
+
+    jobs are the rows as they were before the delete (anything with the
+    Job column attributes), so listeners can take back what they counted.
+    """
+    for listener in _removed_listeners:
+        listener(db, jobs)
+
+def previous_value(job: Job, name: str):
+    """The value a job's column had before the pending flush changed it.
+
+    For after_flush hooks that take back what they counted; the columns
+    they read are tracked with active_history, so the old value is loaded.
+    """
+    history = inspect(job).attrs[name].history
+    if history.deleted:
+        return history.deleted[0]
+    return getattr(job, name)
@@ -0,0 +1,284 @@
+import asyncio
+import os
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, List, Optional, Set
+
+from fastapi import WebSocket, WebSocketDisconnect
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from database import Job
+from job_events import on_jobs_saved
+from serialization import JOB_FIELDS, dumps
+from stats import percentile
+
+try:
+    import orjson
+    _loads = orjson.loads
+except ImportError:
+    import json
+    _loads = json.loads
+
+load_dotenv()
+
+# Events buffered per subscriber; a subscriber that falls this far behind is dropped
+JOB_FEED_QUEUE_SIZE = int(os.getenv("JOB_FEED_QUEUE_SIZE", "100"))
+# Open streams per worker before new ones are turned away
+JOB_FEED_MAX_SUBSCRIBERS = int(os.getenv("JOB_FEED_MAX_SUBSCRIBERS", "20000"))
+# SSE comment sent on idle streams so proxies keep them open
+JOB_FEED_HEARTBEAT_SECONDS = float(os.getenv("JOB_FEED_HEARTBEAT_SECONDS", "15"))
+# "local" fans out within this worker; "redis" reaches every worker
+JOB_FEED_BACKEND = os.getenv("JOB_FEED_BACKEND", "local").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+JOB_FEED_CHANNEL = "jobfinder:job-feed"
+
+# Put on a subscriber's queue, in place of its backlog, when it is dropped
+# for falling behind or the server shuts down
+DROPPED = object()
+CLOSED = object()
+
+# ==================== PUB/SUB BUS ====================
+# Messages are encoded events; every worker decodes and fans out its own copy.
+
+class LocalFeedBus:
+    """In-process bus: enough for one worker, and the stand-in used in tests."""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[bytes], None]] = []
+
+    def subscribe(self, callback: Callable[[bytes], None]):
+        self._subscribers.append(callback)
+
+    def publish(self, message: bytes):
+        for callback in self._subscribers:
+            callback(message)
+
+class RedisFeedBus(LocalFeedBus):
+    """Redis pub/sub bus so a job posted on one worker reaches streams on all of them."""
+
+    def __init__(self, url: str, channel: str = JOB_FEED_CHANNEL):
+        super().__init__()
+        import redis  # optional dependency, only needed for this backend
+
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+        self._listener: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Callable[[bytes], None]):
+        super().subscribe(callback)
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name="job-feed", daemon=True)
+            self._listener.start()
+
+    def publish(self, message: bytes):
+        self._client.publish(self._channel, message)
+
+    def _listen(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel)
+        for message in pubsub.listen():
+            if isinstance(message["data"], bytes):
+                super().publish(message["data"])
+
+def create_bus():
+    if JOB_FEED_BACKEND == "redis":
+        return RedisFeedBus(REDIS_URL)
+    return LocalFeedBus()
+
+# ==================== BROADCASTER ====================
+
+class Subscription:
+    __slots__ = ("categories", "queue")
+
+    def __init__(self, categories: Optional[Set[str]], queue_size: int):
+        self.categories = categories
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+
+class JobBroadcaster:
+    """Fans job events out to per-subscriber bounded queues on the event loop.
+
+    Subscribers are indexed by category, so an event only visits the
+    streams that asked for it. Fan-out never waits: a subscriber whose
+    queue is full is dropped and its stream closed, and the client
+    reconnects.
+    """
+
+    def __init__(self, bus, queue_size: int = JOB_FEED_QUEUE_SIZE,
+                 max_subscribers: int = JOB_FEED_MAX_SUBSCRIBERS, latency_window: int = 1000):
+        self.bus = bus
+        self.queue_size = queue_size
+        self.max_subscribers = max_subscribers
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._unfiltered: Set[Subscription] = set()
+        self._by_category: Dict[str, Set[Subscription]] = {}
+        self._subscribers = 0
+        self._fanout_latencies = deque(maxlen=latency_window)
+        self.published = 0
+        self.delivered = 0
+        self.dropped = 0
+        self.rejected = 0
+        bus.subscribe(self.deliver)
+
+    def start(self, loop: Optional[asyncio.AbstractEventLoop] = None):
+        """Bind to the serving event loop; call from the loop (e.g. on startup)."""
+        self._loop = loop or asyncio.get_running_loop()
+
+    def stop(self):
+        for subscription in list(self._all()):
+            self._close(subscription, CLOSED)
+        self._loop = None
+
+    def _all(self) -> Iterable[Subscription]:
+        yield from self._unfiltered
+        for subscriptions in self._by_category.values():
+            yield from subscriptions
+
+    # ---- subscribers (event loop only) ----
+
+    def subscribe(self, categories: Optional[Iterable[str]] = None) -> Optional[Subscription]:
+        if self._subscribers >= self.max_subscribers:
+            self.rejected += 1
+            return None
+        subscription = Subscription(set(categories) if categories else None, self.queue_size)
+        if subscription.categories is None:
+            self._unfiltered.add(subscription)
+        else:
+            for category in subscription.categories:
+                self._by_category.setdefault(category, set()).add(subscription)
+        self._subscribers += 1
+        return subscription
+
+    def unsubscribe(self, subscription: Subscription):
+        if subscription.categories is None:
+            found = subscription in self._unfiltered
+            self._unfiltered.discard(subscription)
+        else:
+            found = False
+            for category in subscription.categories:
+                subscriptions = self._by_category.get(category)
+                if subscriptions and subscription in subscriptions:
+                    found = True
+                    subscriptions.discard(subscription)
+                    if not subscriptions:
+                        del self._by_category[category]
+        if found:
+            self._subscribers -= 1
+
+    def _close(self, subscription: Subscription, reason):
+        self.unsubscribe(subscription)
+        # Throw away the backlog so the sentinel always fits
+        while not subscription.queue.empty():
+            subscription.queue.get_nowait()
+        subscription.queue.put_nowait(reason)
+
+    # ---- publishing ----
+
+    def publish(self, job: Job):
+        event = {"type": "job", "job": {name: getattr(job, name) for name in JOB_FIELDS}, "published_at": time.time()}
+        self.bus.publish(dumps(event))
+
+    def deliver(self, message: bytes):
+        """Bus callback; safe to call from any thread."""
+        loop = self._loop
+        if loop is None or loop.is_closed():
+            return
+        try:
+            running = asyncio.get_running_loop()
+        except RuntimeError:
+            running = None
+        if running is loop:
+            self._fan_out(message)
+        else:
+            loop.call_soon_threadsafe(self._fan_out, message)
+
+    def _fan_out(self, message: bytes):
+        started = time.perf_counter()
+        category = _loads(message)["job"].get("category")
+        targets = list(self._unfiltered)
+        # An event has one category, so no subscriber is visited twice
+        targets.extend(self._by_category.get(category, ()))
+        delivered = 0
+        for subscription in targets:
+            try:
+                subscription.queue.put_nowait(message)
+                delivered += 1
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self._close(subscription, DROPPED)
+        self.published += 1
+        self.delivered += delivered
+        self._fanout_latencies.append(time.perf_counter() - started)
+
+    # ---- transports ----
+
+    async def sse(self, subscription: Subscription):
+        """Yield the subscription as a text/event-stream body."""
+        try:
+            yield b"retry: 3000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(subscription.queue.get(), JOB_FEED_HEARTBEAT_SECONDS)
+                except asyncio.TimeoutError:
+                    yield b": keepalive\n\n"
+                    continue
+                if message is DROPPED:
+                    yield b"event: dropped\ndata: {}\n\n"
+                    return
+                if message is CLOSED:
+                    return
+                yield b"event: job\ndata: " + message + b"\n\n"
+        finally:
+            self.unsubscribe(subscription)
+
+    async def serve_websocket(self, websocket: WebSocket, subscription: Subscription):
+        """Send the subscription as text frames until either side goes away."""
+        # Clients have nothing to say; reading just notices when they leave
+        receiving = asyncio.ensure_future(websocket.receive())
+        try:
+            while True:
+                getting = asyncio.ensure_future(subscription.queue.get())
+                await asyncio.wait({getting, receiving}, return_when=asyncio.FIRST_COMPLETED)
+                if not getting.done():
+                    getting.cancel()
+                    if receiving.result()["type"] == "websocket.disconnect":
+                        return
+                    receiving = asyncio.ensure_future(websocket.receive())
+                    continue
+                message = getting.result()
+                if message is DROPPED:
+                    # 1013: try again later
+                    await websocket.close(code=1013)
+                    return
+                if message is CLOSED:
+                    await websocket.close(code=1001)
+                    return
+                await websocket.send_text(message.decode())
+        except WebSocketDisconnect:
+            pass
+        finally:
+            receiving.cancel()
+            self.unsubscribe(subscription)
+
+    def metrics(self) -> dict:
+        latencies = sorted(self._fanout_latencies)
+        return {
+            "backend": type(self.bus).__name__,
+            "subscribers": self._subscribers,
+            "categories": len(self._by_category),
+            "published": self.published,
+            "delivered": self.delivered,
+            "dropped": self.dropped,
+            "rejected": self.rejected,
+            "fanout_latency_ms_p50": percentile(latencies, 0.50) * 1000,
+            "fanout_latency_ms_p99": percentile(latencies, 0.99) * 1000,
+        }
+
+job_feed = JobBroadcaster(create_bus())
+
+@on_jobs_saved
+def _publish_saved_jobs(db: Session, jobs: List[Job]):
+    for job in jobs:
+        if job.is_active is not False:
+            job_feed.publish(job)
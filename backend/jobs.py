@@ -0,0 +1,124 @@
+from typing import List, Optional, Sequence
+
+from fastapi import HTTPException, Query, status
+from pydantic import TypeAdapter
+from sqlalchemy.orm import Session
+
+from database import Job
+from schemas import JobResponse, JobSearchResult
+from search import search_jobs
+from pagination import paginate_jobs
+from serialization import FAST_SERIALIZATION, JOB_FIELDS, JOB_ROW_COLUMNS, dumps, job_row
+
+# Most jobs one ?ids= batch lookup may ask for
+MAX_BATCH_IDS = 100
+
+# Query parameters shared by the sync and async listing routes
+JOB_SORT = Query("newest", pattern="^(newest|salary)$")
+SALARY_MATCH = Query("overlap", pattern="^(overlap|within)$")
+
+def split_values(values: Optional[Sequence[str]]) -> List[str]:
+    """Accept both ?job_type=a&job_type=b and ?job_type=a,b."""
+    return [part.strip() for value in values or () for part in value.split(",") if part.strip()]
+
+def parse_ids(values: Sequence[str]) -> List[int]:
+    try:
+        ids = list(dict.fromkeys(int(value) for value in split_values(values)))
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="ids must be comma-separated integers"
+        )
+    if len(ids) > MAX_BATCH_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BATCH_IDS} ids per request"
+        )
+    return ids
+
+def job_filters(
+    category: Optional[str] = None,
+    job_type: Optional[Sequence[str]] = None,
+    location: Optional[Sequence[str]] = None,
+    min_salary: Optional[int] = None,
+    max_salary: Optional[int] = None,
+    salary_match: str = "overlap",
+) -> list:
+    filters = []
+    if category:
+        filters.append(Job.category == category)
+    job_types = split_values(job_type)
+    if job_types:
+        filters.append(Job.job_type.in_(job_types))
+    locations = split_values(location)
+    if locations:
+        filters.append(Job.location.in_(locations))
+
+    # "overlap": the posted range intersects the wanted one;
+    # "within": the posted range lies entirely inside it.
+    # Both lead with salary_max so ix_jobs_active_salary can range-scan.
+    if min_salary is not None:
+        filters.append(Job.salary_max >= min_salary)
+        if salary_match == "within":
+            filters.append(Job.salary_min >= min_salary)
+    if max_salary is not None:
+        if salary_match == "within":
+            filters.append(Job.salary_max <= max_salary)
+        filters.append(Job.salary_min <= max_salary)
+    return filters
+
+def list_jobs(
+    db: Session,
+    skip: int = 0,
+    limit: int = 20,
+    category: Optional[str] = None,
+    q: Optional[str] = None,
+    cursor: Optional[str] = None,
+    job_type: Optional[Sequence[str]] = None,
+    location: Optional[Sequence[str]] = None,
+    min_salary: Optional[int] = None,
+    max_salary: Optional[int] = None,
+    salary_match: str = "overlap",
+    sort: str = "newest",
+    ids: Optional[Sequence[str]] = None,
+):
+    """Return (jobs, next_cursor) for GET /api/jobs; shared by the sync and async routes."""
+    filters = job_filters(category, job_type, location, min_salary, max_salary, salary_match)
+    # Plain column rows skip ORM identity-map and attribute overhead
+    entity = JOB_ROW_COLUMNS if FAST_SERIALIZATION else [Job]
+
+    # Batch lookup: the requested jobs in the requested order, missing ones left out
+    if ids:
+        job_ids = parse_ids(ids)
+        jobs = {job.id: job for job in db.query(*entity).filter(Job.id.in_(job_ids), Job.is_active == True, *filters)}
+        return [jobs[job_id] for job_id in job_ids if job_id in jobs], None
+
+    # Full-text search mode: BM25-ranked with highlighted snippets
+    if q:
+        results = search_jobs(db, q, skip=skip, limit=limit, filters=filters)
+        return [
+            JobSearchResult.model_validate(job).model_copy(update={"score": score, "snippet": snippet})
+            for job, score, snippet in results
+        ], None
+    
+    query = db.query(*entity).filter(Job.is_active == True, *filters)
+    
+    return paginate_jobs(query, limit, skip=skip, cursor=cursor, sort=sort)
+
+_job_list_adapter = TypeAdapter(List[JobSearchResult])
+
+def serialize_jobs(jobs) -> bytes:
+    """Encode a list_jobs page as a JSON array of JobSearchResult."""
+    if not FAST_SERIALIZATION:
+        return _job_list_adapter.dump_json(_job_list_adapter.validate_python(jobs, from_attributes=True))
+    # Rows come straight from typed columns, so they are encoded without
+    # validation; search results are already models
+    return dumps([
+        job.model_dump() if isinstance(job, JobSearchResult) else dict(job_row(job), score=None, snippet=None)
+        for job in jobs
+    ])
+
+def serialize_job(job: Job) -> bytes:
+    if not FAST_SERIALIZATION:
+        return JobResponse.model_validate(job).model_dump_json().encode()
+    return dumps({name: getattr(job, name) for name in JOB_FIELDS})
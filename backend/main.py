@@ -1,22 +1,51 @@
-from fastapi import FastAPI, Depends, HTTPException, status
+from fastapi import FastAPI, Depends, HTTPException, Query, Request, Response, WebSocket, status
+from fastapi.concurrency import run_in_threadpool
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import StreamingResponse
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import Session
-from datetime import datetime, timedelta
-import random
+from datetime import datetime
 import uvicorn
 from typing import List
 
-from database import get_db, init_db, User, Verification, Job, JobApplication
+from database import (
+    get_db, get_read_db, init_db, DB_INIT_ON_STARTUP, DB_MODE,
+    User, Job, SavedSearch
+)
 from schemas import (
     UserCreate, UserLogin, UserResponse, Token,
     VerifyCode, ResendCode,
-    JobCreate, JobResponse,
-    JobApplicationCreate, JobApplicationResponse
+    JobCreate, JobResponse, JobSearchResult, JobFacets, BulkIngestResult, Suggestion,
+    JobApplicationCreate, JobApplicationResponse, JobApplicationWithJob,
+    SavedSearchCreate, SavedSearchResponse
 )
 from auth import (
-    get_password_hash, verify_password, create_access_token,
+    get_password_hash, verify_and_update_password, create_access_token,
     get_current_active_user
 )
+from hashing import executor as hashing_executor
+from search import init_search
+from recommender import init_recommender, recommend_for_user
+from facets import init_facets, get_facets
+from suggest import SUGGEST_FIELDS, SUGGEST_MAX_LIMIT, init_suggest, suggest_index
+from job_events import jobs_saved
+from jobs import JOB_SORT, SALARY_MATCH, list_jobs, serialize_jobs, serialize_job, split_values
+from response_cache import (
+    response_cache, cached_response, store_response,
+    list_key, job_etag, last_modified_of
+)
+from ingest import BULK_BATCH_SIZE, BulkIngester, RowError, iter_json_array, iter_ndjson
+from export import EXPORT_FORMAT, export_applications_statements, export_jobs_statements, export_response
+from applications import (
+    WRITE_BEHIND, application_writer, insert_application, list_applications, serialize_applications
+)
+from serialization import FastJSONResponse
+from notifications import notification_queue, send_verification_code
+from verification import issue_code, consume_code, sweeper as verification_sweeper
+from archive import archiver
+from job_feed import job_feed
+from saved_searches import alert_dispatcher, create_saved_search, delete_saved_search, init_saved_searches
+from instrumentation import PROMETHEUS_CONTENT_TYPE, MetricsMiddleware, metrics, profiler, render_prometheus
 
 app = FastAPI(title="Job Finder API", version="1.0.0")
 
@@ -28,21 +57,38 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+# Per-route latency, SQL attribution and pool waits for /metrics
+app.add_middleware(MetricsMiddleware)
 
 # Initialize database on startup
 @app.on_event("startup")
 def startup_event():
-    init_db()
+    if DB_INIT_ON_STARTUP:
+        init_db()
+    init_search()
+    init_recommender()
+    init_facets()
+    init_suggest()
+    init_saved_searches()
+    verification_sweeper.start()
+    archiver.start()
+    notification_queue.start()
+    alert_dispatcher.start()
+    job_feed.start()
+    profiler.start()
     print("Database initialized successfully!")
 
-# Utility Functions
-def generate_verification_code() -> str:
-    return str(random.randint(100000, 999999))
-
-def send_verification_code(email: str, code: str):
-    # TODO: Implement actual email sending (SendGrid, AWS SES, etc.)
-    print(f"Sending verification code {code} to {email}")
-    # For now, just print. In production, integrate with email service
+@app.on_event("shutdown")
+def shutdown_event():
+    verification_sweeper.stop()
+    archiver.stop()
+    # Alerts go out through the notification queue, so drain them first
+    alert_dispatcher.stop()
+    notification_queue.stop()
+    application_writer.stop()
+    job_feed.stop()
+    profiler.stop()
+    hashing_executor.shutdown()
 
 # ==================== AUTH ROUTES ====================
 
@@ -77,19 +123,12 @@ def register(user_data: UserCreate, db: Session = Depends(get_db)):
     )
     
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    db.flush()
     
-    # Generate verification code
-    code = generate_verification_code()
-    verification = Verification(
-        user_id=new_user.id,
-        code=code,
-        expires_at=datetime.utcnow() + timedelta(minutes=10)
-    )
-    
-    db.add(verification)
+    # Generate verification code; saved in the same transaction as the user
+    code = issue_code(db, new_user.id)
     db.commit()
+    db.refresh(new_user)
     
     # Send verification code (email/SMS)
     if new_user.email:
@@ -110,27 +149,23 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
     elif credentials.phone:
         user = db.query(User).filter(User.phone == credentials.phone).first()
     
-    if not user or not verify_password(credentials.password, user.password_hash):
+    valid, new_hash = verify_and_update_password(credentials.password, user.password_hash) if user else (False, None)
+    if not valid:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Incorrect email/phone or password",
             headers={"WWW-Authenticate": "Bearer"},
         )
     
+    # Argon2 parameters changed since this hash was made: store an upgraded one
+    if new_hash:
+        user.password_hash = new_hash
+        db.commit()
+    
     # Check if user is verified
     if not user.verified:
-        # Generate new verification code
-        code = generate_verification_code()
-        
-        # Delete old verification codes
-        db.query(Verification).filter(Verification.user_id == user.id).delete()
-        
-        verification = Verification(
-            user_id=user.id,
-            code=code,
-            expires_at=datetime.utcnow() + timedelta(minutes=10)
-        )
-        db.add(verification)
+        # Generate new verification code, replacing the old one
+        code = issue_code(db, user.id)
         db.commit()
         
         if user.email:
@@ -156,14 +191,9 @@ def login(credentials: UserLogin, db: Session = Depends(get_db)):
 
 @app.post("/api/verify", response_model=dict)
 def verify_code(verify_data: VerifyCode, db: Session = Depends(get_db)):
-    # Find verification record
-    verification = db.query(Verification).filter(
-        Verification.user_id == verify_data.user_id,
-        Verification.code == verify_data.code,
-        Verification.expires_at > datetime.utcnow()
-    ).first()
-    
-    if not verification:
+    # Check and delete the verification record in one statement
+    if not consume_code(db, verify_data.user_id, verify_data.code):
+        db.rollback()
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Invalid or expired verification code"
@@ -172,9 +202,6 @@ def verify_code(verify_data: VerifyCode, db: Session = Depends(get_db)):
     # Update user as verified
     user = db.query(User).filter(User.id == verify_data.user_id).first()
     user.verified = True
-    
-    # Delete verification record
-    db.delete(verification)
     db.commit()
     
     # Create access token
@@ -197,18 +224,8 @@ def resend_verification_code(resend_data: ResendCode, db: Session = Depends(get_
             detail="User not found"
         )
     
-    # Delete old verification codes
-    db.query(Verification).filter(Verification.user_id == user.id).delete()
-    
-    # Generate new code
-    code = generate_verification_code()
-    verification = Verification(
-        user_id=user.id,
-        code=code,
-        expires_at=datetime.utcnow() + timedelta(minutes=10)
-    )
-    
-    db.add(verification)
+    # Generate new code, replacing the old one
+    code = issue_code(db, user.id)
     db.commit()
     
     if user.email:
@@ -242,23 +259,107 @@ def update_current_user(
 
 # ==================== JOB ROUTES ====================
 
-@app.get("/api/jobs", response_model=List[JobResponse])
+@app.get("/api/jobs", response_model=List[JobSearchResult])
 def get_all_jobs(
+    request: Request,
     skip: int = 0,
     limit: int = 20,
     category: str = None,
-    db: Session = Depends(get_db)
+    q: str = None,
+    cursor: str = None,
+    job_type: List[str] = Query(None),
+    location: List[str] = Query(None),
+    min_salary: int = Query(None, ge=0),
+    max_salary: int = Query(None, ge=0),
+    salary_match: str = SALARY_MATCH,
+    sort: str = JOB_SORT,
+    ids: List[str] = Query(None),
+    db: Session = Depends(get_read_db)
 ):
-    query = db.query(Job).filter(Job.is_active == True)
-    
-    if category:
-        query = query.filter(Job.category == category)
-    
-    jobs = query.offset(skip).limit(limit).all()
-    return jobs
+    # Serialized pages are cached until a job is created or changed
+    key = list_key(request)
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+    
+    generation = response_cache.generation
+    jobs, next_cursor = list_jobs(
+        db, skip=skip, limit=limit, category=category, q=q, cursor=cursor,
+        job_type=job_type, location=location, min_salary=min_salary, max_salary=max_salary,
+        salary_match=salary_match, sort=sort, ids=ids,
+    )
+    # Pass X-Next-Cursor back as ?cursor= to page without OFFSET
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return store_response(request, key, serialize_jobs(jobs), generation, last_modified_of(jobs), headers)
+
+@app.get("/api/jobs/recommended", response_model=List[JobSearchResult])
+def get_recommended_jobs(
+    limit: int = Query(20, ge=1, le=100),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_read_db)
+):
+    # Ranked by TF-IDF similarity to the jobs this user applied for
+    return [
+        JobSearchResult.model_validate(job).model_copy(update={"score": score})
+        for job, score in recommend_for_user(db, current_user.id, limit=limit)
+    ]
+
+@app.get("/api/jobs/facets", response_model=JobFacets)
+def get_job_facets(
+    category: str = None,
+    job_type: str = None,
+    location: str = None,
+    salary_bucket: str = None,
+    db: Session = Depends(get_read_db)
+):
+    # Served from the job_facet_counts aggregate, never a GROUP BY over jobs
+    return get_facets(db, {
+        "category": category,
+        "job_type": job_type,
+        "location": location,
+        "salary_bucket": salary_bucket,
+    })
+
+# ==================== LIVE FEED ====================
+# New postings are pushed as they are saved instead of clients re-polling
+# GET /api/jobs. ?category= narrows the feed (repeat it or comma-separate).
+
+def _feed_unavailable() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="Too many open job streams, please retry",
+        headers={"Retry-After": "5"},
+    )
+
+@app.get("/api/jobs/stream")
+async def stream_jobs_sse(category: List[str] = Query(None)):
+    subscription = job_feed.subscribe(split_values(category))
+    if subscription is None:
+        raise _feed_unavailable()
+    return StreamingResponse(
+        job_feed.sse(subscription),
+        media_type="text/event-stream",
+        # Keep proxies from buffering the stream
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+@app.websocket("/api/jobs/stream")
+async def stream_jobs_websocket(websocket: WebSocket, category: List[str] = Query(None)):
+    await websocket.accept()
+    subscription = job_feed.subscribe(split_values(category))
+    if subscription is None:
+        await websocket.close(code=1013)
+        return
+    await job_feed.serve_websocket(websocket, subscription)
 
 @app.get("/api/jobs/{job_id}", response_model=JobResponse)
-def get_job_by_id(job_id: int, db: Session = Depends(get_db)):
+def get_job_by_id(job_id: int, request: Request, db: Session = Depends(get_read_db)):
+    key = ("job", job_id)
+    cached = cached_response(request, key)
+    if cached:
+        return cached
+    
+    generation = response_cache.generation
     job = db.query(Job).filter(Job.id == job_id, Job.is_active == True).first()
     
     if not job:
@@ -267,7 +368,7 @@ def get_job_by_id(job_id: int, db: Session = Depends(get_db)):
             detail="Job not found"
         )
     
-    return job
+    return store_response(request, key, serialize_job(job), generation, job.updated_at, etag=job_etag(job))
 
 @app.post("/api/jobs", response_model=JobResponse, status_code=status.HTTP_201_CREATED)
 def create_job(
@@ -278,11 +379,58 @@ def create_job(
     new_job = Job(**job_data.model_dump())
     
     db.add(new_job)
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        # ux_jobs_external_id is the only unique key a posting can hit
+        db.rollback()
+        raise HTTPException(
+            status_code=status.HTTP_409_CONFLICT,
+            detail="A job with this external_id already exists"
+        )
     db.refresh(new_job)
+    jobs_saved(db, [new_job])
     
     return new_job
 
+@app.post("/api/jobs/bulk", response_model=BulkIngestResult)
+async def bulk_create_jobs(
+    request: Request,
+    batch_size: int = Query(BULK_BATCH_SIZE, ge=1, le=10000),
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    # Accepts a JSON array or, with an NDJSON content type, one job per line.
+    # The body is parsed as it arrives, so memory does not grow with its size.
+    content_type = request.headers.get("content-type", "")
+    if "ndjson" in content_type or "jsonlines" in content_type:
+        rows = iter_ndjson(request.stream())
+    else:
+        rows = iter_json_array(request.stream())
+    
+    ingester = BulkIngester(batch_size)
+    try:
+        async for row, value in rows:
+            if ingester.add(row, value):
+                await run_in_threadpool(ingester.flush, db)
+    except RowError as exc:
+        # The stream itself is unreadable past this point
+        ingester.fail(ingester.received, str(exc))
+    await run_in_threadpool(ingester.flush, db)
+    
+    return ingester.result()
+
+# ==================== SUGGEST ROUTES ====================
+
+@app.get("/api/suggest", response_model=List[Suggestion])
+async def suggest(
+    prefix: str = Query(..., min_length=1, max_length=100),
+    field: str = Query(None, pattern="^(" + "|".join(SUGGEST_FIELDS) + ")$"),
+    limit: int = Query(10, ge=1, le=SUGGEST_MAX_LIMIT)
+):
+    # Served from memory on every keystroke; async skips the threadpool hop
+    return suggest_index.suggest(prefix, field, limit)
+
 # ==================== JOB APPLICATION ROUTES ====================
 
 @app.post("/api/applications", response_model=JobApplicationResponse, status_code=status.HTTP_201_CREATED)
@@ -291,47 +439,148 @@ def apply_for_job(
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    # Check if job exists
-    job = db.query(Job).filter(Job.id == application_data.job_id).first()
-    if not job:
-        raise HTTPException(
-            status_code=status.HTTP_404_NOT_FOUND,
-            detail="Job not found"
-        )
-    
-    # Check if already applied
-    existing_application = db.query(JobApplication).filter(
-        JobApplication.user_id == current_user.id,
-        JobApplication.job_id == application_data.job_id
-    ).first()
-    
-    if existing_application:
-        raise HTTPException(
-            status_code=status.HTTP_400_BAD_REQUEST,
-            detail="You have already applied for this job"
-        )
-    
-    new_application = JobApplication(
-        user_id=current_user.id,
-        job_id=application_data.job_id
-    )
-    
-    db.add(new_application)
+    # Group-committed with other applications by the background writer;
+    # the connection goes back to the pool while this request waits
+    if WRITE_BEHIND:
+        db.close()
+        return application_writer.apply(current_user.id, application_data.job_id)
+    
+    # Job check, duplicate check and insert in a single statement
+    new_application = insert_application(db, current_user.id, application_data.job_id)
     db.commit()
-    db.refresh(new_application)
     
     return new_application
 
-@app.get("/api/applications/me", response_model=List[JobApplicationResponse])
+@app.get("/api/applications/me", response_model=List[JobApplicationWithJob])
 def get_my_applications(
+    skip: int = 0,
+    limit: int = Query(100, ge=1, le=500),
+    cursor: str = None,
+    expand: str = Query(None, pattern="^job$"),
     current_user: User = Depends(get_current_active_user),
     db: Session = Depends(get_db)
 ):
-    applications = db.query(JobApplication).filter(
-        JobApplication.user_id == current_user.id
-    ).all()
-    
-    return applications
+    # ?expand=job embeds each job so clients don't fetch them one by one
+    applications, next_cursor = list_applications(
+        db, current_user.id, skip=skip, limit=limit, cursor=cursor, expand_job=expand == "job"
+    )
+    headers = {"X-Next-Cursor": next_cursor} if next_cursor else {}
+    return FastJSONResponse(serialize_applications(applications), headers=headers)
+
+# ==================== SAVED SEARCH ROUTES ====================
+
+@app.post("/api/saved-searches", response_model=SavedSearchResponse, status_code=status.HTTP_201_CREATED)
+def save_search(
+    search_data: SavedSearchCreate,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    # New jobs matching it are emailed to the user as they are posted
+    return create_saved_search(db, current_user.id, search_data)
+
+@app.get("/api/saved-searches", response_model=List[SavedSearchResponse])
+def get_my_saved_searches(
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    return db.query(SavedSearch).filter(SavedSearch.user_id == current_user.id).order_by(SavedSearch.id).all()
+
+@app.delete("/api/saved-searches/{search_id}", status_code=status.HTTP_204_NO_CONTENT)
+def remove_saved_search(
+    search_id: int,
+    current_user: User = Depends(get_current_active_user),
+    db: Session = Depends(get_db)
+):
+    delete_saved_search(db, current_user.id, search_id)
+    return Response(status_code=status.HTTP_204_NO_CONTENT)
+
+# ==================== EXPORT ROUTES ====================
+
+@app.get("/api/export/jobs")
+def export_jobs(
+    request: Request,
+    fmt: str = EXPORT_FORMAT,
+    category: str = None,
+    is_active: bool = None,
+    created_from: datetime = None,
+    created_to: datetime = None,
+    include_archived: bool = True,
+    current_user: User = Depends(get_current_active_user)
+):
+    statements = export_jobs_statements(category, is_active, created_from, created_to, include_archived)
+    return export_response(request, statements, fmt, "jobs")
+
+@app.get("/api/export/applications")
+def export_applications(
+    request: Request,
+    fmt: str = EXPORT_FORMAT,
+    application_status: str = Query(None, alias="status"),
+    job_id: int = None,
+    applied_from: datetime = None,
+    applied_to: datetime = None,
+    include_archived: bool = True,
+    current_user: User = Depends(get_current_active_user)
+):
+    statements = export_applications_statements(
+        current_user.id, application_status, job_id, applied_from, applied_to, include_archived
+    )
+    return export_response(request, statements, fmt, "job_applications")
+
+# ==================== METRICS ====================
+
+@app.get("/api/metrics/hashing")
+def get_hashing_metrics():
+    return hashing_executor.metrics()
+
+@app.get("/api/metrics/cache")
+def get_cache_metrics():
+    return response_cache.metrics()
+
+@app.get("/api/metrics/suggest")
+def get_suggest_metrics():
+    return suggest_index.metrics()
+
+@app.get("/api/metrics/verification")
+def get_verification_metrics():
+    return verification_sweeper.metrics()
+
+@app.get("/api/metrics/archive")
+def get_archive_metrics():
+    return archiver.metrics()
+
+@app.get("/api/metrics/notifications")
+def get_notification_metrics():
+    return notification_queue.metrics()
+
+@app.get("/api/metrics/applications")
+def get_application_metrics():
+    return application_writer.metrics()
+
+@app.get("/api/metrics/feed")
+async def get_feed_metrics():
+    return job_feed.metrics()
+
+@app.get("/api/metrics/alerts")
+def get_alert_metrics():
+    return alert_dispatcher.metrics()
+
+metrics.register_collector("hashing", hashing_executor.metrics, counters=("completed", "rejected"))
+metrics.register_collector("cache", response_cache.metrics, counters=(
+    "hits", "misses", "not_modified", "bytes_served_from_cache", "bytes_saved_by_304"))
+metrics.register_collector("suggest", suggest_index.metrics, counters=("dropped",))
+metrics.register_collector("verification", verification_sweeper.metrics, counters=("purged",))
+metrics.register_collector("archive", archiver.metrics, counters=("archived_jobs", "archived_applications"))
+metrics.register_collector("notifications", notification_queue.metrics, counters=(
+    "sent", "retried", "failed", "dropped", "batches"))
+metrics.register_collector("applications", application_writer.metrics, counters=("batches", "rows"))
+metrics.register_collector("feed", job_feed.metrics, counters=("published", "delivered", "dropped", "rejected"))
+metrics.register_collector("alerts", alert_dispatcher.metrics, counters=(
+    "percolated", "matched", "alerts", "skipped", "dropped"))
+
+@app.get("/metrics", include_in_schema=False)
+async def prometheus_metrics():
+    # Async so it runs on the event loop, where the threadpool limiter lives
+    return Response(render_prometheus(), media_type=PROMETHEUS_CONTENT_TYPE)
 
 # ==================== HEALTH CHECK ====================
 
@@ -339,6 +588,12 @@ def get_my_applications(
 def health_check():
     return {"status": "healthy", "message": "Job Finder API is running"}
 
+# ==================== ASYNC MODE ====================
+
+if DB_MODE == "async":
+    from async_routes import install_async_routes
+    install_async_routes(app)
+
 if __name__ == "__main__":
     
     uvicorn.run("main:app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
@@ -0,0 +1,326 @@
+import heapq
+import logging
+import os
+import queue
+import random
+import smtplib
+import threading
+import time
+from collections import deque
+from email.message import EmailMessage
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from instrumentation import report_failure
+from stats import percentile
+
+load_dotenv()
+
+logger = logging.getLogger("jobfinder.notifications")
+
+# "console" prints messages (local development), "smtp" delivers them
+NOTIFY_TRANSPORT = os.getenv("NOTIFY_TRANSPORT", "console").lower()
+# 0 workers sends inline in the calling thread (handy for local debugging)
+NOTIFY_WORKERS = int(os.getenv("NOTIFY_WORKERS", "2"))
+NOTIFY_QUEUE_SIZE = int(os.getenv("NOTIFY_QUEUE_SIZE", "10000"))
+# Messages a worker sends over one connection before taking more from the queue
+NOTIFY_BATCH_SIZE = int(os.getenv("NOTIFY_BATCH_SIZE", "50"))
+NOTIFY_MAX_ATTEMPTS = int(os.getenv("NOTIFY_MAX_ATTEMPTS", "5"))
+NOTIFY_RETRY_BASE_SECONDS = float(os.getenv("NOTIFY_RETRY_BASE_SECONDS", "1"))
+NOTIFY_RETRY_MAX_SECONDS = float(os.getenv("NOTIFY_RETRY_MAX_SECONDS", "300"))
+
+SMTP_HOST = os.getenv("SMTP_HOST", "localhost")
+SMTP_PORT = int(os.getenv("SMTP_PORT", "25"))
+SMTP_USERNAME = os.getenv("SMTP_USERNAME")
+SMTP_PASSWORD = os.getenv("SMTP_PASSWORD")
+SMTP_STARTTLS = os.getenv("SMTP_STARTTLS", "false").lower() == "true"
+SMTP_TIMEOUT = float(os.getenv("SMTP_TIMEOUT", "10"))
+SMTP_SENDER = os.getenv("SMTP_SENDER", "no-reply@jobfinder.local")
+
+def generate_verification_code() -> str:
+    return str(random.randint(100000, 999999))
+
+class Notification:
+    __slots__ = ("recipient", "subject", "body", "enqueued_at", "attempts")
+
+    def __init__(self, recipient: str, subject: str, body: str):
+        self.recipient = recipient
+        self.subject = subject
+        self.body = body
+        self.enqueued_at = time.perf_counter()
+        self.attempts = 0
+
+# ==================== TRANSPORTS ====================
+# send_batch returns the messages that could not be delivered; raising
+# means the whole batch failed. Either way the queue retries them.
+
+class ConsoleTransport:
+    def send_batch(self, messages: List[Notification]) -> List[Notification]:
+        for message in messages:
+            print(f"Sending {message.subject.lower()} to {message.recipient}: {message.body}")
+        return []
+
+    def close(self):
+        pass
+
+class SMTPTransport:
+    """Delivers over a small pool of persistent SMTP connections."""
+
+    def __init__(self, host: str = SMTP_HOST, port: int = SMTP_PORT, username: Optional[str] = SMTP_USERNAME,
+                 password: Optional[str] = SMTP_PASSWORD, starttls: bool = SMTP_STARTTLS,
+                 sender: str = SMTP_SENDER, pool_size: int = max(NOTIFY_WORKERS, 1)):
+        self.host = host
+        self.port = port
+        self.username = username
+        self.password = password
+        self.starttls = starttls
+        self.sender = sender
+        self._pool = queue.LifoQueue(maxsize=pool_size)
+        self.connections_opened = 0
+
+    def _connect(self) -> smtplib.SMTP:
+        connection = smtplib.SMTP(self.host, self.port, timeout=SMTP_TIMEOUT)
+        if self.starttls:
+            connection.starttls()
+        if self.username:
+            connection.login(self.username, self.password)
+        self.connections_opened += 1
+        return connection
+
+    def _acquire(self) -> smtplib.SMTP:
+        try:
+            return self._pool.get_nowait()
+        except queue.Empty:
+            return self._connect()
+
+    def _release(self, connection: smtplib.SMTP):
+        try:
+            self._pool.put_nowait(connection)
+        except queue.Full:
+            _quit(connection)
+
+    def send_batch(self, messages: List[Notification]) -> List[Notification]:
+        failed = []
+        connection = None
+        reconnected = False
+        for i, message in enumerate(messages):
+            email = EmailMessage()
+            email["From"] = self.sender
+            email["To"] = message.recipient
+            email["Subject"] = message.subject
+            email.set_content(message.body)
+            try:
+                if connection is None:
+                    connection = self._acquire()
+                try:
+                    connection.send_message(email)
+                except smtplib.SMTPServerDisconnected:
+                    if reconnected:
+                        raise
+                    # Pooled connections go stale; reconnect once per batch
+                    _quit(connection)
+                    connection = None
+                    reconnected = True
+                    connection = self._connect()
+                    connection.send_message(email)
+            except smtplib.SMTPRecipientsRefused:
+                failed.append(message)
+            except Exception as exc:
+                # Only this message and the ones after it are retried, so
+                # nothing delivered earlier in the batch goes out twice
+                logger.warning("SMTP batch stopped after %d of %d messages: %s", i, len(messages), exc)
+                if connection is not None:
+                    _quit(connection)
+                return failed + messages[i:]
+        if connection is not None:
+            self._release(connection)
+        return failed
+
+    def close(self):
+        while True:
+            try:
+                _quit(self._pool.get_nowait())
+            except queue.Empty:
+                return
+
+def _quit(connection: smtplib.SMTP):
+    try:
+        connection.quit()
+    except (smtplib.SMTPException, OSError):
+        connection.close()
+
+def make_transport(name: str = NOTIFY_TRANSPORT):
+    if name == "smtp":
+        return SMTPTransport()
+    return ConsoleTransport()
+
+# ==================== QUEUE ====================
+
+class NotificationQueue:
+    """Bounded outbound queue drained by background threads.
+
+    Workers send in batches and retry failures with jittered exponential
+    backoff, so request handlers only pay for an enqueue.
+    """
+
+    def __init__(self, transport, workers: int = NOTIFY_WORKERS, queue_size: int = NOTIFY_QUEUE_SIZE,
+                 batch_size: int = NOTIFY_BATCH_SIZE, latency_window: int = 1000):
+        self.transport = transport
+        self.workers = workers
+        self.batch_size = batch_size
+        self._queue = queue.Queue(maxsize=queue_size)
+        # (due, sequence, message) for messages waiting to be retried
+        self._delayed = []
+        self._sequence = 0
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._threads = []
+        self._send_latencies = deque(maxlen=latency_window)
+        self._delivery_latencies = deque(maxlen=latency_window)
+        self.sent = 0
+        self.retried = 0
+        self.failed = 0
+        self.dropped = 0
+        self.batches = 0
+
+    def start(self):
+        if self.workers <= 0 or self._threads:
+            return
+        self._stop.clear()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"notify-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        """Stop the workers after giving queued messages up to timeout seconds to go out.
+
+        Messages still waiting out a retry backoff get one last attempt;
+        whatever cannot be delivered before the deadline is counted as
+        dropped and logged rather than silently discarded.
+        """
+        deadline = time.monotonic() + timeout
+        while self._threads and not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+        with self._lock:
+            pending = [message for _, _, message in sorted(self._delayed)]
+            self._delayed = []
+        while True:
+            try:
+                pending.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        attempted = 0
+        while attempted < len(pending) and time.monotonic() < deadline:
+            self._send(pending[attempted:attempted + self.batch_size], final=True)
+            attempted += self.batch_size
+        undelivered = pending[attempted:]
+        if undelivered:
+            with self._lock:
+                self.dropped += len(undelivered)
+            for message in undelivered:
+                logger.warning("Notification queue stopped, dropped message to %s", message.recipient)
+        self.transport.close()
+
+    def enqueue(self, message: Notification) -> bool:
+        if self.workers <= 0:
+            self._send([message])
+            return True
+        try:
+            self._queue.put_nowait(message)
+            return True
+        except queue.Full:
+            # The caller already committed its work; the user can ask for a resend
+            with self._lock:
+                self.dropped += 1
+            logger.warning("Notification queue full, dropped message to %s", message.recipient)
+            return False
+
+    def _run(self):
+        while not self._stop.is_set():
+            batch = self._due_retries()
+            if not batch:
+                try:
+                    batch.append(self._queue.get(timeout=self._wait_time()))
+                except queue.Empty:
+                    continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            self._send(batch)
+
+    def _due_retries(self) -> List[Notification]:
+        now = time.monotonic()
+        due = []
+        with self._lock:
+            while self._delayed and self._delayed[0][0] <= now and len(due) < self.batch_size:
+                due.append(heapq.heappop(self._delayed)[2])
+        return due
+
+    def _wait_time(self) -> float:
+        with self._lock:
+            if self._delayed:
+                return min(max(self._delayed[0][0] - time.monotonic(), 0.01), 0.5)
+        return 0.5
+
+    def _send(self, batch: List[Notification], final: bool = False):
+        started = time.perf_counter()
+        try:
+            failed = self.transport.send_batch(batch)
+        except Exception:
+            report_failure("notifications", f"Notification batch of {len(batch)} failed")
+            failed = batch
+        finished = time.perf_counter()
+
+        failed_ids = {id(message) for message in failed}
+        with self._lock:
+            self.batches += 1
+            self._send_latencies.append(finished - started)
+            for message in batch:
+                if id(message) not in failed_ids:
+                    self.sent += 1
+                    self._delivery_latencies.append(finished - message.enqueued_at)
+            for message in failed:
+                message.attempts += 1
+                if message.attempts >= NOTIFY_MAX_ATTEMPTS or self.workers <= 0 or final:
+                    self.failed += 1
+                    continue
+                self.retried += 1
+                backoff = min(NOTIFY_RETRY_BASE_SECONDS * 2 ** (message.attempts - 1), NOTIFY_RETRY_MAX_SECONDS)
+                self._sequence += 1
+                heapq.heappush(self._delayed, (time.monotonic() + backoff * random.uniform(0.5, 1.0), self._sequence, message))
+
+    def metrics(self) -> dict:
+        with self._lock:
+            send = sorted(self._send_latencies)
+            delivery = sorted(self._delivery_latencies)
+            delayed = len(self._delayed)
+        return {
+            "transport": type(self.transport).__name__,
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize(),
+            "retry_depth": delayed,
+            "sent": self.sent,
+            "retried": self.retried,
+            "failed": self.failed,
+            "dropped": self.dropped,
+            "batches": self.batches,
+            "send_latency_ms_p50": percentile(send, 0.50) * 1000,
+            "send_latency_ms_p99": percentile(send, 0.99) * 1000,
+            "delivery_latency_ms_p50": percentile(delivery, 0.50) * 1000,
+            "delivery_latency_ms_p99": percentile(delivery, 0.99) * 1000,
+        }
+
+notification_queue = NotificationQueue(make_transport())
+
+def send_verification_code(email: str, code: str):
+    # Only enqueues; delivery happens on the notification workers
+    notification_queue.enqueue(Notification(email, "Verification code", f"Your verification code is {code}"))
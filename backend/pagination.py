@@ -0,0 +1,124 @@
+import base64
+import json
+from datetime import datetime
+from typing import List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import Select, select, tuple_, union_all
+from sqlalchemy.orm import Query, Session
+
+from database import Job
+
+# Sort key per ?sort= value; id breaks ties so every order is total
+SORT_KEYS = {
+    "newest": Job.created_at,
+    "salary": Job.salary_max,
+}
+# Sort keys that may be NULL; those rows are listed last
+NULLABLE_SORTS = {"salary"}
+
+def job_order(query: Query, sort: str = "newest"):
+    key = SORT_KEYS[sort]
+    if sort == "salary" and query.session.get_bind().dialect.name != "sqlite":
+        # SQLite already sorts NULLs last in descending order; spelling it out
+        # there would stop it from walking the index backwards
+        return (key.desc().nulls_last(), Job.id.desc())
+    return (key.desc(), Job.id.desc())
+
+def _encode(values: list) -> str:
+    raw = json.dumps(values).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+def _invalid_cursor() -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_400_BAD_REQUEST,
+        detail="Invalid cursor"
+    )
+
+def _decode(cursor: str) -> list:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        return json.loads(base64.urlsafe_b64decode(padded))
+    except ValueError:
+        raise _invalid_cursor()
+
+def encode_cursor(job: Job, sort: str = "newest") -> str:
+    key = getattr(job, SORT_KEYS[sort].key)
+    if isinstance(key, datetime):
+        key = key.isoformat()
+    return _encode([key, job.id])
+
+def decode_cursor(cursor: str, sort: str = "newest") -> Tuple[object, int]:
+    try:
+        key, job_id = _decode(cursor)
+        if sort == "newest":
+            key = datetime.fromisoformat(key)
+        elif key is not None and not isinstance(key, int):
+            raise ValueError(key)
+        return key, int(job_id)
+    except (ValueError, TypeError):
+        raise _invalid_cursor()
+
+def paginate_jobs(query: Query, limit: int, skip: int = 0, cursor: Optional[str] = None, sort: str = "newest"):
+    """Return (jobs, next_cursor) for a filtered Job query.
+
+    With a cursor the page starts strictly after the encoded (sort key, id)
+    pair, so the index range scan does not depend on how deep the page is.
+    """
+    column = SORT_KEYS[sort]
+    page = query.order_by(*job_order(query, sort))
+    key = None
+    if cursor:
+        key, job_id = decode_cursor(cursor, sort)
+        if key is None:
+            page = page.filter(column.is_(None), Job.id < job_id)
+        else:
+            page = page.filter(tuple_(column, Job.id) < tuple_(key, job_id))
+    elif skip:
+        page = page.offset(skip)
+
+    # Fetch one extra row to know whether another page exists
+    jobs = page.limit(limit + 1).all()
+    if cursor and key is not None and len(jobs) <= limit and sort in NULLABLE_SORTS:
+        # The tuple comparison never matches NULL keys, which sort after
+        # every value; keep going with them in a second range scan
+        jobs += query.filter(column.is_(None)).order_by(Job.id.desc()).limit(limit + 1 - len(jobs)).all()
+    next_cursor = encode_cursor(jobs[limit - 1], sort) if len(jobs) > limit and limit > 0 else None
+    return jobs[:limit], next_cursor
+
+def _application_cursor(application) -> str:
+    return _encode([application.applied_at.isoformat(), application.id])
+
+def paginate_applications(db: Session, statements: List[Tuple[Select, type]], limit: int, skip: int = 0,
+                          cursor: Optional[str] = None):
+    """Return (rows, next_cursor), most recent application first.
+
+    statements pairs a select of the application columns with the table
+    (live or archived) it reads. They are combined into one UNION ALL;
+    each is range-scanned from the cursor and cut off before the merge,
+    so the statement's cost follows the page size, not the history.
+    """
+    if cursor:
+        try:
+            applied_at, application_id = _decode(cursor)
+            applied_at, application_id = datetime.fromisoformat(applied_at), int(application_id)
+        except (ValueError, TypeError):
+            raise _invalid_cursor()
+    wanted = (0 if cursor else skip) + limit + 1
+    branches = []
+    for statement, model in statements:
+        if cursor:
+            statement = statement.where(tuple_(model.applied_at, model.id) < tuple_(applied_at, application_id))
+        statement = statement.order_by(model.applied_at.desc(), model.id.desc()).limit(wanted)
+        # Wrapped, since SQLite allows no ORDER BY or LIMIT on a UNION member itself
+        branches.append(select(statement.subquery()))
+    merged = union_all(*branches).subquery()
+    page = select(merged).order_by(merged.c.applied_at.desc(), merged.c.id.desc())
+    if skip and not cursor:
+        page = page.offset(skip)
+
+    applications = db.execute(page.limit(limit + 1)).all()
+    next_cursor = None
+    if len(applications) > limit and limit > 0:
+        next_cursor = _application_cursor(applications[limit - 1])
+    return applications[:limit], next_cursor
@@ -0,0 +1,139 @@
+import os
+import threading
+from typing import Callable, List, Optional
+
+from sqlalchemy import event, inspect, select
+from sqlalchemy.orm import Session, make_transient_to_detached
+from sqlalchemy.ext.asyncio import AsyncSession
+from dotenv import load_dotenv
+
+from cache import TTLLRUCache
+from database import User
+
+load_dotenv()
+
+PRINCIPAL_CACHE_TTL = float(os.getenv("PRINCIPAL_CACHE_TTL", "60"))
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+TOKEN_CACHE_SIZE = int(os.getenv("TOKEN_CACHE_SIZE", "50000"))
+# "local" only invalidates this process; "redis" fans out to every worker
+PRINCIPAL_CACHE_BACKEND = os.getenv("PRINCIPAL_CACHE_BACKEND", "local").lower()
+REDIS_URL = os.getenv("REDIS_URL", "redis://localhost:6379/0")
+INVALIDATION_CHANNEL = "jobfinder:principal-invalidations"
+
+# user id -> column snapshot of the users row (never a live ORM object)
+principal_cache = TTLLRUCache(PRINCIPAL_CACHE_SIZE, PRINCIPAL_CACHE_TTL)
+# raw JWT -> user id; entries never outlive the token's exp claim
+token_cache = TTLLRUCache(TOKEN_CACHE_SIZE, float("inf"))
+
+_USER_COLUMNS = [column.key for column in inspect(User).column_attrs]
+
+# ==================== INVALIDATION BUS ====================
+
+class LocalInvalidationBus:
+    """In-process bus: enough for one worker, and the stand-in used in tests."""
+
+    def __init__(self):
+        self._subscribers: List[Callable[[int], None]] = []
+
+    def subscribe(self, callback: Callable[[int], None]):
+        self._subscribers.append(callback)
+
+    def publish(self, user_id: int):
+        for callback in self._subscribers:
+            callback(user_id)
+
+class RedisInvalidationBus(LocalInvalidationBus):
+    """Redis pub/sub bus so every uvicorn worker drops the same entries."""
+
+    def __init__(self, url: str, channel: str = INVALIDATION_CHANNEL):
+        super().__init__()
+        import redis  # optional dependency, only needed for this backend
+
+        self._client = redis.Redis.from_url(url)
+        self._channel = channel
+        self._listener: Optional[threading.Thread] = None
+
+    def subscribe(self, callback: Callable[[int], None]):
+        super().subscribe(callback)
+        if self._listener is None:
+            self._listener = threading.Thread(target=self._listen, name="principal-invalidations", daemon=True)
+            self._listener.start()
+
+    def publish(self, user_id: int):
+        # Drop it here right away rather than serving the stale entry until
+        # our own message comes back; the echo is a harmless second pop
+        super().publish(user_id)
+        self._client.publish(self._channel, str(user_id))
+
+    def _listen(self):
+        pubsub = self._client.pubsub(ignore_subscribe_messages=True)
+        pubsub.subscribe(self._channel)
+        for message in pubsub.listen():
+            try:
+                user_id = int(message["data"])
+            except (TypeError, ValueError):
+                continue
+            super().publish(user_id)
+
+def create_bus():
+    if PRINCIPAL_CACHE_BACKEND == "redis":
+        return RedisInvalidationBus(REDIS_URL)
+    return LocalInvalidationBus()
+
+bus = create_bus()
+bus.subscribe(principal_cache.pop)
+
+def invalidate_principal(user_id: int):
+    bus.publish(user_id)
+
+# Any committed change to a users row (profile edit, verification,
+# deactivation, password rehash) drops that principal everywhere.
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_users(session, flush_context):
+    changed = session.info.setdefault("changed_user_ids", set())
+    for instance in list(session.dirty) + list(session.deleted):
+        if isinstance(instance, User) and instance.id is not None:
+            changed.add(instance.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_users(session):
+    for user_id in session.info.pop("changed_user_ids", ()):
+        invalidate_principal(user_id)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_users(session):
+    session.info.pop("changed_user_ids", None)
+
+# ==================== LOOKUP ====================
+
+def _snapshot(user: User) -> dict:
+    return {name: getattr(user, name) for name in _USER_COLUMNS}
+
+def _detached(snapshot: dict) -> User:
+    user = User(**snapshot)
+    make_transient_to_detached(user)
+    return user
+
+def get_cached_user(db: Session, user_id: int) -> Optional[User]:
+    """Load a user attached to db, skipping the SELECT while the cache is warm."""
+    snapshot = principal_cache.get(user_id)
+    if snapshot is not None:
+        # merge(load=False) attaches a copy without querying, so routes can still modify it
+        return db.merge(_detached(snapshot), load=False)
+
+    user = db.query(User).filter(User.id == user_id).first()
+    if user is not None:
+        principal_cache.set(user_id, _snapshot(user))
+    return user
+
+async def get_cached_user_async(db: AsyncSession, user_id: int) -> Optional[User]:
+    snapshot = principal_cache.get(user_id)
+    if snapshot is not None:
+        return await db.merge(_detached(snapshot), load=False)
+
+    result = await db.execute(select(User).where(User.id == user_id))
+    user = result.scalars().first()
+    if user is not None:
+        principal_cache.set(user_id, _snapshot(user))
+    return user
@@ -0,0 +1,264 @@
+import threading
+from collections import Counter
+from typing import Dict, List, Sequence, Tuple
+
+import numpy as np
+import scipy.sparse as sp
+from sqlalchemy.orm import Session
+
+from database import engine, Job, JobApplication
+from job_events import on_jobs_removed, on_jobs_saved
+from search import tokenize
+
+# Position terms say more about a posting than its body text
+FIELD_WEIGHTS = {"position": 2, "description": 1, "requirements": 1}
+# Rows buffered before they are appended to the delta matrix
+PENDING_ROWS = 256
+# The delta matrix is merged into the main one once it reaches this share
+DELTA_MERGE_RATIO = 0.1
+# Superseded and removed rows are dropped once they reach this share
+DEAD_ROW_RATIO = 0.25
+
+def job_terms(job) -> Counter:
+    terms = Counter()
+    for field, weight in FIELD_WEIGHTS.items():
+        for token in tokenize(getattr(job, field, None)):
+            terms[token] += weight
+    if getattr(job, "category", None):
+        terms["category:" + job.category.lower()] += 1
+    return terms
+
+class TfidfRecommender:
+    """Content-based recommender over a sparse TF-IDF matrix.
+
+    Rows hold sublinear term frequencies. IDF is applied at query time, so
+    new postings are appended without re-weighting or rebuilding anything:
+
+        score = (M @ (idf * q)) / sqrt(M**2 @ idf**2)
+
+    i.e. cosine similarity computed with two sparse mat-vec products.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.vocabulary: Dict[str, int] = {}
+        self._df = np.zeros(1024, dtype=np.float64)
+        # Main matrix, delta matrix and not-yet-materialised rows; the *_sq
+        # twins hold squared entries for the norm computation
+        self._main = self._main_sq = _empty()
+        self._delta = self._delta_sq = _empty()
+        self._pending: List[Tuple[List[int], List[float]]] = []
+        self._job_ids = np.zeros(1024, dtype=np.int64)
+        self._alive = np.zeros(1024, dtype=bool)
+        self._rows = 0
+        # Rows no job points at any more: replaced by a newer row or removed
+        self._dead = 0
+        self._row_of: Dict[int, int] = {}
+
+    def __len__(self):
+        return int(self._alive[:self._rows].sum())
+
+    # -------------------- writes --------------------
+
+    def add(self, job_id: int, terms: Counter, active: bool = True):
+        """Append a job's row. Inactive jobs are never recommended but can still seed a profile."""
+        with self._lock:
+            self._remove_locked(job_id)
+            indices, data = [], []
+            for term, frequency in terms.items():
+                column = self.vocabulary.get(term)
+                if column is None:
+                    column = self.vocabulary[term] = len(self.vocabulary)
+                    if column >= len(self._df):
+                        self._df = np.concatenate([self._df, np.zeros_like(self._df)])
+                if active:
+                    self._df[column] += 1
+                indices.append(column)
+                data.append(1.0 + np.log(frequency))
+
+            row = self._rows
+            if row >= len(self._job_ids):
+                self._job_ids = np.concatenate([self._job_ids, np.zeros_like(self._job_ids)])
+                self._alive = np.concatenate([self._alive, np.zeros_like(self._alive)])
+            self._job_ids[row] = job_id
+            self._alive[row] = active
+            if job_id in self._row_of:
+                self._dead += 1
+            self._row_of[job_id] = row
+            self._rows += 1
+            self._pending.append((indices, data))
+            if len(self._pending) >= PENDING_ROWS:
+                self._materialize_locked()
+
+    def remove(self, job_id: int):
+        with self._lock:
+            self._remove_locked(job_id)
+            if self._row_of.pop(job_id, None) is not None:
+                self._dead += 1
+
+    def _remove_locked(self, job_id: int):
+        row = self._row_of.get(job_id)
+        if row is None or not self._alive[row]:
+            return
+        # The row stays in the matrix but is masked out of every result;
+        # its terms no longer count towards document frequency
+        self._alive[row] = False
+        for column in self._row_vector_locked(row).indices:
+            self._df[column] -= 1
+
+    def _row_vector_locked(self, row: int) -> sp.csr_matrix:
+        # Only flushes pending rows: merging or compacting here would
+        # renumber the row the caller is holding
+        self._append_pending_locked()
+        main_rows = self._main.shape[0]
+        if row < main_rows:
+            return self._main[row]
+        return self._delta[row - main_rows]
+
+    def _append_pending_locked(self):
+        if self._pending:
+            block = self._block(self._pending, len(self.vocabulary))
+            self._delta = _vstack(self._delta, block)
+            self._delta_sq = _vstack(self._delta_sq, block.multiply(block).tocsr())
+            self._pending = []
+
+    def _materialize_locked(self):
+        self._append_pending_locked()
+        # Merging costs O(nnz), so only do it once the delta is a sizeable share
+        if self._delta.shape[0] > max(PENDING_ROWS, DELTA_MERGE_RATIO * self._main.shape[0]):
+            self._main = _vstack(self._main, self._delta)
+            self._main_sq = _vstack(self._main_sq, self._delta_sq)
+            self._delta = self._delta_sq = _empty()
+        # Dead rows are masked, yet every query still scores them. Dropping
+        # them is another O(nnz) pass, so it too waits for a sizeable share
+        if self._dead > max(PENDING_ROWS, DEAD_ROW_RATIO * self._rows):
+            self._compact_locked()
+
+    def _compact_locked(self):
+        """Rebuild the matrices from the rows jobs still point at, renumbering them."""
+        keep = np.fromiter(sorted(self._row_of.values()), dtype=np.int64, count=len(self._row_of))
+        # New arrays throughout: readers may still hold the old ones
+        self._main = _vstack(self._main, self._delta)[keep]
+        self._main_sq = _vstack(self._main_sq, self._delta_sq)[keep]
+        self._delta = self._delta_sq = _empty()
+        capacity = max(1024, 2 * len(keep))
+        job_ids = np.zeros(capacity, dtype=np.int64)
+        job_ids[:len(keep)] = self._job_ids[keep]
+        alive = np.zeros(capacity, dtype=bool)
+        alive[:len(keep)] = self._alive[keep]
+        self._job_ids, self._alive = job_ids, alive
+        self._rows = len(keep)
+        self._row_of = {int(job_id): row for row, job_id in enumerate(job_ids[:self._rows])}
+        self._dead = 0
+
+    @staticmethod
+    def _block(rows, columns) -> sp.csr_matrix:
+        indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+        np.cumsum([len(indices) for indices, _ in rows], out=indptr[1:])
+        indices = np.fromiter((i for row, _ in rows for i in row), dtype=np.int32, count=indptr[-1])
+        data = np.fromiter((d for _, row in rows for d in row), dtype=np.float32, count=indptr[-1])
+        return sp.csr_matrix((data, indices, indptr), shape=(len(rows), columns))
+
+    # -------------------- reads --------------------
+
+    def recommend(self, seed_job_ids: Sequence[int], limit: int = 20,
+                  exclude: Sequence[int] = ()) -> List[Tuple[int, float]]:
+        """Rank alive jobs by cosine similarity to the centroid of the seed jobs."""
+        with self._lock:
+            self._materialize_locked()
+            blocks = [(self._main, self._main_sq), (self._delta, self._delta_sq)]
+            rows = self._rows
+            job_ids = self._job_ids[:rows]
+            alive = self._alive[:rows].copy()
+            df = self._df[:len(self.vocabulary)].copy()
+            seed_rows = [self._row_of[job_id] for job_id in seed_job_ids if job_id in self._row_of]
+            seed_vectors = [self._row_vector_locked(row) for row in seed_rows]
+            for job_id in exclude:
+                row = self._row_of.get(job_id)
+                if row is not None:
+                    alive[row] = False
+
+        if not seed_vectors or not alive.any():
+            return []
+
+        live_docs = max(int(alive.sum()), 1)
+        idf = np.log((1.0 + live_docs) / (1.0 + df)) + 1.0
+
+        # Profile: sum of the seeds' L2-normalised TF-IDF vectors
+        profile = np.zeros(len(idf), dtype=np.float64)
+        for vector in seed_vectors:
+            weights = vector.data * idf[vector.indices]
+            norm = np.linalg.norm(weights)
+            if norm:
+                profile[vector.indices] += weights / norm
+        profile_norm = np.linalg.norm(profile) or 1.0
+        query = profile * idf
+        idf_squared = idf * idf
+
+        scores = np.concatenate([np.zeros(0)] + [
+            _cosine(block, block_sq, query, idf_squared) / profile_norm
+            for block, block_sq in blocks if block.shape[0]
+        ])
+        scores = np.where(alive[:len(scores)], scores, -np.inf)
+
+        limit = min(limit, int(np.isfinite(scores).sum()))
+        if limit <= 0:
+            return []
+        top = np.argpartition(-scores, limit - 1)[:limit]
+        top = top[np.argsort(-scores[top])]
+        return [(int(job_ids[row]), float(scores[row])) for row in top if scores[row] > 0]
+
+def _empty() -> sp.csr_matrix:
+    return sp.csr_matrix((0, 0), dtype=np.float32)
+
+def _vstack(top: sp.csr_matrix, bottom: sp.csr_matrix) -> sp.csr_matrix:
+    if top.shape[0] == 0:
+        return bottom
+    if bottom.shape[0] == 0:
+        return top
+    # Widen to the current vocabulary without touching matrices readers may hold
+    columns = max(top.shape[1], bottom.shape[1])
+    widen = lambda m: sp.csr_matrix((m.data, m.indices, m.indptr), shape=(m.shape[0], columns))
+    return sp.vstack([widen(top), widen(bottom)], format="csr")
+
+def _cosine(block, block_sq, query: np.ndarray, idf_squared: np.ndarray) -> np.ndarray:
+    # Columns past the block's width are terms none of its rows contain
+    columns = block.shape[1]
+    dots = block @ query[:columns]
+    norms = np.sqrt(block_sq @ idf_squared[:columns])
+    norms[norms == 0] = 1.0
+    return dots / norms
+
+recommender = TfidfRecommender()
+
+# ==================== INTEGRATION ====================
+
+def init_recommender(bind=engine):
+    db = Session(bind=bind)
+    try:
+        columns = [Job.id, Job.position, Job.description, Job.requirements, Job.category, Job.is_active]
+        # Inactive jobs are loaded too: they still describe what applicants liked
+        for job in db.query(*columns).yield_per(1000):
+            recommender.add(job.id, job_terms(job), active=bool(job.is_active))
+    finally:
+        db.close()
+
+@on_jobs_saved
+def _index_saved_jobs(db: Session, jobs: List[Job]):
+    for job in jobs:
+        recommender.add(job.id, job_terms(job), active=job.is_active is not False)
+
+@on_jobs_removed
+def _unindex_removed_jobs(db: Session, jobs):
+    # Their applications went with them, so they no longer describe anyone's history either
+    for job in jobs:
+        recommender.remove(job.id)
+
+def recommend_for_user(db: Session, user_id: int, limit: int = 20) -> List[Tuple[Job, float]]:
+    """Return (job, score) for active jobs most similar to those the user applied for."""
+    applied = [row.job_id for row in db.query(JobApplication.job_id).filter(JobApplication.user_id == user_id)]
+    ranked = recommender.recommend(applied, limit=limit, exclude=applied)
+    if not ranked:
+        return []
+    jobs = {job.id: job for job in db.query(Job).filter(Job.id.in_([job_id for job_id, _ in ranked]), Job.is_active == True)}
+    return [(jobs[job_id], score) for job_id, score in ranked if job_id in jobs]
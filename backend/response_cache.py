@@ -0,0 +1,203 @@
+import hashlib
+import os
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timezone
+from email.utils import format_datetime, parsedate_to_datetime
+from typing import Dict, Hashable, Optional
+
+from fastapi import Request, Response, status
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from database import Job
+
+load_dotenv()
+
+RESPONSE_CACHE_BYTES = int(os.getenv("RESPONSE_CACHE_BYTES", str(32 * 1024 * 1024)))
+# Upper bound on staleness when another worker changed a job
+RESPONSE_CACHE_TTL = float(os.getenv("RESPONSE_CACHE_TTL", "30"))
+
+class CachedBody:
+    __slots__ = ("body", "etag", "last_modified", "headers", "expires_at")
+
+    def __init__(self, body: bytes, etag: str, last_modified: Optional[datetime], headers: Dict[str, str]):
+        self.body = body
+        self.etag = etag
+        self.last_modified = last_modified
+        self.headers = headers
+        self.expires_at = time.monotonic() + RESPONSE_CACHE_TTL
+
+class ResponseCache:
+    """Serialized job responses, LRU-evicted to stay under a byte budget.
+
+    Keys are ("job", job_id) for single jobs and ("list", query) for pages.
+    """
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self._entries: "OrderedDict[Hashable, CachedBody]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._size = 0
+        # Bumped on every invalidation so a response built from pre-change
+        # rows is never stored after the change committed
+        self.generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.bytes_served_from_cache = 0
+        self.bytes_saved_by_304 = 0
+
+    def get(self, key: Hashable) -> Optional[CachedBody]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.expires_at <= time.monotonic():
+                self._drop(key)
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def put(self, key: Hashable, entry: CachedBody, generation: int):
+        if len(entry.body) > self.max_bytes:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._drop(key)
+            self._entries[key] = entry
+            self._size += len(entry.body)
+            while self._size > self.max_bytes:
+                self._drop(next(iter(self._entries)))
+
+    def _drop(self, key: Hashable):
+        entry = self._entries.pop(key, None)
+        if entry is not None:
+            self._size -= len(entry.body)
+
+    def invalidate(self, job_ids=()):
+        """Drop every list page plus the given single jobs."""
+        with self._lock:
+            self.generation += 1
+            for key in [key for key in self._entries if key[0] == "list"]:
+                self._drop(key)
+            for job_id in job_ids:
+                self._drop(("job", job_id))
+
+    def record(self, size: int, not_modified: bool, from_cache: bool):
+        with self._lock:
+            if not_modified:
+                self.not_modified += 1
+                self.bytes_saved_by_304 += size
+            elif from_cache:
+                self.bytes_served_from_cache += size
+
+    def metrics(self) -> dict:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "bytes": self._size,
+                "max_bytes": self.max_bytes,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_ratio": self.hits / lookups if lookups else 0.0,
+                "not_modified": self.not_modified,
+                "bytes_served_from_cache": self.bytes_served_from_cache,
+                "bytes_saved_by_304": self.bytes_saved_by_304,
+            }
+
+response_cache = ResponseCache(RESPONSE_CACHE_BYTES)
+
+# ==================== INVALIDATION ====================
+
+@event.listens_for(Session, "after_flush")
+def _collect_changed_jobs(session, flush_context):
+    changed = session.info.setdefault("changed_job_ids", set())
+    for instance in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(instance, Job):
+            changed.add(instance.id)
+
+@event.listens_for(Session, "after_commit")
+def _invalidate_changed_jobs(session):
+    changed = session.info.pop("changed_job_ids", None)
+    if changed:
+        response_cache.invalidate(changed)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_changed_jobs(session):
+    session.info.pop("changed_job_ids", None)
+
+# ==================== CONDITIONAL RESPONSES ====================
+
+def job_etag(job: Job) -> str:
+    version = job.updated_at or job.created_at
+    return f'"job-{job.id}-{int(version.timestamp() * 1_000_000)}"'
+
+def last_modified_of(jobs) -> Optional[datetime]:
+    stamps = [stamp for stamp in (getattr(job, "updated_at", None) for job in jobs) if stamp is not None]
+    return max(stamps) if stamps else None
+
+def list_key(request: Request) -> Hashable:
+    return ("list", tuple(sorted(request.query_params.multi_items())))
+
+def _is_fresh(request: Request, entry: CachedBody) -> bool:
+    if_none_match = request.headers.get("if-none-match")
+    if if_none_match is not None:
+        tags = [tag.strip() for tag in if_none_match.split(",")]
+        return "*" in tags or entry.etag in tags
+    if_modified_since = request.headers.get("if-modified-since")
+    if if_modified_since and entry.last_modified is not None:
+        try:
+            since = parsedate_to_datetime(if_modified_since).replace(tzinfo=None)
+        except (TypeError, ValueError):
+            return False
+        return entry.last_modified.replace(microsecond=0) <= since
+    return False
+
+def _respond(request: Request, entry: CachedBody, from_cache: bool) -> Response:
+    headers = dict(entry.headers)
+    headers["ETag"] = entry.etag
+    # Clients may keep the body but must revalidate before reusing it
+    headers["Cache-Control"] = "no-cache"
+    if entry.last_modified is not None:
+        # Timestamps are stored as naive UTC (datetime.utcnow)
+        headers["Last-Modified"] = format_datetime(entry.last_modified.replace(tzinfo=timezone.utc), usegmt=True)
+
+    not_modified = _is_fresh(request, entry)
+    response_cache.record(len(entry.body), not_modified, from_cache)
+    if not_modified:
+        return Response(status_code=status.HTTP_304_NOT_MODIFIED, headers=headers)
+    return Response(content=entry.body, media_type="application/json", headers=headers)
+
+def cached_response(request: Request, key: Hashable) -> Optional[Response]:
+    """Serve key from the cache (200 or 304), or None on a miss."""
+    entry = response_cache.get(key)
+    if entry is None:
+        return None
+    return _respond(request, entry, from_cache=True)
+
+def store_response(
+    request: Request,
+    key: Hashable,
+    body: bytes,
+    generation: int,
+    last_modified: Optional[datetime] = None,
+    headers: Optional[Dict[str, str]] = None,
+    etag: Optional[str] = None,
+) -> Response:
+    """Cache a freshly serialized body and answer the request from it.
+
+    generation must be read before the rows were loaded. Without an explicit
+    etag, one is derived from the body.
+    """
+    if etag is None:
+        etag = '"' + hashlib.blake2b(body, digest_size=16).hexdigest() + '"'
+    entry = CachedBody(body, etag, last_modified, headers or {})
+    response_cache.put(key, entry, generation)
+    return _respond(request, entry, from_cache=False)
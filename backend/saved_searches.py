@@ -0,0 +1,472 @@
+import logging
+import os
+import queue
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from collections import defaultdict, deque
+from datetime import datetime, timedelta
+from itertools import product
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from fastapi import HTTPException, status
+from sqlalchemy import delete, func, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from database import engine, Job, SavedSearch, User
+from instrumentation import report_failure
+from job_events import on_jobs_removed, on_jobs_saved
+from jobs import split_values
+from notifications import Notification, notification_queue
+from schemas import SavedSearchCreate
+from stats import percentile
+
+load_dotenv()
+
+logger = logging.getLogger("jobfinder.alerts")
+
+SAVED_SEARCH_MAX_PER_USER = int(os.getenv("SAVED_SEARCH_MAX_PER_USER", "50"))
+# 0 workers matches inline in the request that saved the job
+ALERT_WORKERS = int(os.getenv("ALERT_WORKERS", "1"))
+ALERT_QUEUE_SIZE = int(os.getenv("ALERT_QUEUE_SIZE", "10000"))
+# Recently alerted job ids, so a feed re-sending a posting does not alert twice
+ALERT_DEDUPE_SIZE = int(os.getenv("ALERT_DEDUPE_SIZE", "100000"))
+# Saved-search ids per recipient lookup
+ALERT_LOOKUP_CHUNK = 500
+# How far before the newest created_at seen each sync looks again, for
+# searches whose transaction committed after a later-stamped one
+SAVED_SEARCH_SYNC_OVERLAP_SECONDS = float(os.getenv("SAVED_SEARCH_SYNC_OVERLAP_SECONDS", "60"))
+
+INDEX_COLUMNS = [
+    SavedSearch.id, SavedSearch.category, SavedSearch.location, SavedSearch.job_type,
+    SavedSearch.min_salary, SavedSearch.max_salary,
+]
+
+_INFINITY = float("inf")
+
+def _criterion(value: Optional[str]) -> Optional[str]:
+    # Compared exactly, as GET /api/jobs?category= does, so an alert never
+    # fires for a posting the same search would not list
+    return value or None
+
+def _criteria(value: Optional[str]) -> List[Optional[str]]:
+    # A comma list means any of its values, as GET /api/jobs?location=&job_type=
+    # reads it; each value is still compared exactly
+    return list(dict.fromkeys(split_values([value] if value else None))) or [None]
+
+# ==================== PERCOLATOR ====================
+
+class _Bucket:
+    """Searches under one (category, location, job_type) key, split by salary criteria.
+
+    The bound lists are sorted, so the searches a salary range satisfies
+    are a prefix or suffix found by bisection.
+    """
+
+    __slots__ = ("key", "any_salary", "by_min", "by_max", "by_range")
+
+    def __init__(self, key: tuple):
+        self.key = key
+        self.any_salary = set()
+        # (min_salary, id): searches with only a lower bound
+        self.by_min: List[Tuple[int, int]] = []
+        # (max_salary, id): only an upper bound
+        self.by_max: List[Tuple[int, int]] = []
+        # (min_salary, max_salary, id): both, ordered by the lower one
+        self.by_range: List[Tuple[int, int, int]] = []
+
+    def __len__(self):
+        return len(self.any_salary) + len(self.by_min) + len(self.by_max) + len(self.by_range)
+
+    def sort(self):
+        self.by_min.sort()
+        self.by_max.sort()
+        self.by_range.sort()
+
+class PercolatorIndex:
+    """Reverse index of saved searches, queried with a job to find the searches it matches.
+
+    Searches are bucketed by their exact (category, location, job_type)
+    criteria, with None standing for "any"; a search listing several
+    locations or job types goes in one bucket per combination. A job can
+    only match the eight buckets formed from its own values or None, so
+    matching looks those up and bisects their salary lists instead of
+    scanning every search. Only searches with both salary bounds are checked one by one,
+    and only those whose lower bound the job already satisfies.
+    """
+
+    def __init__(self):
+        self._buckets: Dict[tuple, _Bucket] = {}
+        # id -> (buckets, min_salary, max_salary)
+        self._searches: Dict[int, tuple] = {}
+        self._lock = threading.Lock()
+        # Newest created_at synced from the table; see sync_saved_searches
+        self.synced_until: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self._searches)
+
+    def __contains__(self, search_id: int) -> bool:
+        return search_id in self._searches
+
+    def add(self, search_id: int, category=None, location=None, job_type=None,
+            min_salary: Optional[int] = None, max_salary: Optional[int] = None):
+        with self._lock:
+            self._add_locked(search_id, category, location, job_type, min_salary, max_salary)
+            for bucket in self._buckets_of(search_id):
+                bucket.sort()
+
+    def load(self, rows: Iterable[tuple]):
+        """Bulk add INDEX_COLUMNS rows, sorting each touched bucket once at the end."""
+        touched = set()
+        with self._lock:
+            for row in rows:
+                self._add_locked(*row)
+                touched.update(self._buckets_of(row[0]))
+            for bucket in touched:
+                bucket.sort()
+
+    def mark_synced(self, created_at: Optional[datetime]):
+        with self._lock:
+            if created_at is not None and (self.synced_until is None or created_at > self.synced_until):
+                self.synced_until = created_at
+
+    def _buckets_of(self, search_id: int) -> List[_Bucket]:
+        return self._searches[search_id][0]
+
+    def _add_locked(self, search_id, category, location, job_type, min_salary, max_salary):
+        if search_id in self._searches:
+            self._remove_locked(search_id)
+        buckets = []
+        for key in product((_criterion(category),), _criteria(location), _criteria(job_type)):
+            bucket = self._buckets.get(key)
+            if bucket is None:
+                bucket = self._buckets[key] = _Bucket(key)
+            # Appended unsorted; callers sort the buckets before releasing the lock
+            if min_salary is None and max_salary is None:
+                bucket.any_salary.add(search_id)
+            elif max_salary is None:
+                bucket.by_min.append((min_salary, search_id))
+            elif min_salary is None:
+                bucket.by_max.append((max_salary, search_id))
+            else:
+                bucket.by_range.append((min_salary, max_salary, search_id))
+            buckets.append(bucket)
+        self._searches[search_id] = (buckets, min_salary, max_salary)
+
+    def remove(self, search_id: int):
+        with self._lock:
+            self._remove_locked(search_id)
+
+    def _remove_locked(self, search_id: int):
+        entry = self._searches.pop(search_id, None)
+        if entry is None:
+            return
+        buckets, min_salary, max_salary = entry
+        for bucket in buckets:
+            if min_salary is None and max_salary is None:
+                bucket.any_salary.discard(search_id)
+            elif max_salary is None:
+                _discard(bucket.by_min, (min_salary, search_id))
+            elif min_salary is None:
+                _discard(bucket.by_max, (max_salary, search_id))
+            else:
+                _discard(bucket.by_range, (min_salary, max_salary, search_id))
+            if not bucket:
+                del self._buckets[bucket.key]
+
+    def match(self, category=None, location=None, job_type=None,
+              salary_min: Optional[int] = None, salary_max: Optional[int] = None) -> Tuple[List[int], int]:
+        """Return (ids of the searches the job matches, entries looked at to find them)."""
+        keys = dict.fromkeys(product(
+            (_criterion(category), None), (_criterion(location), None), (_criterion(job_type), None)
+        ))
+        matched: List[int] = []
+        rejected = 0
+        with self._lock:
+            for key in keys:
+                bucket = self._buckets.get(key)
+                if bucket is None:
+                    continue
+                matched.extend(bucket.any_salary)
+                # Same rule as ?min_salary=&max_salary=: the posted range
+                # overlaps the wanted one, and a posting without a salary
+                # never meets a salary criterion
+                if salary_max is not None:
+                    end = bisect_right(bucket.by_min, (salary_max, _INFINITY))
+                    matched.extend(search_id for _, search_id in bucket.by_min[:end])
+                if salary_min is not None:
+                    start = bisect_left(bucket.by_max, (salary_min, -1))
+                    matched.extend(search_id for _, search_id in bucket.by_max[start:])
+                if salary_min is not None and salary_max is not None:
+                    end = bisect_right(bucket.by_range, (salary_max, _INFINITY, _INFINITY))
+                    before = len(matched)
+                    matched.extend(
+                        search_id for _, high, search_id in bucket.by_range[:end] if high >= salary_min
+                    )
+                    rejected += end - (len(matched) - before)
+        return matched, len(matched) + rejected
+
+    def metrics(self) -> dict:
+        with self._lock:
+            return {
+                "searches": len(self._searches),
+                "buckets": len(self._buckets),
+                "synced_until": self.synced_until.isoformat() if self.synced_until else None,
+            }
+
+def _discard(entries: list, entry: tuple):
+    i = bisect_left(entries, entry)
+    if i < len(entries) and entries[i] == entry:
+        del entries[i]
+
+percolator = PercolatorIndex()
+
+# ==================== ALERTS ====================
+
+class AlertDispatcher:
+    """Percolates newly saved jobs on a background thread.
+
+    Each match becomes one alert per user (however many of their searches
+    matched) on the notification queue, so saving a job only pays for an
+    enqueue here.
+    """
+
+    def __init__(self, index: PercolatorIndex, workers: int = ALERT_WORKERS, queue_size: int = ALERT_QUEUE_SIZE,
+                 bind=engine, latency_window: int = 1000):
+        self.index = index
+        self.workers = workers
+        self.bind = bind
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._stop = threading.Event()
+        self._threads = []
+        self._lock = threading.Lock()
+        self._recent = deque(maxlen=ALERT_DEDUPE_SIZE)
+        self._recent_ids = set()
+        # Job ids waiting in the queue, and those of them removed meanwhile
+        self._queued_ids = set()
+        self._cancelled_ids = set()
+        self._match_latencies = deque(maxlen=latency_window)
+        self._candidates = deque(maxlen=latency_window)
+        self.percolated = 0
+        self.matched = 0
+        self.alerts = 0
+        self.skipped = 0
+        self.dropped = 0
+
+    def start(self):
+        if self.workers <= 0 or self._threads:
+            return
+        self._stop.clear()
+        for n in range(self.workers):
+            thread = threading.Thread(target=self._run, name=f"alerts-{n}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def stop(self, timeout: float = 5.0):
+        deadline = time.monotonic() + timeout
+        while self._threads and not self._queue.empty() and time.monotonic() < deadline:
+            time.sleep(0.05)
+        self._stop.set()
+        for thread in self._threads:
+            thread.join()
+        self._threads = []
+
+    def submit(self, jobs: List[Job]):
+        # Plain values: the ORM objects belong to the request's session
+        for job in jobs:
+            posting = {
+                name: getattr(job, name)
+                for name in ("id", "company_name", "position", "location", "category", "job_type",
+                             "salary_min", "salary_max")
+            }
+            with self._lock:
+                if posting["id"] in self._recent_ids:
+                    continue
+                if len(self._recent) == self._recent.maxlen:
+                    self._recent_ids.discard(self._recent[0])
+                self._recent.append(posting["id"])
+                self._recent_ids.add(posting["id"])
+            if self.workers <= 0:
+                self._process([posting])
+                continue
+            with self._lock:
+                self._queued_ids.add(posting["id"])
+            try:
+                self._queue.put_nowait(posting)
+            except queue.Full:
+                with self._lock:
+                    self._queued_ids.discard(posting["id"])
+                    self.dropped += 1
+                logger.warning("Alert queue full, job %s not matched against saved searches", posting["id"])
+
+    def cancel(self, job_ids: List[int]):
+        """Skip the queued postings of jobs that were removed before their turn."""
+        with self._lock:
+            self._cancelled_ids.update(self._queued_ids.intersection(job_ids))
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                batch = [self._queue.get(timeout=0.5)]
+            except queue.Empty:
+                continue
+            while len(batch) < 100:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                self._process(batch)
+            except Exception:
+                report_failure("alerts", f"Saved-search alerts for {len(batch)} jobs failed")
+
+    def _process(self, postings: List[dict]):
+        sync_saved_searches(self.bind)
+        for posting in postings:
+            with self._lock:
+                self._queued_ids.discard(posting["id"])
+                if posting["id"] in self._cancelled_ids:
+                    self._cancelled_ids.discard(posting["id"])
+                    continue
+            started = time.perf_counter()
+            search_ids, candidates = self.index.match(
+                posting["category"], posting["location"], posting["job_type"],
+                posting["salary_min"], posting["salary_max"],
+            )
+            with self._lock:
+                self.percolated += 1
+                self.matched += len(search_ids)
+                self._match_latencies.append(time.perf_counter() - started)
+                self._candidates.append(candidates)
+            if search_ids:
+                self._alert(posting, search_ids)
+
+    def _alert(self, posting: dict, search_ids: List[int]):
+        names = defaultdict(list)
+        found = set()
+        skipped = 0
+        with Session(bind=self.bind) as db:
+            for i in range(0, len(search_ids), ALERT_LOOKUP_CHUNK):
+                chunk = search_ids[i:i + ALERT_LOOKUP_CHUNK]
+                rows = db.execute(
+                    select(SavedSearch.id, SavedSearch.name, User.email, User.is_active)
+                    .join(User, User.id == SavedSearch.user_id)
+                    .where(SavedSearch.id.in_(chunk))
+                )
+                for search_id, name, email, active in rows:
+                    found.add(search_id)
+                    if email and active:
+                        names[email].append(name or "your saved search")
+                    else:
+                        # No email on file (phone sign-up) or deactivated
+                        skipped += 1
+        # Deleted on another worker since this one indexed them
+        for search_id in set(search_ids) - found:
+            self.index.remove(search_id)
+
+        job = f"{posting['position']} at {posting['company_name']} ({posting['location']})"
+        for email, matched in names.items():
+            body = f"{job} matches {', '.join(dict.fromkeys(matched))}."
+            notification_queue.enqueue(Notification(email, "New job matching your saved search", body))
+        with self._lock:
+            self.alerts += len(names)
+            self.skipped += skipped
+
+    def metrics(self) -> dict:
+        with self._lock:
+            latencies = sorted(self._match_latencies)
+            candidates = sorted(self._candidates)
+        return {
+            **self.index.metrics(),
+            "workers": self.workers,
+            "queue_depth": self._queue.qsize(),
+            "percolated": self.percolated,
+            "matched": self.matched,
+            "alerts": self.alerts,
+            "skipped": self.skipped,
+            "dropped": self.dropped,
+            "match_latency_ms_p50": percentile(latencies, 0.50) * 1000,
+            "match_latency_ms_p99": percentile(latencies, 0.99) * 1000,
+            "candidates_p50": percentile(candidates, 0.50),
+            "candidates_p99": percentile(candidates, 0.99),
+        }
+
+alert_dispatcher = AlertDispatcher(percolator)
+
+# ==================== INTEGRATION ====================
+
+def init_saved_searches(bind=engine):
+    sync_saved_searches(bind)
+
+def sync_saved_searches(bind=engine):
+    """Index searches saved since the last sync, including those saved on other workers.
+
+    Searches are picked up by created_at, which is stamped before the row
+    commits, so a slow transaction can commit a search older than one
+    already synced. Each sync therefore looks back
+    SAVED_SEARCH_SYNC_OVERLAP_SECONDS past the newest created_at seen and
+    skips the ids already indexed.
+    """
+    statement = select(*INDEX_COLUMNS, SavedSearch.created_at)
+    if percolator.synced_until is not None:
+        statement = statement.where(
+            SavedSearch.created_at >= percolator.synced_until - timedelta(seconds=SAVED_SEARCH_SYNC_OVERLAP_SECONDS)
+        )
+    newest = None
+    with Session(bind=bind) as db:
+        rows = []
+        for row in db.execute(statement.execution_options(yield_per=10000)):
+            if row.created_at is not None and (newest is None or row.created_at > newest):
+                newest = row.created_at
+            if row.id not in percolator:
+                rows.append(tuple(row)[:-1])
+    percolator.load(rows)
+    percolator.mark_synced(newest)
+
+@on_jobs_saved
+def _percolate_saved_jobs(db: Session, jobs: List[Job]):
+    alert_dispatcher.submit([job for job in jobs if job.is_active is not False])
+
+@on_jobs_removed
+def _cancel_removed_jobs(db: Session, jobs):
+    alert_dispatcher.cancel([job.id for job in jobs])
+
+def create_saved_search(db: Session, user_id: int, data: SavedSearchCreate) -> SavedSearch:
+    # Blank criteria mean "any"
+    values = {name: value.strip() or None if isinstance(value, str) else value for name, value in data.model_dump().items()}
+    if all(values[name] is None for name in ("category", "location", "job_type", "min_salary", "max_salary")):
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="A saved search needs at least one criterion"
+        )
+    if values["min_salary"] is not None and values["max_salary"] is not None and values["min_salary"] > values["max_salary"]:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="min_salary cannot be greater than max_salary"
+        )
+    count = db.scalar(select(func.count()).select_from(SavedSearch).where(SavedSearch.user_id == user_id))
+    if count >= SAVED_SEARCH_MAX_PER_USER:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {SAVED_SEARCH_MAX_PER_USER} saved searches per user"
+        )
+    saved_search = SavedSearch(user_id=user_id, **values)
+    db.add(saved_search)
+    db.commit()
+    db.refresh(saved_search)
+    percolator.add(*(getattr(saved_search, column.key) for column in INDEX_COLUMNS))
+    return saved_search
+
+def delete_saved_search(db: Session, user_id: int, search_id: int):
+    deleted = db.execute(
+        delete(SavedSearch).where(SavedSearch.id == search_id, SavedSearch.user_id == user_id)
+    ).rowcount
+    if not deleted:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND,
+            detail="Saved search not found"
+        )
+    db.commit()
+    percolator.remove(search_id)
@@ -1,5 +1,5 @@
 from pydantic import BaseModel, EmailStr, Field
-from typing import Optional
+from typing import List, Optional
 from datetime import datetime
 
 class UserBase(BaseModel):
@@ -50,7 +50,7 @@ class JobBase(BaseModel):
     requirements: Optional[str] = None
 
 class JobCreate(JobBase):
-    pass
+    external_id: Optional[str] = None
 
 class JobResponse(JobBase):
     id: int
@@ -60,6 +60,41 @@ class JobResponse(JobBase):
     class Config:
         from_attributes = True
 
+class JobSearchResult(JobResponse):
+    # Only set when the list was produced by a full-text query
+    score: Optional[float] = None
+    snippet: Optional[str] = None
+
+class FacetCount(BaseModel):
+    value: Optional[str] = None
+    count: int
+
+class JobFacets(BaseModel):
+    total: int
+    category: List[FacetCount]
+    job_type: List[FacetCount]
+    location: List[FacetCount]
+    salary_bucket: List[FacetCount]
+
+class Suggestion(BaseModel):
+    field: str
+    value: str
+    count: int
+
+class BulkRowError(BaseModel):
+    row: int
+    error: str
+
+class BulkIngestResult(BaseModel):
+    received: int
+    # New jobs, including keyed rows whose external_id was not seen before
+    inserted: int
+    # Keyed rows that updated the job already holding their external_id
+    upserted: int
+    failed: int
+    errors: List[BulkRowError]
+    errors_truncated: bool = False
+
 class JobApplicationCreate(BaseModel):
     job_id: int
 
@@ -71,4 +106,24 @@ class JobApplicationResponse(BaseModel):
     applied_at: datetime
     
     class Config:
-        from_attributes = True
\ No newline at end of file
+        from_attributes = True
+
+class JobApplicationWithJob(JobApplicationResponse):
+    # Only filled in with ?expand=job
+    job: Optional[JobResponse] = None
+
+class SavedSearchCreate(BaseModel):
+    name: Optional[str] = Field(None, max_length=100)
+    category: Optional[str] = None
+    location: Optional[str] = None
+    job_type: Optional[str] = None
+    min_salary: Optional[int] = Field(None, ge=0)
+    max_salary: Optional[int] = Field(None, ge=0)
+
+class SavedSearchResponse(SavedSearchCreate):
+    id: int
+    user_id: int
+    created_at: datetime
+    
+    class Config:
+        from_attributes = True
@@ -0,0 +1,275 @@
+import html
+import math
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from sqlalchemy import column, literal_column, select, table, text
+from sqlalchemy.orm import Session
+
+from database import engine, Job
+from job_events import on_jobs_removed, on_jobs_saved
+
+# Columns covered by the full-text index, in FTS column order
+SEARCH_FIELDS = ("position", "company_name", "description", "requirements")
+
+# BM25 tuning (same defaults as SQLite FTS5)
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+SNIPPET_OPEN = "<b>"
+SNIPPET_CLOSE = "</b>"
+SNIPPET_TOKENS = 12
+# FTS5 marks matches with these, so the text can be escaped before the tags go in
+_MARK_OPEN = "\x02"
+_MARK_CLOSE = "\x03"
+# Ranked ids checked against the filters per query when there is no FTS5
+SEARCH_FILTER_CHUNK = 500
+
+_TOKEN_RE = re.compile(r"\w+", re.UNICODE)
+
+def tokenize(value: Optional[str]) -> List[str]:
+    if not value:
+        return []
+    return [token.lower() for token in _TOKEN_RE.findall(value)]
+
+def use_fts5(bind=engine) -> bool:
+    return bind.dialect.name == "sqlite"
+
+# ==================== IN-PROCESS INDEX ====================
+
+class InMemoryJobIndex:
+    """Inverted index with BM25 ranking, used when the database has no FTS5."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._doc_terms: Dict[int, Counter] = {}
+        self._doc_text: Dict[int, str] = {}
+        self._doc_length: Dict[int, int] = {}
+        self._total_length = 0
+
+    def __len__(self):
+        return len(self._doc_terms)
+
+    def add(self, job_id: int, fields: Dict[str, Optional[str]]):
+        document = " ".join(fields.get(name) or "" for name in SEARCH_FIELDS)
+        terms = Counter(tokenize(document))
+        with self._lock:
+            self._remove_locked(job_id)
+            for term, frequency in terms.items():
+                self._postings[term][job_id] = frequency
+            self._doc_terms[job_id] = terms
+            self._doc_text[job_id] = document
+            self._doc_length[job_id] = sum(terms.values())
+            self._total_length += self._doc_length[job_id]
+
+    def remove(self, job_id: int):
+        with self._lock:
+            self._remove_locked(job_id)
+
+    def _remove_locked(self, job_id: int):
+        terms = self._doc_terms.pop(job_id, None)
+        if terms is None:
+            return
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(job_id, None)
+                if not postings:
+                    del self._postings[term]
+        self._doc_text.pop(job_id, None)
+        self._total_length -= self._doc_length.pop(job_id, 0)
+
+    def search(self, query: str) -> List[Tuple[int, float]]:
+        """Return (job_id, score) for documents matching every query term, best first."""
+        terms = list(dict.fromkeys(tokenize(query)))
+        if not terms:
+            return []
+        with self._lock:
+            doc_count = len(self._doc_terms)
+            if doc_count == 0:
+                return []
+            postings = [self._postings.get(term) for term in terms]
+            if any(not posting for posting in postings):
+                return []
+            avg_length = self._total_length / doc_count
+
+            # Intersect starting from the rarest term
+            ordered = sorted(zip(terms, postings), key=lambda pair: len(pair[1]))
+            candidates = set(ordered[0][1])
+            for _, posting in ordered[1:]:
+                candidates.intersection_update(posting)
+                if not candidates:
+                    return []
+
+            scores = {}
+            for term, posting in ordered:
+                idf = math.log(1 + (doc_count - len(posting) + 0.5) / (len(posting) + 0.5))
+                for job_id in candidates:
+                    frequency = posting[job_id]
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * self._doc_length[job_id] / avg_length)
+                    scores[job_id] = scores.get(job_id, 0.0) + idf * frequency * (BM25_K1 + 1) / (frequency + norm)
+
+        return sorted(scores.items(), key=lambda item: item[1], reverse=True)
+
+    def snippet(self, job_id: int, query: str) -> Optional[str]:
+        with self._lock:
+            document = self._doc_text.get(job_id)
+        if document is None:
+            return None
+        return highlight(document, tokenize(query))
+
+def highlight(document: str, terms: List[str]) -> str:
+    wanted = set(terms)
+    words = document.split()
+    hits = [i for i, word in enumerate(words) if set(tokenize(word)) & wanted]
+    start = max(0, hits[0] - SNIPPET_TOKENS // 2) if hits else 0
+    window = words[start:start + SNIPPET_TOKENS]
+    # Job text is user input; escape it so only our tags are markup
+    marked = [
+        f"{SNIPPET_OPEN}{html.escape(word)}{SNIPPET_CLOSE}" if set(tokenize(word)) & wanted else html.escape(word)
+        for word in window
+    ]
+    prefix = "…" if start > 0 else ""
+    suffix = "…" if start + SNIPPET_TOKENS < len(words) else ""
+    return prefix + " ".join(marked) + suffix
+
+memory_index = InMemoryJobIndex()
+
+# ==================== SQLITE FTS5 ====================
+
+_FTS_COLUMNS = ", ".join(SEARCH_FIELDS)
+_NEW_VALUES = ", ".join(f"new.{name}" for name in SEARCH_FIELDS)
+_OLD_VALUES = ", ".join(f"old.{name}" for name in SEARCH_FIELDS)
+
+FTS5_SCHEMA = [
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS jobs_fts USING fts5("
+    f"{_FTS_COLUMNS}, content='jobs', content_rowid='id', tokenize='unicode61 remove_diacritics 2')",
+    # Triggers keep the external-content index in step with every write to jobs
+    f"CREATE TRIGGER IF NOT EXISTS jobs_fts_ai AFTER INSERT ON jobs BEGIN "
+    f"INSERT INTO jobs_fts(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_NEW_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS jobs_fts_ad AFTER DELETE ON jobs BEGIN "
+    f"INSERT INTO jobs_fts(jobs_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES}); END",
+    f"CREATE TRIGGER IF NOT EXISTS jobs_fts_au AFTER UPDATE ON jobs BEGIN "
+    f"INSERT INTO jobs_fts(jobs_fts, rowid, {_FTS_COLUMNS}) VALUES ('delete', old.id, {_OLD_VALUES}); "
+    f"INSERT INTO jobs_fts(rowid, {_FTS_COLUMNS}) VALUES (new.id, {_NEW_VALUES}); END",
+]
+
+def fts5_query(query: str) -> str:
+    # Quote every token so user input can never be parsed as FTS5 syntax
+    return " ".join(f'"{token}"' for token in tokenize(query))
+
+def _job_fields(job: Job) -> Dict[str, Optional[str]]:
+    return {name: getattr(job, name) for name in SEARCH_FIELDS}
+
+def init_search(bind=engine):
+    """Create the FTS5 table on SQLite, or load the in-process index otherwise."""
+    if use_fts5(bind):
+        with bind.begin() as conn:
+            exists = conn.execute(
+                text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'jobs_fts'")
+            ).first()
+            for statement in FTS5_SCHEMA:
+                conn.execute(text(statement))
+            if not exists:
+                # Index rows that were written before the triggers existed
+                conn.execute(text("INSERT INTO jobs_fts(jobs_fts) VALUES ('rebuild')"))
+        return
+
+    db = Session(bind=bind)
+    try:
+        rows = db.query(Job.id, *[getattr(Job, name) for name in SEARCH_FIELDS]).yield_per(1000)
+        for row in rows:
+            memory_index.add(row.id, {name: getattr(row, name) for name in SEARCH_FIELDS})
+    finally:
+        db.close()
+
+def index_job(db: Session, job: Job):
+    # SQLite keeps jobs_fts current through triggers
+    if not use_fts5(db.get_bind()):
+        memory_index.add(job.id, _job_fields(job))
+
+@on_jobs_saved
+def _index_saved_jobs(db: Session, jobs: List[Job]):
+    for job in jobs:
+        index_job(db, job)
+
+def unindex_job(db: Session, job_id: int):
+    if not use_fts5(db.get_bind()):
+        memory_index.remove(job_id)
+
+@on_jobs_removed
+def _unindex_removed_jobs(db: Session, jobs):
+    for job in jobs:
+        unindex_job(db, job.id)
+
+def search_jobs(
+    db: Session,
+    q: str,
+    skip: int = 0,
+    limit: int = 20,
+    filters: Sequence = (),
+) -> List[Tuple[Job, float, Optional[str]]]:
+    """Return (job, score, snippet) for active jobs matching q and filters, best match first."""
+    if not tokenize(q):
+        return []
+    if use_fts5(db.get_bind()):
+        return _search_fts5(db, q, skip, limit, filters)
+    return _search_memory(db, q, skip, limit, filters)
+
+_fts_table = table("jobs_fts", column("rowid"))
+
+def _search_fts5(db, q, skip, limit, filters):
+    rank = literal_column("bm25(jobs_fts)").label("rank")
+    statement = (
+        select(
+            _fts_table.c.rowid.label("id"),
+            rank,
+            literal_column(
+                f"snippet(jobs_fts, -1, char(2), char(3), '…', {SNIPPET_TOKENS})"
+            ).label("snippet"),
+        )
+        .select_from(Job.__table__.join(_fts_table, _fts_table.c.rowid == Job.id))
+        .where(literal_column("jobs_fts").op("MATCH")(fts5_query(q)), Job.is_active == True, *filters)
+        .order_by(rank)
+        .limit(limit)
+        .offset(skip)
+    )
+
+    hits = db.execute(statement).all()
+    jobs = _load_jobs(db, [hit.id for hit in hits])
+    # FTS5 bm25() is negative with lower meaning better; flip it for clients
+    return [(jobs[hit.id], -hit.rank, _escape_snippet(hit.snippet)) for hit in hits if hit.id in jobs]
+
+def _escape_snippet(snippet: Optional[str]) -> Optional[str]:
+    if snippet is None:
+        return None
+    return html.escape(snippet).replace(_MARK_OPEN, SNIPPET_OPEN).replace(_MARK_CLOSE, SNIPPET_CLOSE)
+
+def _search_memory(db, q, skip, limit, filters):
+    ranked = memory_index.search(q)
+    if not ranked:
+        return []
+
+    # Check the ranked ids against the filters a chunk at a time, best first,
+    # stopping once the page is full; a common term can match most jobs
+    wanted = skip + limit
+    matches = []
+    for i in range(0, len(ranked), SEARCH_FILTER_CHUNK):
+        chunk = ranked[i:i + SEARCH_FILTER_CHUNK]
+        query = db.query(Job.id).filter(Job.id.in_([job_id for job_id, _ in chunk]), Job.is_active == True, *filters)
+        visible = {row.id for row in query}
+        matches += [(job_id, score) for job_id, score in chunk if job_id in visible]
+        if len(matches) >= wanted:
+            break
+
+    page = matches[skip:wanted]
+    jobs = _load_jobs(db, [job_id for job_id, _ in page])
+    return [(jobs[job_id], score, memory_index.snippet(job_id, q)) for job_id, score in page if job_id in jobs]
+
+def _load_jobs(db: Session, ids: List[int]) -> Dict[int, Job]:
+    if not ids:
+        return {}
+    return {job.id: job for job in db.query(Job).filter(Job.id.in_(ids))}
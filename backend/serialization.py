@@ -0,0 +1,69 @@
+import json
+import os
+from datetime import datetime
+from typing import Any
+
+from fastapi import Response
+from dotenv import load_dotenv
+
+from database import ArchivedJob, ArchivedJobApplication, Job, JobApplication
+from schemas import JobApplicationResponse, JobResponse
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+load_dotenv()
+
+# "fast" selects plain column rows for list endpoints and encodes them
+# straight to JSON; "pydantic" loads ORM objects and validates each one
+# through the response model
+SERIALIZATION_MODE = os.getenv("SERIALIZATION_MODE", "fast").lower()
+FAST_SERIALIZATION = SERIALIZATION_MODE == "fast"
+
+# Output keys in response-model order, so both modes produce the same bytes
+JOB_FIELDS = list(JobResponse.model_fields)
+APPLICATION_FIELDS = list(JobApplicationResponse.model_fields)
+# updated_at is not returned, but feeds Last-Modified on cached pages
+JOB_ROW_COLUMNS = [getattr(Job, name) for name in JOB_FIELDS] + [Job.updated_at]
+APPLICATION_ROW_COLUMNS = [getattr(JobApplication, name) for name in APPLICATION_FIELDS]
+# For embedding in application rows without clashing with their own columns
+EMBEDDED_JOB_COLUMNS = [getattr(Job, name).label(f"job__{name}") for name in JOB_FIELDS]
+# The same rows read from the archive tables
+ARCHIVED_APPLICATION_ROW_COLUMNS = [getattr(ArchivedJobApplication, name) for name in APPLICATION_FIELDS]
+ARCHIVED_EMBEDDED_JOB_COLUMNS = [getattr(ArchivedJob, name).label(f"job__{name}") for name in JOB_FIELDS]
+
+_JOB_ID_INDEX = JOB_FIELDS.index("id")
+
+def _json_default(value):
+    if isinstance(value, datetime):
+        return value.isoformat()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+def dumps(value: Any) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(value)
+    return json.dumps(value, default=_json_default, ensure_ascii=False, separators=(",", ":")).encode()
+
+def job_row(row) -> dict:
+    """A JobResponse-shaped dict from a JOB_ROW_COLUMNS row, without validation."""
+    return dict(zip(JOB_FIELDS, row))
+
+def application_row(row, embedded_job: bool = False) -> dict:
+    """A JobApplicationWithJob-shaped dict from APPLICATION_ROW_COLUMNS (+ EMBEDDED_JOB_COLUMNS)."""
+    item = dict(zip(APPLICATION_FIELDS, row))
+    job = row[len(APPLICATION_FIELDS):] if embedded_job else ()
+    # The LEFT JOIN yields all-NULL job columns when the job is gone
+    item["job"] = dict(zip(JOB_FIELDS, job)) if job and job[_JOB_ID_INDEX] is not None else None
+    return item
+
+class FastJSONResponse(Response):
+    """JSON response that passes pre-encoded bytes through and encodes anything else with orjson."""
+
+    media_type = "application/json"
+
+    def render(self, content: Any) -> bytes:
+        if isinstance(content, bytes):
+            return content
+        return dumps(content)
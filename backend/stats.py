@@ -0,0 +1,11 @@
+from typing import Sequence
+
+def percentile(values: Sequence[float], q: float, default: float = 0.0) -> float:
+    """Nearest-rank q-quantile (0 to 1) of already sorted values; default when there are none.
+
+    The components' metrics() and the benchmark scripts all report their
+    p50/p99 through this, so their numbers compare like for like.
+    """
+    if not values:
+        return default
+    return values[min(len(values) - 1, int(len(values) * q))]
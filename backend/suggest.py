@@ -0,0 +1,379 @@
+import os
+import sys
+import threading
+import time
+from bisect import bisect_left, bisect_right, insort
+from collections import deque
+from heapq import heapify, heappop, heapreplace
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sqlalchemy import event, func, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from database import engine, Job
+from job_events import on_jobs_removed, on_jobs_saved, previous_value
+from stats import percentile
+
+load_dotenv()
+
+# Distinct values kept per field; the least popular are left out past this
+SUGGEST_MAX_VALUES = int(os.getenv("SUGGEST_MAX_VALUES", "100000"))
+SUGGEST_MAX_LIMIT = 20
+# Prefixes up to this length match a large share of the index, so their
+# top results are kept instead of being ranked on every keystroke
+CACHED_PREFIX_LENGTH = 2
+# Sorted keys per block; each block remembers its most popular entry
+BLOCK_SIZE = 64
+
+SUGGEST_FIELDS = {
+    "position": Job.position,
+    "company": Job.company_name,
+    "location": Job.location,
+}
+
+# Separates the searchable suffix from the value it belongs to in a key
+_SEPARATOR = "\0"
+_MAX_CHAR = "\U0010ffff"
+
+def normalize(value: Optional[str]) -> str:
+    return " ".join((value or "").casefold().split())
+
+def _word_starts(normalized: str) -> List[str]:
+    # "senior python developer" is found by "sen", "pyt" and "dev"
+    words = normalized.split(" ")
+    return [" ".join(words[i:]) for i in range(len(words))]
+
+class PrefixIndex:
+    """Sorted-array prefix index over the distinct values of one column.
+
+    Each value is stored once per word start as "<suffix>\\0<value>". The
+    sorted keys are split into small blocks, each also kept in popularity
+    order, so top-k is a k-way merge over the blocks under the prefix
+    instead of ranking every key it matches. Not thread-safe; SuggestIndex
+    serialises access.
+    """
+
+    def __init__(self, max_values: int = SUGGEST_MAX_VALUES):
+        self.max_values = max_values
+        self._blocks: List[List[str]] = []
+        self._firsts: List[str] = []
+        # Per block: [(-popularity, key)] best first, rebuilt lazily after a change
+        self._ranked: List[Optional[List[Tuple[int, str]]]] = []
+        self.keys = 0
+        # normalized value -> [display value, popularity]
+        self._values: Dict[str, list] = {}
+        # short prefix -> [(-popularity, normalized value)], best first
+        self._top: Dict[str, List[Tuple[int, str]]] = {}
+        self.dropped = 0
+        self.approx_bytes = 0
+
+    def __len__(self):
+        return len(self._values)
+
+    def load(self, rows: Iterable[Tuple[str, int]]):
+        """Bulk build from (value, popularity) rows, most popular first."""
+        for value, count in rows:
+            normalized = normalize(value)
+            if not normalized:
+                continue
+            entry = self._values.get(normalized)
+            if entry is not None:
+                entry[1] += count
+            elif len(self._values) < self.max_values:
+                self._values[normalized] = [value.strip(), count]
+                self._account(normalized, value)
+            else:
+                self.dropped += 1
+        keys = sorted(
+            suffix + _SEPARATOR + normalized
+            for normalized in self._values
+            for suffix in _word_starts(normalized)
+        )
+        self._blocks = [keys[i:i + BLOCK_SIZE] for i in range(0, len(keys), BLOCK_SIZE)]
+        self._firsts = [block[0] for block in self._blocks]
+        self._ranked = [None] * len(self._blocks)
+        for i in range(len(self._blocks)):
+            self._ranked_block(i)
+        self.keys = len(keys)
+        self._top.clear()
+
+    def add(self, value: Optional[str], count: int = 1):
+        normalized = normalize(value)
+        if not normalized:
+            return
+        entry = self._values.get(normalized)
+        if entry is None:
+            if len(self._values) >= self.max_values:
+                self.dropped += 1
+                return
+            entry = self._values[normalized] = [value.strip(), 0]
+            for suffix in _word_starts(normalized):
+                self._insert(suffix + _SEPARATOR + normalized)
+            self._account(normalized, value)
+        entry[1] += count
+
+        # Popularity only grows here, so the value can only move up
+        for suffix in _word_starts(normalized):
+            self._ranked[self._locate(suffix + _SEPARATOR + normalized)] = None
+            for length in range(1, CACHED_PREFIX_LENGTH + 1):
+                top = self._top.get(suffix[:length])
+                if top is None:
+                    continue
+                top = [item for item in top if item[1] != normalized]
+                top.append((-entry[1], normalized))
+                top.sort()
+                self._top[suffix[:length]] = top[:SUGGEST_MAX_LIMIT]
+
+    def remove(self, value: Optional[str], count: int = 1):
+        normalized = normalize(value)
+        entry = self._values.get(normalized)
+        if entry is None:
+            return
+        entry[1] -= count
+        if entry[1] <= 0:
+            del self._values[normalized]
+            for suffix in _word_starts(normalized):
+                self._delete(suffix + _SEPARATOR + normalized)
+            self.approx_bytes -= self._size(normalized, entry[0])
+        else:
+            for suffix in _word_starts(normalized):
+                self._ranked[self._locate(suffix + _SEPARATOR + normalized)] = None
+
+        # A value moving down may let one outside the cached top k overtake
+        # it, so those prefixes are ranked again on their next lookup
+        for suffix in _word_starts(normalized):
+            for length in range(1, CACHED_PREFIX_LENGTH + 1):
+                self._top.pop(suffix[:length], None)
+
+    def _popularity(self, key: str) -> int:
+        return self._values[key.rpartition(_SEPARATOR)[2]][1]
+
+    def _locate(self, key: str) -> int:
+        return max(bisect_right(self._firsts, key) - 1, 0)
+
+    def _insert(self, key: str):
+        self.keys += 1
+        if not self._blocks:
+            self._blocks.append([key])
+            self._firsts.append(key)
+            self._ranked.append(None)
+            return
+        i = self._locate(key)
+        block = self._blocks[i]
+        insort(block, key)
+        self._firsts[i] = block[0]
+        self._ranked[i] = None
+        if len(block) > 2 * BLOCK_SIZE:
+            tail = block[BLOCK_SIZE:]
+            del block[BLOCK_SIZE:]
+            self._blocks.insert(i + 1, tail)
+            self._firsts.insert(i + 1, tail[0])
+            self._ranked.insert(i + 1, None)
+
+    def _delete(self, key: str):
+        i = self._locate(key)
+        block = self._blocks[i]
+        position = bisect_left(block, key)
+        if position == len(block) or block[position] != key:
+            return
+        self.keys -= 1
+        del block[position]
+        if block:
+            self._firsts[i] = block[0]
+            self._ranked[i] = None
+        else:
+            del self._blocks[i], self._firsts[i], self._ranked[i]
+
+    @staticmethod
+    def _size(normalized: str, value: str) -> int:
+        # Strings, plus per word start a key, its ranked tuple and two list slots
+        keys = len(_word_starts(normalized))
+        return sys.getsizeof(normalized) * (keys + 1) + sys.getsizeof(value) + 100 * keys + 64
+
+    def _account(self, normalized: str, value: str):
+        self.approx_bytes += self._size(normalized, value)
+
+    def top(self, prefix: str, limit: int) -> List[Tuple[str, int]]:
+        """Return (value, popularity) for the most popular values starting with prefix."""
+        prefix = normalize(prefix)
+        if not prefix or not self._blocks:
+            return []
+        if len(prefix) <= CACHED_PREFIX_LENGTH:
+            ranked = self._top.get(prefix)
+            if ranked is None:
+                ranked = self._top[prefix] = self._rank(prefix, SUGGEST_MAX_LIMIT)
+            ranked = ranked[:limit]
+        else:
+            ranked = self._rank(prefix, limit)
+        return [(self._values[normalized][0], -negative) for negative, normalized in ranked]
+
+    def _ranked_block(self, i: int) -> List[Tuple[int, str]]:
+        ranked = self._ranked[i]
+        if ranked is None:
+            ranked = self._ranked[i] = sorted((-self._popularity(key), key) for key in self._blocks[i])
+        return ranked
+
+    def _rank(self, prefix: str, limit: int) -> List[Tuple[int, str]]:
+        first = self._locate(prefix)
+        last = self._locate(prefix + _MAX_CHAR)
+        # One cursor per block into its popularity order; the edge blocks
+        # may hold keys outside the prefix, so those are filtered first
+        heap = []
+        for i in range(first, last + 1):
+            ranked = self._ranked_block(i)
+            if i == first or i == last:
+                ranked = [item for item in ranked if item[1].startswith(prefix)]
+            if ranked:
+                heap.append((ranked[0][0], ranked[0][1], 0, ranked))
+        heapify(heap)
+
+        results, seen = [], set()
+        while heap and len(results) < limit:
+            negative, key, position, ranked = heap[0]
+            position += 1
+            if position < len(ranked):
+                heapreplace(heap, (ranked[position][0], ranked[position][1], position, ranked))
+            else:
+                heappop(heap)
+            normalized = key.rpartition(_SEPARATOR)[2]
+            if normalized not in seen:
+                seen.add(normalized)
+                results.append((negative, normalized))
+        return results
+
+class SuggestIndex:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.fields = {name: PrefixIndex() for name in SUGGEST_FIELDS}
+        # Recent lookup latencies in seconds, for the metrics endpoint
+        self._latencies = deque(maxlen=2048)
+
+    def load(self, field: str, rows: Iterable[Tuple[str, int]]):
+        index = PrefixIndex()
+        index.load(rows)
+        with self._lock:
+            self.fields[field] = index
+
+    def add(self, values: Dict[str, Optional[str]]):
+        with self._lock:
+            for field, value in values.items():
+                self.fields[field].add(value)
+
+    def remove(self, values: Dict[str, Optional[str]]):
+        with self._lock:
+            for field, value in values.items():
+                self.fields[field].remove(value)
+
+    def suggest(self, prefix: str, field: Optional[str] = None, limit: int = 10) -> List[dict]:
+        started = time.perf_counter()
+        names = [field] if field else list(self.fields)
+        with self._lock:
+            results = [
+                {"field": name, "value": value, "count": count}
+                for name in names
+                for value, count in self.fields[name].top(prefix, limit)
+            ]
+        if not field:
+            results.sort(key=lambda item: -item["count"])
+            results = results[:limit]
+        self._latencies.append(time.perf_counter() - started)
+        return results
+
+    def metrics(self) -> dict:
+        latencies = sorted(self._latencies)
+        with self._lock:
+            fields = {
+                name: {"values": len(index), "keys": index.keys, "dropped": index.dropped,
+                       "cached_prefixes": len(index._top), "approx_bytes": index.approx_bytes}
+                for name, index in self.fields.items()
+            }
+        return {
+            "fields": fields,
+            "approx_bytes": sum(field["approx_bytes"] for field in fields.values()),
+            "max_values_per_field": SUGGEST_MAX_VALUES,
+            "lookups_sampled": len(latencies),
+            "p50_ms": percentile(latencies, 0.50) * 1000,
+            "p99_ms": percentile(latencies, 0.99) * 1000,
+        }
+
+suggest_index = SuggestIndex()
+
+# ==================== INTEGRATION ====================
+
+def init_suggest(bind=engine):
+    db = Session(bind=bind)
+    try:
+        for field, column in SUGGEST_FIELDS.items():
+            # Most popular first, so the per-field cap drops the rarest values
+            rows = db.execute(
+                select(column, func.count())
+                .where(Job.is_active == True, column.isnot(None))
+                .group_by(column)
+                .order_by(func.count().desc())
+            )
+            suggest_index.load(field, rows)
+    finally:
+        db.close()
+
+def _suggest_values(job) -> Dict[str, Optional[str]]:
+    return {field: getattr(job, column.key) for field, column in SUGGEST_FIELDS.items()}
+
+def unindex_suggestions(jobs: Iterable):
+    """Take back the popularity of jobs that were active, given their previous values.
+
+    Anything with the SUGGEST_FIELDS attributes works: Job instances or
+    rows read before an upsert replaced them or the archiver removed them.
+    """
+    for job in jobs:
+        suggest_index.remove(_suggest_values(job))
+
+@on_jobs_saved
+def _index_saved_jobs(db: Session, jobs: List[Job]):
+    for job in jobs:
+        if job.is_active is not False:
+            suggest_index.add(_suggest_values(job))
+
+@on_jobs_removed
+def _unindex_removed_jobs(db: Session, jobs):
+    # Inactive ones were taken back when they were deactivated
+    unindex_suggestions(job for job in jobs if job.is_active is not False)
+
+# ORM edits, deactivations and deletes change what a job counts for once
+# the transaction commits: only the values that changed are taken back and
+# replaced. Jobs inserted in the transaction are left to jobs_saved, which
+# create_job calls after committing.
+
+@event.listens_for(Session, "after_flush")
+def _collect_suggestion_changes(session, flush_context):
+    changes = session.info.setdefault("suggestion_changes", [])
+    inserted = session.info.setdefault("inserted_jobs", set())
+    inserted.update(job for job in session.new if isinstance(job, Job))
+    for job in session.dirty:
+        if not isinstance(job, Job) or job in inserted or not session.is_modified(job):
+            continue
+        before = _previous_suggest_values(job) if previous_value(job, "is_active") is not False else {}
+        after = _suggest_values(job) if job.is_active is not False else {}
+        kept = {field for field in before.keys() & after.keys() if before[field] == after[field]}
+        changes.append((
+            {field: value for field, value in before.items() if field not in kept},
+            {field: value for field, value in after.items() if field not in kept},
+        ))
+    for job in session.deleted:
+        if isinstance(job, Job) and job not in inserted and previous_value(job, "is_active") is not False:
+            changes.append((_previous_suggest_values(job), {}))
+
+def _previous_suggest_values(job: Job) -> Dict[str, Optional[str]]:
+    return {field: previous_value(job, column.key) for field, column in SUGGEST_FIELDS.items()}
+
+@event.listens_for(Session, "after_commit")
+def _apply_suggestion_changes(session):
+    session.info.pop("inserted_jobs", None)
+    for removed, added in session.info.pop("suggestion_changes", ()):
+        suggest_index.remove(removed)
+        suggest_index.add(added)
+
+@event.listens_for(Session, "after_rollback")
+def _discard_suggestion_changes(session):
+    session.info.pop("inserted_jobs", None)
+    session.info.pop("suggestion_changes", None)
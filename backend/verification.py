@@ -0,0 +1,120 @@
+import os
+import threading
+from datetime import datetime, timedelta
+
+from sqlalchemy import delete, insert, select
+from sqlalchemy.orm import Session
+from dotenv import load_dotenv
+
+from database import engine, Verification
+from instrumentation import report_failure
+from notifications import generate_verification_code
+
+load_dotenv()
+
+VERIFICATION_CODE_TTL = timedelta(minutes=int(os.getenv("VERIFICATION_CODE_TTL_MINUTES", "10")))
+# Seconds between sweeps of expired codes; 0 disables the sweeper
+VERIFICATION_SWEEP_INTERVAL = float(os.getenv("VERIFICATION_SWEEP_INTERVAL", "300"))
+# Rows deleted per transaction, so a large backlog never holds a long write lock
+VERIFICATION_SWEEP_BATCH = int(os.getenv("VERIFICATION_SWEEP_BATCH", "1000"))
+
+# ==================== CODES ====================
+
+def issue_code(db: Session, user_id: int) -> str:
+    """Replace the user's code with a fresh one; the caller commits."""
+    code = generate_verification_code()
+    values = {
+        "user_id": user_id,
+        "code": code,
+        "expires_at": datetime.utcnow() + VERIFICATION_CODE_TTL,
+        "created_at": datetime.utcnow(),
+    }
+    dialect = db.get_bind().dialect.name
+    if dialect == "sqlite":
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    elif dialect == "postgresql":
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    else:
+        # No portable upsert
+        db.execute(delete(Verification).where(Verification.user_id == user_id))
+        db.execute(insert(Verification).values(**values))
+        return code
+
+    statement = dialect_insert(Verification).values(**values)
+    db.execute(statement.on_conflict_do_update(
+        index_elements=[Verification.user_id],
+        set_={name: statement.excluded[name] for name in ("code", "expires_at", "created_at")},
+    ))
+    return code
+
+def consume_code(db: Session, user_id: int, code: str) -> bool:
+    """Delete the user's code if it matches and has not expired; the caller commits.
+
+    A single DELETE both checks and spends the code, so it can only be used once.
+    """
+    result = db.execute(delete(Verification).where(
+        Verification.user_id == user_id,
+        Verification.code == code,
+        Verification.expires_at > datetime.utcnow()
+    ))
+    return result.rowcount == 1
+
+# ==================== EXPIRY SWEEPER ====================
+
+def purge_expired(bind=engine, batch_size: int = VERIFICATION_SWEEP_BATCH) -> int:
+    """Delete expired codes in batches; returns how many were removed."""
+    purged = 0
+    while True:
+        with bind.begin() as conn:
+            expired = (
+                select(Verification.id)
+                .where(Verification.expires_at <= datetime.utcnow())
+                .limit(batch_size)
+                .scalar_subquery()
+            )
+            deleted = conn.execute(delete(Verification).where(Verification.id.in_(expired))).rowcount
+        purged += deleted
+        if deleted < batch_size:
+            return purged
+
+class VerificationSweeper:
+    def __init__(self, interval: float = VERIFICATION_SWEEP_INTERVAL, bind=engine):
+        self.interval = interval
+        self.bind = bind
+        self.purged = 0
+        self.last_run = None
+        self._stop = threading.Event()
+        self._thread = None
+
+    def start(self):
+        if self.interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name="verification-sweeper", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is None:
+            return
+        self._stop.set()
+        self._thread.join()
+        self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            try:
+                self.purged += purge_expired(self.bind)
+            except Exception:
+                # A locked or unreachable database just waits for the next sweep
+                report_failure("verification", "Verification sweep failed")
+            self.last_run = datetime.utcnow()
+
+    def metrics(self) -> dict:
+        return {
+            "interval": self.interval,
+            "running": self._thread is not None,
+            "purged": self.purged,
+            "last_run": self.last_run,
+        }
+
+sweeper = VerificationSweeper()